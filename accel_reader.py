@@ -0,0 +1,261 @@
+"""
+Streaming accelerometer reader for reTerminal
+Keeps the evdev device open, waits for data with poll() and decodes
+input events in bulk into a timestamped ring buffer so no samples are lost
+between UI ticks. Runs on its own thread, or as a reader on an asyncio
+event loop when start() is given one.
+
+Accelerometer (ST LIS3LV02DL): /dev/input/event9
+"""
+
+import os
+import select
+import struct
+import threading
+import time
+from array import array
+
+from hw_paths import hw_path
+
+ACCEL_DEVICE = hw_path('/dev/input/event9')
+
+# Seconds between attempts to open a missing device
+RETRY_INTERVAL = 5.0
+# Reads per wake-up on an event loop before yielding to other tasks
+LOOP_READS = 8
+
+# struct input_event: struct timeval time; __u16 type; __u16 code; __s32 value
+# The timeval size follows the userland word size, so don't hard-code 24
+EVENT_FORMAT = 'llHHi'
+EVENT_SIZE = struct.calcsize(EVENT_FORMAT)
+
+EV_SYN = 0
+EV_ABS = 3
+SYN_REPORT = 0
+ABS_X, ABS_Y, ABS_Z = 0, 1, 2
+
+
+class SampleRing:
+    """Fixed-capacity ring of (timestamp, x, y, z) samples
+
+    seq counts every sample ever appended, so readers can ask for just the
+    samples they have not seen yet.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.t = array('d', bytes(8 * capacity))
+        self.x = array('i', bytes(4 * capacity))
+        self.y = array('i', bytes(4 * capacity))
+        self.z = array('i', bytes(4 * capacity))
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def append(self, t, x, y, z):
+        with self.lock:
+            i = self.seq % self.capacity
+            self.t[i] = t
+            self.x[i] = x
+            self.y[i] = y
+            self.z[i] = z
+            self.seq += 1
+
+    def latest(self):
+        with self.lock:
+            if not self.seq:
+                return None
+            i = (self.seq - 1) % self.capacity
+            return self.t[i], self.x[i], self.y[i], self.z[i]
+
+    def since(self, seq):
+        """Samples appended after seq, oldest first, and the new seq"""
+        with self.lock:
+            start = max(seq, self.seq - self.capacity)
+            samples = []
+            for n in range(start, self.seq):
+                i = n % self.capacity
+                samples.append((self.t[i], self.x[i], self.y[i], self.z[i]))
+            return self.seq, samples
+
+    def rate(self, window=64):
+        """Sample rate in Hz over the last window samples"""
+        with self.lock:
+            n = min(window, self.seq) - 1
+            if n < 1:
+                return 0.0
+            newest = self.t[(self.seq - 1) % self.capacity]
+            oldest = self.t[(self.seq - 1 - n) % self.capacity]
+        return n / (newest - oldest) if newest > oldest else 0.0
+
+
+class AccelerometerStream:
+    def __init__(self, device=ACCEL_DEVICE, capacity=4096, batch=64):
+        self.device = device
+        self.ring = SampleRing(capacity)
+        self.read_size = EVENT_SIZE * batch
+        self.x = self.y = self.z = 0
+        self.events = 0
+        self.error = None
+        self.thread = None
+        self.wake_r = self.wake_w = None
+        self.loop = None
+        self.fd = None
+        self.retry = None
+        self.pending = b''
+
+    def start(self, loop=None):
+        """Stream on a new thread, or on loop if given (from any thread)"""
+        if self.thread is not None or self.loop is not None:
+            return
+        if loop is not None:
+            self.loop = loop
+            loop.call_soon_threadsafe(self.attach, loop)
+            return
+        self.wake_r, self.wake_w = os.pipe()
+        self.thread = threading.Thread(target=self.run, args=(self.wake_r,),
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.loop is not None:
+            # Called on the loop's thread, like the reader itself
+            loop, self.loop = self.loop, None
+            self.detach(loop)
+            return
+        if self.thread is None:
+            return
+        os.write(self.wake_w, b'x')
+        self.thread.join(1)
+        self.thread = None
+        os.close(self.wake_w)
+        self.wake_w = None
+
+    def run(self, wake_fd):
+        try:
+            while True:
+                try:
+                    fd = os.open(self.device, os.O_RDONLY | os.O_NONBLOCK)
+                except OSError as e:
+                    self.error = e
+                    # Device missing or not permitted; retry slowly
+                    if select.select([wake_fd], [], [], 5.0)[0]:
+                        return
+                    continue
+                self.error = None
+                try:
+                    if self.pump(fd, wake_fd):
+                        return
+                except OSError as e:
+                    # e.g. ENODEV when the device goes away; reopen it
+                    self.error = e
+                finally:
+                    os.close(fd)
+        finally:
+            os.close(wake_fd)
+
+    def pump(self, fd, wake_fd):
+        """Read until stopped (returns True) or the device fails (raises)"""
+        poller = select.poll()
+        poller.register(fd, select.POLLIN | select.POLLERR | select.POLLHUP)
+        poller.register(wake_fd, select.POLLIN)
+        pending = b''
+        while True:
+            for ready_fd, mask in poller.poll():
+                if ready_fd == wake_fd:
+                    return True
+                if mask & (select.POLLERR | select.POLLHUP):
+                    raise OSError(f"{self.device} hung up")
+            try:
+                data = os.read(fd, self.read_size)
+            except BlockingIOError:
+                continue
+            if not data:
+                raise OSError(f"{self.device} closed")
+            if pending:
+                data = pending + data
+            whole = len(data) - len(data) % EVENT_SIZE
+            pending = data[whole:]
+            self.decode(memoryview(data)[:whole])
+
+    def attach(self, loop):
+        if loop is not self.loop:
+            return  # stopped (or restarted) before this ran
+        self.retry = None
+        try:
+            self.fd = os.open(self.device, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError as e:
+            self.error = e
+            self.retry = loop.call_later(RETRY_INTERVAL, self.attach, loop)
+            return
+        self.error = None
+        self.pending = b''
+        loop.add_reader(self.fd, self.on_readable)
+
+    def detach(self, loop):
+        if self.retry is not None:
+            self.retry.cancel()
+            self.retry = None
+        if self.fd is not None:
+            loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+    def on_readable(self):
+        data = b''
+        try:
+            for _ in range(LOOP_READS):
+                chunk = os.read(self.fd, self.read_size)
+                if not chunk:
+                    raise OSError(f"{self.device} closed")
+                data += chunk
+                if len(chunk) < self.read_size:
+                    break
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            # e.g. ENODEV when the device goes away; reopen it
+            self.error = e
+            self.detach(self.loop)
+            self.loop.call_soon(self.attach, self.loop)
+            return
+        if self.pending:
+            data = self.pending + data
+        whole = len(data) - len(data) % EVENT_SIZE
+        self.pending = data[whole:]
+        if whole:
+            self.decode(memoryview(data)[:whole])
+
+    def decode(self, data):
+        """Decode a batch of input events; every SYN_REPORT closes a sample"""
+        x, y, z = self.x, self.y, self.z
+        append = self.ring.append
+        count = 0
+        for sec, usec, ev_type, code, value in struct.iter_unpack(EVENT_FORMAT, data):
+            count += 1
+            if ev_type == EV_ABS:
+                if code == ABS_X:
+                    x = value
+                elif code == ABS_Y:
+                    y = value
+                elif code == ABS_Z:
+                    z = value
+            elif ev_type == EV_SYN and code == SYN_REPORT:
+                append(sec + usec * 1e-6, x, y, z)
+        self.x, self.y, self.z = x, y, z
+        self.events += count
+
+
+if __name__ == "__main__":
+    # Print the live sample rate and latest reading
+    stream = AccelerometerStream()
+    stream.start()
+    try:
+        while True:
+            time.sleep(1)
+            if stream.error:
+                print(f"Accelerometer: {stream.error}")
+            else:
+                print(f"X: {stream.x}, Y: {stream.y}, Z: {stream.z} "
+                      f"({stream.ring.rate():.0f} Hz, {stream.events} events)")
+    except KeyboardInterrupt:
+        stream.stop()
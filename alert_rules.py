@@ -0,0 +1,413 @@
+"""
+Threshold and alert rules over the metric stream
+Rules are evaluated incrementally as each reading arrives, so an alert
+needs no polling and costs the same however long its window is:
+
+    overheating: temperature > 75 for 30s clear 72
+    dark: lux < 5 clear 10
+    cpu_saturated: p95(cpu, 5m) > 90
+    shaking: max(vibration_rms, 10s) > 0.2
+
+A condition compares the latest reading, or avg/min/max/pNN of a metric
+over a time window, with a threshold. "for D" makes it fire only once it
+has held for D; "clear V" is the level it has to get back past to clear
+(hysteresis). A windowed rule only fires once its window holds "samples N"
+readings (default 5). Windows keep their samples in a deque with a running
+sum and, per threshold, a count of samples beyond it: a percentile or
+extreme is above a threshold exactly when enough samples are, so every
+update is O(1) amortised per rule. The window is only sorted to report the
+value when a rule fires or clears.
+
+A rule notifies when it fires and when it clears, never again while it
+stays firing, and not at all if it fires again within its cooldown
+(default 60 s) of the last notification. Notifications go to the app (for
+its alert banner), to ~/.cache/reterminal/alerts.log as JSON lines, and
+as a JSON POST to RETERMINAL_ALERT_WEBHOOK when that is set; the log and
+webhook are written from a background thread.
+
+Rules file: ~/.config/reterminal/alerts.txt, "[name:] condition" per line
+(DEFAULT_RULES when it doesn't exist)
+"""
+
+import collections
+import json
+import math
+import operator
+import os
+import queue
+import re
+import threading
+import time
+
+from latency_histogram import LatencyHistogram
+from metrics_history import HISTORY_DIR
+from startup_probe import lazy_import
+
+# Only the webhook needs it, and it pulls in http and email (~50 ms)
+urllib_request = lazy_import('urllib.request')
+
+RULES_FILE = os.path.expanduser('~/.config/reterminal/alerts.txt')
+ALERT_LOG = os.path.join(HISTORY_DIR, 'alerts.log')
+WEBHOOK = os.environ.get('RETERMINAL_ALERT_WEBHOOK')
+
+DEFAULT_RULES = """
+overheating: temperature > 75 for 30s clear 72
+dark: lux < 5 for 10s clear 10
+cpu_saturated: p95(cpu, 5m) > 90
+shaking: vibration_rms > 0.2 for 2s clear 0.1
+"""
+
+COOLDOWN = 60.0
+# Samples a window needs before its rule can fire; one sample is its own
+# p95 and max
+MIN_SAMPLES = 5
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+# Queued notifications beyond this are dropped rather than piling up
+MAX_QUEUED = 256
+
+CONDITION = re.compile(r"""
+    (?:(?P<agg>avg|min|max|p\d+(?:\.\d+)?)\(\s*(?P<window_metric>[\w:.-]+)\s*,
+        \s*(?P<window>[\d.]+\s*(?:ms|s|m|h))\s*\)
+     | (?P<metric>[\w:.-]+))
+    \s*(?P<op>>=|<=|>|<)\s*(?P<threshold>-?[\d.]+(?:e[-+]?\d+)?)
+    (?:\s+for\s+(?P<hold>[\d.]+\s*(?:ms|s|m|h)))?
+    (?:\s+clear\s+(?P<clear>-?[\d.]+(?:e[-+]?\d+)?))?
+    (?:\s+samples\s+(?P<samples>\d+))?
+    (?:\s+cooldown\s+(?P<cooldown>[\d.]+\s*(?:ms|s|m|h)))?
+    \s*$""", re.VERBOSE)
+
+AlertEvent = collections.namedtuple('AlertEvent', 'rule state value time condition')
+
+
+def parse_duration(text):
+    """Seconds in "500ms", "30s", "5m" or "2h" """
+    match = re.fullmatch(r'([\d.]+)\s*(ms|s|m|h)', text.strip())
+    if match is None:
+        raise ValueError(f"bad duration {text!r}")
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+class Window:
+    """One metric's samples over the last `seconds`, with a running sum and a
+    count of the samples beyond each registered (op, level)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.samples = collections.deque()  # (t, value)
+        self.total = 0.0
+        self.levels = []  # (compare, level)
+        self.counts = []
+
+    def level(self, op, level):
+        """Index of the counter of samples with `value op level`"""
+        key = (OPERATORS[op], level)
+        if key not in self.levels:
+            self.levels.append(key)
+            self.counts.append(sum(1 for t, v in self.samples if key[0](v, level)))
+        return self.levels.index(key)
+
+    def add(self, t, value):
+        self.samples.append((t, value))
+        self.total += value
+        counts = self.counts
+        for i, (compare, level) in enumerate(self.levels):
+            if compare(value, level):
+                counts[i] += 1
+        # Each sample is removed once, so this is O(1) amortised
+        cutoff = t - self.seconds
+        samples = self.samples
+        while samples[0][0] <= cutoff:
+            old = samples.popleft()[1]
+            self.total -= old
+            for i, (compare, level) in enumerate(self.levels):
+                if compare(old, level):
+                    counts[i] -= 1
+
+    def __len__(self):
+        return len(self.samples)
+
+
+class Rule:
+    def __init__(self, name, metric, op, threshold, aggregate=None, window=None,
+                 hold=0.0, clear=None, cooldown=COOLDOWN, min_samples=MIN_SAMPLES,
+                 text=None):
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.compare = OPERATORS[op]
+        self.threshold = threshold
+        self.aggregate = aggregate  # None, 'avg', 'min', 'max' or 'pNN'
+        self.window = window  # seconds, with an aggregate
+        if aggregate is not None and not (window and window > 0):
+            raise ValueError(f"{aggregate}({metric}) needs a window longer than 0 s")
+        self.min_samples = min_samples
+        self.hold = hold
+        self.clear = threshold if clear is None else clear
+        self.cooldown = cooldown
+        self.text = text or f"{metric} {op} {threshold:g}"
+        # min and max are the 0th and 100th percentiles
+        self.percent = {'min': 0.0, 'max': 100.0}.get(aggregate)
+        if aggregate is not None and aggregate.startswith('p'):
+            self.percent = float(aggregate[1:])
+            if not 0 <= self.percent <= 100:
+                raise ValueError(f"percentile {aggregate} out of range")
+        self.samples = None  # Window, once attached to an engine
+        self.fire_level = self.clear_level = None
+
+        self.state = 'ok'  # 'pending' while waiting out `hold`, then 'firing'
+        self.since = None  # when the condition last became true
+        self.value = None  # reading or aggregate when it last fired
+        self.notified = False  # whether the current firing was notified
+        self.last_notified = None
+        self.fired = 0
+        self.suppressed = 0
+
+    def attach(self, window):
+        self.samples = window
+        self.fire_level = window.level(self.op, self.threshold)
+        self.clear_level = window.level(self.op, self.clear)
+
+    def holds(self, value, level, counter):
+        """Whether the aggregate compares true against level"""
+        if self.samples is None:
+            return self.compare(value, level)
+        window = self.samples
+        n = len(window)
+        if self.aggregate == 'avg':
+            return self.compare(window.total / n, level)
+        # The nearest-rank percentile is the k-th smallest sample; it is
+        # above level when fewer than k samples are not, and below it when
+        # at least k samples are
+        k = max(math.ceil(self.percent * n / 100 - 1e-9), 1)
+        count = window.counts[counter]
+        if self.op in ('>', '>='):
+            return n - count < k
+        return count >= k
+
+    def current(self, value):
+        """Reading or aggregate, for messages"""
+        window = self.samples
+        if window is None:
+            return value
+        if self.aggregate == 'avg':
+            return window.total / len(window)
+        values = sorted(v for t, v in window.samples)  # only on state changes
+        k = max(math.ceil(self.percent * len(values) / 100 - 1e-9), 1)
+        return values[k - 1]
+
+    def update(self, t, value):
+        """Evaluate one new reading; the AlertEvent to notify, or None"""
+        if self.state == 'firing':
+            if self.holds(value, self.clear, self.clear_level):
+                return None
+            self.state = 'ok'
+            self.since = None
+            if not self.notified:
+                return None
+            return self.event('resolved', t, value)
+        if (not self.holds(value, self.threshold, self.fire_level)
+                or self.samples is not None and len(self.samples) < self.min_samples):
+            self.state = 'ok'
+            self.since = None
+            return None
+        if self.since is None:
+            self.since = t
+        if t - self.since < self.hold:
+            self.state = 'pending'
+            return None
+        self.state = 'firing'
+        self.fired += 1
+        self.value = self.current(value)
+        # Flapping: a rule that fires again soon after its last
+        # notification stays quiet
+        self.notified = (self.last_notified is None
+                         or t - self.last_notified >= self.cooldown)
+        if not self.notified:
+            self.suppressed += 1
+            return None
+        return self.event('firing', t, value)
+
+    def event(self, state, t, value):
+        self.last_notified = t
+        return AlertEvent(self.name, state, self.current(value), t, self.text)
+
+
+def parse_rule(line, number=0):
+    """Rule from "[name:] condition", None for blanks and comments"""
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+    # Metric names may contain ':' (net_rx_bytes:eth0), so try the whole
+    # line as an unnamed condition first
+    name, condition = f"rule{number}", line
+    match = CONDITION.match(line)
+    if match is None:
+        name, _, condition = line.partition(':')
+        match = CONDITION.match(condition.strip())
+    if match is None:
+        raise ValueError(f"can't parse {line!r}")
+    g = match.groupdict()
+    aggregate = g['agg']
+    return Rule(name.strip(),
+                g['window_metric'] or g['metric'],
+                g['op'],
+                float(g['threshold']),
+                aggregate=aggregate,
+                window=parse_duration(g['window']) if aggregate else None,
+                hold=parse_duration(g['hold']) if g['hold'] else 0.0,
+                clear=float(g['clear']) if g['clear'] is not None else None,
+                cooldown=parse_duration(g['cooldown']) if g['cooldown'] else COOLDOWN,
+                min_samples=int(g['samples']) if g['samples'] else MIN_SAMPLES,
+                text=condition.strip())
+
+
+def parse_rules(text, source='<rules>'):
+    """Rules in text; lines that don't parse are reported and skipped"""
+    rules = []
+    for number, line in enumerate(text.splitlines(), 1):
+        try:
+            rule = parse_rule(line, number)
+        except ValueError as e:
+            print(f"Alert rules {source}:{number}: {e}")
+            continue
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+def load_rules(path=RULES_FILE):
+    """Rules in path, or DEFAULT_RULES if it doesn't exist"""
+    try:
+        with open(path) as f:
+            return parse_rules(f.read(), path)
+    except OSError:
+        return parse_rules(DEFAULT_RULES, 'DEFAULT_RULES')
+
+
+class RuleEngine:
+    """Feeds every reading to the rules on its metric; not thread-safe, so
+    feed it from one thread at a time (the app's event loop, or the sensor
+    client's reader while the daemon samples)"""
+
+    def __init__(self, rules, on_event=None):
+        self.rules = list(rules)
+        self.on_event = on_event
+        self.by_metric = {}  # metric -> [Rule]
+        self.windows = {}  # metric -> [Window]
+        shared = {}  # (metric, seconds) -> Window
+        for rule in self.rules:
+            self.by_metric.setdefault(rule.metric, []).append(rule)
+            if rule.window is not None:
+                key = (rule.metric, rule.window)
+                if key not in shared:
+                    shared[key] = Window(rule.window)
+                    self.windows.setdefault(rule.metric, []).append(shared[key])
+                rule.attach(shared[key])
+        self.samples = 0
+        self.events = 0
+        self.eval_time = LatencyHistogram()
+
+    def feed(self, metric, value, t=None):
+        """Evaluate the rules on metric against one reading"""
+        rules = self.by_metric.get(metric)
+        if rules is None or value is None or isinstance(value, (str, bool)):
+            return
+        start = time.perf_counter()
+        t = time.time() if t is None else t
+        self.samples += 1
+        for window in self.windows.get(metric, ()):
+            window.add(t, value)
+        for rule in rules:
+            event = rule.update(t, value)
+            if event is not None:
+                self.events += 1
+                if self.on_event is not None:
+                    self.on_event(event)
+        self.eval_time.record(time.perf_counter() - start)
+
+    def active(self):
+        """Rules currently firing"""
+        return [rule for rule in self.rules if rule.state == 'firing']
+
+    def format_active(self):
+        """Banner text for the firing rules, "" when there are none"""
+        return "   ".join(f"⚠ {rule.name}: {rule.text} ({rule.value:g})"
+                          for rule in self.active())
+
+    def stats(self):
+        return {
+            'rules': len(self.rules),
+            'samples': self.samples,
+            'events': self.events,
+            'firing': len(self.active()),
+            'suppressed': sum(rule.suppressed for rule in self.rules),
+            'eval_p50_us': self.eval_time.percentile(50) * 1e6,
+            'eval_p99_us': self.eval_time.percentile(99) * 1e6,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"Alerts: {s['rules']} rules, {s['samples']} samples, {s['events']} "
+                f"notifications ({s['suppressed']} suppressed), {s['firing']} firing; "
+                f"eval p50 {s['eval_p50_us']:.1f} us p99 {s['eval_p99_us']:.1f} us")
+
+
+class AlertNotifier:
+    """Appends events to the alert log and posts them to the webhook from a
+    background thread, so a slow SD card or server never holds up sampling"""
+
+    def __init__(self, app_name, log_path=ALERT_LOG, webhook=WEBHOOK):
+        self.app_name = app_name
+        self.log_path = log_path
+        self.webhook = webhook
+        self.queue = queue.Queue(MAX_QUEUED)
+        self.thread = None
+        self.dropped = 0
+
+    def notify(self, event):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='alerts', daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            record = dict(event._asdict(), app=self.app_name)
+            print(f"Alert {event.rule} {event.state}: {event.condition} ({event.value:g})")
+            line = json.dumps(record)
+            if self.log_path:
+                try:
+                    os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+                    with open(self.log_path, 'a') as f:
+                        f.write(line + '\n')
+                except OSError as e:
+                    print(f"Alert log {self.log_path}: {e}")
+            if self.webhook:
+                self.post(line.encode())
+
+    def post(self, body):
+        request = urllib_request.Request(self.webhook, data=body, method='POST',
+                                        headers={'Content-Type': 'application/json'})
+        try:
+            with urllib_request.urlopen(request, timeout=5) as response:
+                response.read()
+        except (OSError, ValueError) as e:
+            print(f"Alert webhook {self.webhook}: {e}")
+
+    def close(self):
+        """Deliver what is queued, waiting at most a few seconds"""
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=1.0)
+        except queue.Full:
+            return
+        self.thread.join(timeout=5.0)
+        self.thread = None
@@ -4,13 +4,16 @@ reTerminal App Launcher
 Main menu to launch different demo applications
 """
 
+# First, so a startup profile sees every import below
+import startup_probe
 import tkinter as tk
-from tkinter import ttk
 import subprocess
-import os
+import sys
+from screen_host import ScreenHost
+from app_supervisor import AppSupervisor
 
 class AppLauncher:
-    def __init__(self, root):
+    def __init__(self, root, single_process=False):
         self.root = root
         self.root.title("reTerminal App Launcher")
         # Set explicit geometry for fullscreen
@@ -25,23 +28,33 @@ class AppLauncher:
         self.root.bind('<Escape>', self.toggle_fullscreen)
         
         self.app_dir = "/home/jharris/reTerminal_apps"
+        # Menu widgets live in their own frame so in-process app screens
+        # can be swapped in and out of the same window
+        self.menu = tk.Frame(self.root, bg='#2c3e50')
+        self.menu.pack(fill='both', expand=True)
+        self.host = ScreenHost(self.root, self.menu) if single_process else None
+        # Apps started as separate processes; one instance each, forked
+        # from a pre-imported zygote so they start quickly
+        self.supervisor = AppSupervisor(self.app_dir, self.root,
+                                        zygote=not single_process)
         self.setup_ui()
+        self.supervisor.on_change = self.show_usage
         
     def setup_ui(self):
         # Title
-        title = tk.Label(self.root, text="reTerminal Apps", 
+        title = tk.Label(self.menu, text="reTerminal Apps", 
                         font=('Arial', 42, 'bold'), 
                         fg='#ecf0f1', bg='#2c3e50')
         title.pack(pady=40)
         
         # Subtitle
-        subtitle = tk.Label(self.root, text="Choose an application to launch", 
+        subtitle = tk.Label(self.menu, text="Choose an application to launch", 
                            font=('Arial', 20), 
                            fg='#bdc3c7', bg='#2c3e50')
         subtitle.pack(pady=15)
         
         # App buttons frame
-        button_frame = tk.Frame(self.root, bg='#2c3e50')
+        button_frame = tk.Frame(self.menu, bg='#2c3e50')
         button_frame.pack(pady=20, expand=True)
         
         # Define apps
@@ -49,6 +62,7 @@ class AppLauncher:
             ("Touchscreen Demo", "touchscreen_demo.py", "#3498db"),
             ("Hardware Sensors", "hardware_demo.py", "#e74c3c"),
             ("IoT Dashboard", "iot_dashboard.py", "#2ecc71"),
+            ("Fleet View", "fleet_view.py", "#16a085"),
         ]
         
         # Adjust button layout to two columns
@@ -77,11 +91,11 @@ class AppLauncher:
         files_btn.pack(pady=15)
             
         # Separator
-        separator = tk.Frame(self.root, height=2, bg='#34495e')
+        separator = tk.Frame(self.menu, height=2, bg='#34495e')
         separator.pack(fill='x', padx=50, pady=10)
         
         # System buttons
-        system_frame = tk.Frame(self.root, bg='#2c3e50')
+        system_frame = tk.Frame(self.menu, bg='#2c3e50')
         system_frame.pack(pady=20)
         
         # Terminal button
@@ -94,7 +108,7 @@ class AppLauncher:
         terminal_btn.pack(side=tk.LEFT, padx=10)
         
         # Exit button
-        exit_button = tk.Button(self.root, 
+        exit_button = tk.Button(self.menu, 
                                text="Exit Launcher", 
                                font=('Arial', 18, 'bold'),
                                bg='#e74c3c', fg='white',
@@ -102,12 +116,20 @@ class AppLauncher:
                                command=self.exit_app)
         exit_button.pack(side=tk.BOTTOM, pady=20)
         
+        # What each running app costs
+        self.usage_label = tk.Label(self.menu, text="",
+                                   font=('Arial', 12),
+                                   fg='#bdc3c7', bg='#2c3e50', justify=tk.LEFT)
+        self.usage_label.pack(side=tk.BOTTOM, pady=5)
+        
     def launch_app(self, filename):
-        app_path = os.path.join(self.app_dir, filename)
-        try:
-            subprocess.Popen(['python3', app_path])
-        except Exception as e:
-            print(f"Error launching {filename}: {e}")
+        if self.host is not None:
+            self.host.show(filename)
+            return
+        self.supervisor.launch(filename)
+        
+    def show_usage(self, usage):
+        self.usage_label.config(text=self.supervisor.format_usage(usage))
             
     def open_terminal(self):
         try:
@@ -140,11 +162,18 @@ class AppLauncher:
         
     def exit_app(self):
         """Exit the application"""
+        if self.host is not None:
+            self.host.close()
+        # Stop only the apps this launcher started
+        self.supervisor.shutdown()
         self.root.quit()
         self.root.destroy()
-        os.system("pkill -f python3")
 
 if __name__ == "__main__":
+    startup_probe.mark('imports')
     root = tk.Tk()
-    app = AppLauncher(root)
+    startup_probe.mark('window')
+    app = AppLauncher(root, single_process='--single-process' in sys.argv)
+    startup_probe.mark('app')
+    startup_probe.notify_first_frame(root)
     root.mainloop()
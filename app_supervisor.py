@@ -0,0 +1,184 @@
+"""
+App supervisor for the reTerminal launchers
+Tracks the apps a launcher starts. Tapping an app that is already running
+brings it to the front (SIGUSR1) instead of starting a duplicate that
+would poll the same sensors again. Exits are reaped; a crashed app is
+restarted with exponential backoff. Shutdown stops only our own children,
+never other Python processes on the device.
+
+With a zygote (see app_zygote) apps are forked from a process that has
+already done the imports; until it is ready, or if it dies, apps are
+started as a fresh python3 as before.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from startup_probe import lazy_import
+from app_zygote import AppZygote
+from supervised_app import SUPERVISOR_ENV
+
+# Only needed once an app is running; keeps it off the launcher's startup
+psutil = lazy_import('psutil')
+
+
+class Child:
+    def __init__(self, filename, popen):
+        self.filename = filename
+        self.popen = popen
+        self.started = time.monotonic()
+        try:
+            self.process = psutil.Process(popen.pid)
+            self.process.cpu_percent(None)  # prime the delta-based sampler
+        except psutil.Error:
+            self.process = None  # already gone; poll() reaps it
+        self.crashes = 0
+        self.restart_at = None  # set while waiting to restart after a crash
+
+    @property
+    def running(self):
+        return self.restart_at is None
+
+
+class AppSupervisor:
+    def __init__(self, app_dir, root=None, poll_interval=1000,
+                 max_crashes=5, backoff=1.0, max_backoff=30.0, stable_after=60.0,
+                 zygote=False):
+        self.app_dir = app_dir
+        self.root = root
+        self.poll_interval = poll_interval  # ms, while children exist
+        self.max_crashes = max_crashes  # consecutive quick crashes before giving up
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after  # a run this long resets the crash count
+        self.children = {}  # filename -> Child
+        self.polling = False
+        self.on_change = None  # called after each poll with usage()
+        self.zygote = None
+        if zygote:
+            env = dict(os.environ)
+            env[SUPERVISOR_ENV] = str(os.getpid())
+            try:
+                self.zygote = AppZygote(app_dir, env=env)
+            except OSError as e:
+                print(f"Error starting app zygote: {e}")
+
+    def launch(self, filename):
+        """Start an app, or raise it if it is already running"""
+        child = self.children.get(filename)
+        if child is not None and child.running and child.popen.poll() is None:
+            try:
+                os.kill(child.popen.pid, signal.SIGUSR1)
+                return 'raised'
+            except ProcessLookupError:
+                pass  # exited just now; start it again below
+        self.spawn(filename, crashes=child.crashes if child is not None else 0)
+        return 'started'
+
+    def spawn(self, filename, crashes=0):
+        popen = None
+        if self.zygote is not None:
+            popen = self.zygote.spawn(filename)
+        if popen is None:
+            popen = self.start_process(filename)
+        if popen is None:
+            self.children.pop(filename, None)
+            return
+        child = Child(filename, popen)
+        child.crashes = crashes
+        self.children[filename] = child
+        self.schedule_poll()
+
+    def start_process(self, filename):
+        env = dict(os.environ)
+        env[SUPERVISOR_ENV] = str(os.getpid())
+        try:
+            return subprocess.Popen([sys.executable, os.path.join(self.app_dir, filename)],
+                                    cwd=self.app_dir, env=env,
+                                    # Own process group, so shutdown can stop
+                                    # the app together with anything it starts
+                                    start_new_session=True)
+        except OSError as e:
+            print(f"Error launching {filename}: {e}")
+            return None
+
+    def schedule_poll(self):
+        if self.root is not None and not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        """Reap exited children and restart crashed ones when due"""
+        self.polling = False
+        now = time.monotonic()
+        for filename, child in list(self.children.items()):
+            if not child.running:
+                if now >= child.restart_at:
+                    print(f"Restarting {filename} (crash {child.crashes})")
+                    self.spawn(filename, child.crashes)
+                continue
+            code = child.popen.poll()
+            if code is None:
+                continue
+            if code == 0 or code == -signal.SIGTERM:
+                del self.children[filename]  # closed normally
+                continue
+            if now - child.started >= self.stable_after:
+                child.crashes = 0
+            child.crashes += 1
+            if child.crashes > self.max_crashes:
+                print(f"{filename} keeps crashing (exit {code}), not restarting")
+                del self.children[filename]
+                continue
+            delay = min(self.backoff * 2 ** (child.crashes - 1), self.max_backoff)
+            print(f"{filename} exited with {code}, restarting in {delay:.0f} s")
+            child.restart_at = now + delay
+        if self.on_change is not None:
+            self.on_change(self.usage())
+        if self.children:
+            self.schedule_poll()
+
+    def usage(self):
+        """{filename: (cpu percent, rss bytes)} of every running child"""
+        usage = {}
+        for filename, child in self.children.items():
+            if not child.running or child.process is None:
+                continue
+            try:
+                with child.process.oneshot():
+                    usage[filename] = (child.process.cpu_percent(None),
+                                       child.process.memory_info().rss)
+            except psutil.Error:
+                continue
+        return usage
+
+    def format_usage(self, usage=None):
+        usage = self.usage() if usage is None else usage
+        return "\n".join(f"{filename}: {cpu:.0f}% CPU, {rss // (1024 * 1024)} MB"
+                         for filename, (cpu, rss) in usage.items())
+
+    def shutdown(self, timeout=3.0):
+        """Stop every child: SIGTERM, then SIGKILL whatever is left"""
+        children = [child for child in self.children.values() if child.running]
+        self.children.clear()
+        for child in children:
+            try:
+                os.killpg(child.popen.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        for child in children:
+            try:
+                child.popen.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                try:
+                    os.killpg(child.popen.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                child.popen.wait()
+        if self.zygote is not None:
+            self.zygote.close()
+            self.zygote = None
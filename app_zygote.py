@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Pre-forked app zygote
+A helper process that has already started the interpreter and imported
+tkinter, psutil and the app modules. Each launch forks it, so the app
+starts with every import done and shared copy-on-write with the zygote.
+Tk itself is only created in the forked child: an X connection cannot be
+shared across fork.
+
+The launcher talks to it over a SOCK_SEQPACKET socketpair, one JSON
+message per packet:
+
+  launcher -> zygote   {"app": "iot_dashboard.py", "args": [...], "env": {...}}
+                       (a ready pipe fd may ride along, see startup_probe)
+  zygote -> launcher   {"ready": true}            imports done
+                       {"pid": 1234}              reply to a launch
+                       {"error": "..."}           reply to a failed launch
+                       {"exit": 1234, "code": 0}  a child exited
+
+Closing the launcher's end of the socket stops the zygote.
+"""
+
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import startup_probe
+
+# Imported before forking; anything the apps import is worth listing here
+PRELOAD = ['tkinter', 'psutil', 'numpy']
+APPS = ['iot_dashboard.py', 'hardware_demo.py', 'touchscreen_demo.py', 'fleet_view.py']
+MAX_MESSAGE = 65536
+# Forking takes milliseconds; a zygote this slow to answer is stuck
+SPAWN_TIMEOUT = 2.0
+
+
+def preload(modules):
+    for name in modules:
+        try:
+            __import__(name)
+        except ImportError:
+            pass  # optional dependency; the app copes without it
+
+
+def serve(sock):
+    """Fork a child per launch request; returns the request in the child"""
+    # SIGCHLD wakes the selector through the signal wakeup pipe
+    wake_read, wake_write = os.pipe()
+    os.set_blocking(wake_read, False)
+    os.set_blocking(wake_write, False)
+    signal.set_wakeup_fd(wake_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    selector = selectors.DefaultSelector()
+    selector.register(sock, selectors.EVENT_READ)
+    selector.register(wake_read, selectors.EVENT_READ)
+    send(sock, ready=True)
+
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is not sock:
+                try:
+                    while os.read(wake_read, 512):
+                        pass
+                except BlockingIOError:
+                    pass
+                continue
+            try:
+                data, fds, _, _ = socket.recv_fds(sock, MAX_MESSAGE, 1)
+            except ConnectionError:
+                data, fds = b'', []
+            if not data:
+                return None  # launcher gone
+            request = json.loads(data)
+            request['ready_fd'] = fds[0] if fds else None
+            try:
+                pid = os.fork()
+            except OSError as e:
+                send(sock, error=str(e))
+                continue
+            if pid == 0:
+                # Child: drop everything that belongs to the zygote
+                selector.close()
+                sock.close()
+                os.close(wake_read)
+                os.close(wake_write)
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                return request
+            if request['ready_fd'] is not None:
+                os.close(request['ready_fd'])
+            send(sock, pid=pid)
+        reap(sock)
+
+
+def reap(sock):
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        send(sock, exit=pid, code=os.waitstatus_to_exitcode(status))
+
+
+def send(sock, **message):
+    try:
+        sock.send(json.dumps(message).encode())
+    except OSError:
+        pass  # launcher gone; the next recv notices
+
+
+def run_app(request):
+    """Become the requested app, as if started with python3 <app>"""
+    os.setsid()  # own process group, like start_new_session=True
+    os.chdir(request['cwd'])
+    os.environ.update(request.get('env', {}))
+    if request['ready_fd'] is not None:
+        os.environ[startup_probe.READY_FD_ENV] = str(request['ready_fd'])
+    # The zygote read the profile setting before this child's env existed
+    startup_probe.start_profile()
+    sys.argv = [request['app']] + request.get('args', [])
+    module = os.path.splitext(os.path.basename(request['app']))[0]
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+class ZygoteChild:
+    """Popen-like handle for an app forked by the zygote"""
+    def __init__(self, zygote, pid):
+        self.zygote = zygote
+        self.pid = pid
+        self.returncode = None
+
+    def poll(self):
+        if self.returncode is None:
+            self.zygote.pump(0)
+            self.returncode = self.zygote.exits.pop(self.pid, None)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise subprocess.TimeoutExpired(self.pid, timeout)
+            if not self.zygote.alive:
+                # No one is left to report the exit; watch the pid instead
+                try:
+                    os.kill(self.pid, 0)
+                except ProcessLookupError:
+                    self.returncode = -signal.SIGKILL
+                    break
+                time.sleep(0.05)
+                continue
+            self.zygote.pump(remaining)
+        return self.returncode
+
+
+class AppZygote:
+    """Launcher side: starts the zygote and asks it to fork apps"""
+    def __init__(self, app_dir, apps=APPS, env=None):
+        self.app_dir = app_dir
+        self.sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--fd', str(child_sock.fileno()),
+             '--app-dir', app_dir] + list(apps),
+            cwd=app_dir, env=env, pass_fds=(child_sock.fileno(),))
+        child_sock.close()
+        self.ready = False
+        self.alive = True
+        self.exits = {}  # pid -> exit code, until its ZygoteChild polls
+
+    def pump(self, timeout):
+        """Read zygote messages for up to timeout seconds (None: one message)"""
+        if not self.alive:
+            return None
+        self.sock.settimeout(timeout)
+        reply = None
+        try:
+            while True:
+                data = self.sock.recv(MAX_MESSAGE)
+                if not data:
+                    self.alive = False
+                    return None
+                message = json.loads(data)
+                if 'exit' in message:
+                    self.exits[message['exit']] = message['code']
+                elif 'ready' in message:
+                    self.ready = True
+                else:
+                    reply = message
+                    return reply
+                self.sock.settimeout(0)
+        except (BlockingIOError, socket.timeout):
+            return None
+        except OSError:
+            self.alive = False
+            return None
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not self.ready and self.alive and time.monotonic() < deadline:
+            self.pump(deadline - time.monotonic())
+        return self.ready
+
+    def spawn(self, filename, args=(), env=None, ready_fd=None):
+        """Fork filename from the zygote; None when it is not ready (yet)"""
+        if not self.ready:
+            self.pump(0)
+        if not self.ready or not self.alive:
+            return None
+        request = {'app': os.path.join(self.app_dir, filename), 'args': list(args),
+                   'cwd': self.app_dir, 'env': env or {}}
+        try:
+            socket.send_fds(self.sock, [json.dumps(request).encode()],
+                            [ready_fd] if ready_fd is not None else [])
+        except OSError:
+            self.alive = False
+            return None
+        reply = None
+        deadline = time.monotonic() + SPAWN_TIMEOUT
+        while reply is None and self.alive:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Stuck but not dead: stop using it so the launcher can
+                # start apps as plain processes instead
+                print(f"Zygote did not answer launching {filename}; giving up on it")
+                self.alive = False
+                self.process.kill()
+                return None
+            reply = self.pump(remaining)
+        if reply is None or 'pid' not in reply:
+            if reply is not None:
+                print(f"Zygote could not launch {filename}: {reply.get('error')}")
+            return None
+        return ZygoteChild(self, reply['pid'])
+
+    def close(self):
+        self.alive = False
+        self.sock.close()
+        try:
+            self.process.wait(3)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def main():
+    fd = int(sys.argv[sys.argv.index('--fd') + 1])
+    app_dir = sys.argv[sys.argv.index('--app-dir') + 1]
+    apps = [arg for arg in sys.argv[1:] if arg.endswith('.py')]
+    sys.path.insert(0, app_dir)
+    preload(PRELOAD + [os.path.splitext(app)[0] for app in apps])
+
+    sock = socket.socket(fileno=fd)
+    request = serve(sock)
+    if request is not None:
+        run_app(request)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Fake reTerminal device tree for hardware-free benchmarks
+Generates the sysfs, procfs and evdev files the apps read under a
+temporary directory. Point the apps at it with RETERMINAL_FS_ROOT (set it
+before importing them; see hw_paths). The accelerometer is a FIFO at
+dev/input/event9 that FakeAccelerometer feeds with real input_event frames.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+
+EVENT_FORMAT = 'llHHi'  # struct input_event, as accel_reader decodes it
+EV_SYN, EV_ABS = 0, 3
+SYN_REPORT = 0
+ABS_X, ABS_Y, ABS_Z = 0, 1, 2
+
+FILES = {
+    'sys/bus/iio/devices/iio:device0/in_illuminance_input': '312\n',
+    'sys/class/thermal/thermal_zone0/temp': '48312\n',
+    'sys/class/backlight/lcd_backlight/bl_power': '0\n',
+    'sys/class/backlight/lcd_backlight/brightness': '100\n',
+    'proc/stat': ('cpu  4705 150 1120 16250 520 0 30 0 0 0\n'
+                  'cpu0 1176 37 280 4062 130 0 7 0 0 0\n'
+                  'intr 0\nctxt 250000\nbtime 1700000000\n'
+                  'processes 3000\nprocs_running 1\nprocs_blocked 0\n'),
+    'proc/meminfo': ('MemTotal:        3884332 kB\n'
+                     'MemFree:         2131772 kB\n'
+                     'MemAvailable:    3096508 kB\n'
+                     'Buffers:           62396 kB\n'
+                     'Cached:           923380 kB\n'
+                     'Active:          1042316 kB\n'
+                     'Inactive:         459196 kB\n'
+                     'Shmem:             40856 kB\n'
+                     'SReclaimable:      51236 kB\n'),
+    'proc/uptime': '5400.21 20100.50\n',
+    'proc/net/wireless': ('Inter-| sta-|   Quality        |   Discarded packets\n'
+                          ' face | tus | link level noise |  nwid  crypt   frag\n'
+                          ' wlan0: 0000   58.  -52.  -256        0      0      0\n'),
+    'proc/net/dev': ('Inter-|   Receive                                                |  Transmit\n'
+                     ' face |bytes    packets errs drop fifo frame compressed multicast|'
+                     'bytes    packets errs drop fifo colls carrier compressed\n'
+                     '    lo:  104840     1210    0    0    0     0          0         0'
+                     '   104840     1210    0    0    0     0       0          0\n'
+                     '  eth0: 9824123    10234    0    0    0     0          0        12'
+                     '  1203401     7342    0    0    0     0       0          0\n'
+                     ' wlan0: 3520918     4021    0    0    0     0          0         0'
+                     '   820331     2310    0    0    0     0       0          0\n'),
+}
+
+ACCEL_DEVICE = 'dev/input/event9'
+
+
+class FakeDeviceTree:
+    def __init__(self, root=None):
+        self.owned = root is None
+        self.root = root or tempfile.mkdtemp(prefix='reterminal-fs-')
+        for relative, content in FILES.items():
+            self.write(relative, content)
+        os.makedirs(os.path.dirname(self.path(ACCEL_DEVICE)), exist_ok=True)
+        if not os.path.exists(self.path(ACCEL_DEVICE)):
+            os.mkfifo(self.path(ACCEL_DEVICE))
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def write(self, relative, content):
+        """Create or change a file, e.g. a new sensor value"""
+        path = self.path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def environ(self):
+        """Environment that points the apps at this tree"""
+        env = dict(os.environ)
+        env['RETERMINAL_FS_ROOT'] = self.root
+        return env
+
+    def close(self):
+        if self.owned:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def sample_frames(count, start=0):
+    """count accelerometer samples as evdev bytes (X, Y, Z, SYN_REPORT each)"""
+    frame = struct.Struct(EVENT_FORMAT * 4)
+    now = time.time()
+    out = bytearray()
+    for i in range(start, start + count):
+        t = now + (i - start) * 0.0025  # 400 Hz
+        sec = int(t)
+        usec = int((t - sec) * 1e6)
+        x, y, z = (i * 7) % 200 - 100, (i * 13) % 200 - 100, 1000 + i % 20
+        out += frame.pack(sec, usec, EV_ABS, ABS_X, x,
+                          sec, usec, EV_ABS, ABS_Y, y,
+                          sec, usec, EV_ABS, ABS_Z, z,
+                          sec, usec, EV_SYN, SYN_REPORT, 0)
+    return bytes(out)
+
+
+class FakeAccelerometer:
+    """Writes evdev frames into the tree's event9 FIFO from a thread"""
+
+    def __init__(self, tree):
+        self.path = tree.path(ACCEL_DEVICE)
+        self.fd = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.samples = 0
+
+    def open(self):
+        # Blocks until the reader (AccelerometerStream) has opened the FIFO
+        self.fd = os.open(self.path, os.O_WRONLY)
+
+    def write_all(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+
+    def burst(self, samples, chunk=1024):
+        """Write samples as fast as the reader takes them"""
+        for start in range(0, samples, chunk):
+            self.write_all(sample_frames(min(chunk, samples - start), start))
+        self.samples += samples
+
+    def stream(self, rate=400.0):
+        """Emit samples at rate Hz until stop(), like the real sensor"""
+        def run():
+            interval = 1.0 / rate
+            deadline = time.monotonic()
+            while not self.stop_event.is_set():
+                self.write_all(sample_frames(1, self.samples))
+                self.samples += 1
+                deadline += interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(1)
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+How many nodes the fleet view can follow
+For each fleet size, starts fleet_sim in its own process and polls every
+node once per interval with FleetCollector for a few seconds, reporting:
+
+  polls/s    achieved against the target of nodes / interval
+  latency    p50/p99 of a poll, request to parsed response
+  cpu        collector CPU as a percentage of one core
+  render     FleetView refresh time with every visible row changed
+             (needs a display; skipped without one)
+
+A size is sustained when at least 95% of the target polls complete and the
+collector stays under 80% of a core.
+
+    python3 benchmarks/fleet_bench.py [--sizes 50,100,200,500,1000]
+        [--interval 1.0] [--seconds 5] [--json] [--output FILE]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from fleet_collector import FleetCollector, load_nodes
+from fleet_sim import raise_fd_limit
+
+
+def start_simulator(count, path):
+    simulator = subprocess.Popen(
+        [sys.executable, os.path.join(APP_DIR, 'benchmarks', 'fleet_sim.py'),
+         '--nodes', str(count), '--write', path],
+        stdout=subprocess.PIPE, text=True)
+    simulator.stdout.readline()  # printed once every node is listening
+    return simulator
+
+
+def measure_collector(nodes, interval, seconds, concurrency):
+    loop = asyncio.new_event_loop()
+    collector = FleetCollector(nodes, interval=interval, concurrency=concurrency)
+    collector.start(loop)
+    # The first interval staggers the initial polls; measure after it
+    loop.run_until_complete(asyncio.sleep(interval))
+    polls = collector.polls
+    cpu = time.process_time()
+    started = time.monotonic()
+    collector.latency.reset()
+    loop.run_until_complete(asyncio.sleep(seconds))
+    elapsed = time.monotonic() - started
+    report = {
+        'target_polls_per_second': len(nodes) / interval,
+        'polls_per_second': (collector.polls - polls) / elapsed,
+        'cpu_percent': (time.process_time() - cpu) / elapsed * 100,
+        'latency': collector.latency.summary(),
+        'timeouts': collector.timeouts,
+        'errors': collector.errors,
+        'connects': sum(node.connection.connects for node in nodes),
+    }
+    collector.stop()
+    loop.close()
+    return report
+
+
+def measure_render(nodes, frames=50):
+    """Median/max FleetView.render with every visible node dirty, or None"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from fleet_view import FleetView
+    view = FleetView(root, container=tk.Frame(root), nodes=nodes)
+    times = []
+    for i in range(frames):
+        for node in nodes:
+            node.latency = (i % 7 + 1) / 1000  # changes a cell of every row
+        started = time.perf_counter()
+        view.render(set(nodes))
+        root.update_idletasks()
+        times.append(time.perf_counter() - started)
+    root.destroy()
+    times.sort()
+    return {'median_ms': times[len(times) // 2] * 1000, 'max_ms': times[-1] * 1000}
+
+
+def main():
+    raise_fd_limit()
+    sizes = [50, 100, 200, 500, 1000]
+    if '--sizes' in sys.argv:
+        sizes = [int(n) for n in sys.argv[sys.argv.index('--sizes') + 1].split(',')]
+    interval = float(sys.argv[sys.argv.index('--interval') + 1]) if '--interval' in sys.argv else 1.0
+    seconds = float(sys.argv[sys.argv.index('--seconds') + 1]) if '--seconds' in sys.argv else 5.0
+
+    results = []
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'fleet.txt')
+            simulator = start_simulator(count, path)
+            try:
+                nodes = load_nodes(path)
+                result = measure_collector(nodes, interval, seconds, concurrency=64)
+                result['nodes'] = count
+                result['render'] = measure_render(nodes)
+            finally:
+                simulator.terminate()
+                simulator.wait()
+        result['sustained'] = (result['polls_per_second'] >= 0.95 * result['target_polls_per_second']
+                               and result['cpu_percent'] < 80)
+        results.append(result)
+
+    report = {'interval': interval, 'seconds': seconds, 'sizes': results,
+              'max_sustained': max([r['nodes'] for r in results if r['sustained']], default=0)}
+    if '--output' in sys.argv:
+        with open(sys.argv[sys.argv.index('--output') + 1], 'w') as f:
+            json.dump(report, f, indent=2)
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'nodes':>6}{'polls/s':>10}{'target':>8}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'cpu %':>7}{'render ms':>11}  sustained")
+    for r in results:
+        render = f"{r['render']['median_ms']:.2f}" if r['render'] else "-"
+        print(f"{r['nodes']:>6}{r['polls_per_second']:>10.0f}{r['target_polls_per_second']:>8.0f}"
+              f"{r['latency']['p50_ms']:>8.1f}{r['latency']['p99_ms']:>8.1f}"
+              f"{r['cpu_percent']:>7.0f}{render:>11}  {'yes' if r['sustained'] else 'no'}")
+    print(f"Largest fleet sustained at one poll per {interval:g} s: {report['max_sustained']} nodes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Stand-in for a fleet of reTerminal units
+Serves N simulated nodes from one asyncio process, each on its own
+127.0.0.1 port with its own MetricsExporter, so responses (text, ETags,
+304s, keep-alive) are exactly those of a real node. Readings drift every
+second; a fraction of nodes can be made slow or dead (accepting
+connections but never answering) to exercise timeouts.
+
+    python3 benchmarks/fleet_sim.py --nodes 200 --write /tmp/fleet.txt
+    python3 fleet_view.py --nodes /tmp/fleet.txt
+
+Options: --change P (chance a node's readings change each second, 0.5),
+--delay MS (extra response time), --dead FRACTION, --seed N
+"""
+
+import asyncio
+import os
+import random
+import resource
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from metrics_exporter import MetricsExporter
+
+
+class SimulatedNode:
+    def __init__(self, index, rng, change=0.5, dead=False):
+        self.name = f"node-{index:04d}"
+        self.rng = rng
+        self.change = change
+        self.dead = dead
+        self.port = None
+        self.exporter = MetricsExporter()
+        self.cpu = rng.uniform(2, 60)
+        self.temperature = rng.uniform(40, 70)
+        self.boot = time.time() - rng.uniform(600, 30 * 86400)
+        self.updated = 0.0
+        self.exporter.update('hostname', self.name)
+        self.exporter.update('memory', rng.uniform(10, 80))
+        self.exporter.update('disk', rng.uniform(20, 90))
+        self.tick(time.monotonic())
+
+    def tick(self, now):
+        """New readings at most once a second, like the nodes' own sources"""
+        if now - self.updated < 1.0:
+            return
+        self.updated = now
+        if self.rng.random() >= self.change:
+            return
+        self.cpu = min(max(self.cpu + self.rng.gauss(0, 5), 0), 100)
+        self.temperature = min(max(self.temperature + self.rng.gauss(0, 0.5), 30), 85)
+        self.exporter.update('cpu', round(self.cpu, 1))
+        self.exporter.update('temperature', round(self.temperature, 1))
+        self.exporter.update('uptime', int(time.time() - self.boot))
+
+
+class FleetSimulator:
+    def __init__(self, count, change=0.5, delay=0.0, dead=0.0, seed=1):
+        rng = random.Random(seed)
+        self.delay = delay
+        dead_count = int(count * dead)
+        self.nodes = [SimulatedNode(i, random.Random(rng.random()), change, i < dead_count)
+                      for i in range(count)]
+        self.servers = []
+        self.requests = 0
+
+    async def start(self, host='127.0.0.1'):
+        for node in self.nodes:
+            server = await asyncio.start_server(
+                lambda r, w, node=node: self.serve(node, r, w), host, 0)
+            node.port = server.sockets[0].getsockname()[1]
+            self.servers.append(server)
+
+    def write_nodes(self, path):
+        with open(path + '.tmp', 'w') as f:
+            for node in self.nodes:
+                f.write(f"{node.name} 127.0.0.1:{node.port}\n")
+        os.replace(path + '.tmp', path)  # readers never see half a list
+
+    async def serve(self, node, reader, writer):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                etag = None
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.partition(b':')
+                    if name.strip().lower() == b'if-none-match':
+                        etag = value.strip().decode()
+                if node.dead:
+                    await asyncio.sleep(3600)
+                self.requests += 1
+                node.tick(time.monotonic())
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                current = node.exporter.etag(openmetrics=False)
+                if etag == current:
+                    writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {current}\r\n"
+                                 f"Content-Length: 0\r\n\r\n".encode())
+                else:
+                    body = node.exporter.render(openmetrics=False)
+                    writer.write(f"HTTP/1.1 200 OK\r\nETag: {current}\r\n"
+                                 f"Content-Type: text/plain; version=0.0.4\r\n"
+                                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        for server in self.servers:
+            server.close()
+
+
+def raise_fd_limit():
+    """Every node is a listening socket plus a connection"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def option(name, default, kind=float):
+    if name in sys.argv:
+        return kind(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+async def main():
+    raise_fd_limit()
+    simulator = FleetSimulator(option('--nodes', 50, int), change=option('--change', 0.5),
+                               delay=option('--delay', 0.0) / 1000, dead=option('--dead', 0.0),
+                               seed=option('--seed', 1, int))
+    await simulator.start()
+    path = option('--write', None, str)
+    if path:
+        simulator.write_nodes(path)
+    print(f"Simulating {len(simulator.nodes)} nodes"
+          + (f", listed in {path}" if path else ""), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        simulator.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Hardware-free benchmark suite
+Runs the collectors against a generated fake device tree (see fake_device)
+so performance can be tracked on any Linux machine:
+
+  collection   cost of one tick of every metric source, per source
+  evdev        accelerometer events decoded per second, through the FIFO
+               and for the decoder alone
+  simulated    analytics keeping up with the simulated accelerometer at
+               rates far above the hardware's
+  ui_dispatch  submit-to-apply latency of UIDispatcher updates
+  startup      import time of each app, and time to first frame when a
+               display is available, cold and forked from the app zygote
+
+Without a display the UI dispatch runs on a bare Tcl interpreter in one
+thread, and the time to first frame is skipped.
+
+    python3 benchmarks/hardware_free.py [--ticks N] [--json] [--output FILE]
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from fake_device import FakeDeviceTree, FakeAccelerometer, sample_frames
+
+# The tree must exist before the app modules are imported: hardware paths
+# are resolved at import time
+TREE = FakeDeviceTree()
+os.environ['RETERMINAL_FS_ROOT'] = TREE.root
+# Never attach to a sensor daemon that happens to be running on this box
+os.environ['RETERMINAL_SENSOR_SOCKET'] = TREE.path('run/sensors.sock')
+
+import tkinter as tk
+
+from accel_reader import AccelerometerStream
+from metrics_scheduler import MetricScheduler
+from sensor_backends import SimulatedBackend
+from sensor_registry import SensorRegistry
+from system_metrics import SystemMetrics, SensorMetrics
+from ui_dispatcher import UIDispatcher
+try:
+    from vibration import VibrationAnalyzer
+except ImportError:  # numpy not installed; vibration analytics disabled
+    VibrationAnalyzer = None
+
+APPS = ['iot_dashboard', 'hardware_demo', 'touchscreen_demo', 'fleet_view', 'app_launcher']
+
+
+def summarize(samples, scale=1000.0):
+    """Median/p95/max of a list of seconds, in ms by default"""
+    ordered = sorted(samples)
+    return {
+        'median': statistics.median(ordered) * scale,
+        'p95': ordered[int(len(ordered) * 0.95) - 1 if len(ordered) > 1 else 0] * scale,
+        'max': ordered[-1] * scale,
+    }
+
+
+def bench_collection(ticks):
+    """Time every source's read + handler as the scheduler would run it"""
+    sensors = SensorRegistry()
+    accel = AccelerometerStream()  # not started; fed directly below
+    vibration = VibrationAnalyzer(accel.ring) if VibrationAnalyzer else None
+    scheduler = MetricScheduler()
+    emitted = []
+    emit = lambda name, value, t=None: emitted.append(name)
+    SystemMetrics(sensors=sensors).add_to(scheduler, emit)
+    SensorMetrics(accel, vibration, sensors).add_to(scheduler, emit)
+
+    per_source = {source.name: [] for source in scheduler.sources}
+    per_tick = []
+    for tick in range(ticks):
+        # One second of accelerometer data arrives between ticks
+        accel.decode(memoryview(sample_frames(400, tick * 400)))
+        tick_start = time.perf_counter()
+        for source in scheduler.sources:
+            start = time.perf_counter()
+            source.run()
+            per_source[source.name].append(time.perf_counter() - start)
+        per_tick.append(time.perf_counter() - tick_start)
+    sensors.close()
+    return {
+        'ticks': ticks,
+        'tick_ms': summarize(per_tick),
+        'source_us': {name: statistics.mean(times) * 1e6 for name, times in per_source.items()},
+        'emitted_per_tick': len(emitted) / ticks,
+    }
+
+
+def bench_evdev(samples):
+    """Decoded events per second: through the FIFO, and decoder only"""
+    stream = AccelerometerStream(device=TREE.path('dev/input/event9'), capacity=4096)
+    stream.start()
+    writer = FakeAccelerometer(TREE)
+    writer.open()
+    expected = samples * 4
+    start = time.perf_counter()
+    writer.burst(samples)
+    while stream.events < expected and time.perf_counter() - start < 30:
+        time.sleep(0.0005)
+    fifo_elapsed = time.perf_counter() - start
+    decoded = stream.events
+    writer.stop()
+    stream.stop()
+
+    data = memoryview(sample_frames(samples))
+    decoder = AccelerometerStream(device=None)
+    start = time.perf_counter()
+    decoder.decode(data)
+    decode_elapsed = time.perf_counter() - start
+    return {
+        'samples': samples,
+        'fifo_events_per_s': decoded / fifo_elapsed,
+        'fifo_events_lost': expected - decoded,
+        'decode_events_per_s': decoder.events / decode_elapsed,
+    }
+
+
+def bench_simulated(rate, seconds=2.0):
+    """Run the simulator at rate Hz and analyse every window as the UI tick would"""
+    accel = SimulatedBackend(rate=rate).accelerometer()
+    analyzer = VibrationAnalyzer(accel.ring) if VibrationAnalyzer else None
+    windows = []
+    if analyzer is not None:
+        analyzer.on_window = windows.append
+    accel.start()
+    analysis = 0.0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if analyzer is not None:
+            start = time.perf_counter()
+            analyzer.update()
+            analysis += time.perf_counter() - start
+    accel.stop()
+    return {
+        'target_hz': rate,
+        'achieved_hz': accel.ring.rate(1024),
+        'events': accel.events,
+        'windows': len(windows),
+        'analysis_ms_per_window': analysis / len(windows) * 1000 if windows else None,
+    }
+
+
+def bench_ui_dispatch(ticks, widgets=8):
+    """Latency from submit() to the update being applied"""
+    latencies = []
+
+    def record(value):
+        latencies.append(time.perf_counter() - value[1])
+
+    if os.environ.get('DISPLAY'):
+        # The real arrangement: a worker thread submits, Tk applies
+        root = tk.Tk()
+        ui = UIDispatcher(root)
+
+        def worker():
+            for tick in range(ticks):
+                with ui.batch():
+                    for key in range(widgets):
+                        ui.submit(key, (tick, time.perf_counter()), record)
+                time.sleep(0.01)
+            root.after(200, root.quit)
+
+        root.after(100, threading.Thread(target=worker, daemon=True).start)
+        root.mainloop()
+        root.destroy()
+        mode = 'tk, worker thread'
+    else:
+        # No display: a bare Tcl interpreter runs the same after() callbacks
+        root = tk.Tcl()
+        ui = UIDispatcher(root)
+        for tick in range(ticks):
+            with ui.batch():
+                for key in range(widgets):
+                    ui.submit(key, (tick, time.perf_counter()), record)
+            while ui.scheduled:
+                root.tk.dooneevent()
+        mode = 'tcl, single thread'
+    return {
+        'mode': mode,
+        'updates': len(latencies),
+        'latency_ms': summarize(latencies),
+        'dispatcher': ui.stats(),
+    }
+
+
+def import_time(module, rounds):
+    """Seconds to start python3 and import an app module, minus bare startup"""
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=APP_DIR, check=True,
+                       stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    baseline = statistics.median(run('pass') for _ in range(rounds))
+    return statistics.median(run(f'import {module}') for _ in range(rounds)) - baseline
+
+
+def bench_startup(rounds):
+    results = {}
+    for module in APPS:
+        results[module] = {'import_ms': import_time(module, rounds) * 1000}
+    if os.environ.get('DISPLAY'):
+        from switch_latency import spawn_latency
+        for module in APPS:
+            first_frame = [spawn_latency(f'{module}.py') for _ in range(rounds)]
+            results[module]['first_frame_ms'] = statistics.median(first_frame) * 1000
+        # The same apps forked from the pre-imported zygote
+        from app_zygote import AppZygote, APPS as ZYGOTE_APPS
+        from zygote_launch import warm_latency
+        zygote = AppZygote(APP_DIR)
+        try:
+            if zygote.wait_ready():
+                for filename in ZYGOTE_APPS:
+                    warm = [warm_latency(zygote, filename) for _ in range(rounds)]
+                    results[filename[:-3]]['warm_first_frame_ms'] = statistics.median(warm) * 1000
+        finally:
+            zygote.close()
+    return results
+
+
+def main():
+    ticks = 200
+    if '--ticks' in sys.argv:
+        ticks = int(sys.argv[sys.argv.index('--ticks') + 1])
+
+    try:
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'numpy': VibrationAnalyzer is not None,
+                'display': bool(os.environ.get('DISPLAY')),
+            },
+            'collection': bench_collection(ticks),
+            'evdev': bench_evdev(50000),
+            'simulated': [bench_simulated(rate) for rate in (400, 5000, 20000)],
+            'ui_dispatch': bench_ui_dispatch(ticks),
+            'startup': bench_startup(5),
+        }
+    finally:
+        TREE.close()
+
+    if '--output' in sys.argv:
+        with open(sys.argv[sys.argv.index('--output') + 1], 'w') as f:
+            json.dump(report, f, indent=2)
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+
+    c = report['collection']
+    print(f"collection   {c['tick_ms']['median']:.3f} ms/tick median, "
+          f"{c['tick_ms']['p95']:.3f} ms p95")
+    for name, us in sorted(c['source_us'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<12}{us:>10.1f} us")
+    e = report['evdev']
+    print(f"evdev        {e['fifo_events_per_s']:,.0f} events/s via FIFO "
+          f"({e['fifo_events_lost']} lost), {e['decode_events_per_s']:,.0f} decode only")
+    for s in report['simulated']:
+        per_window = s['analysis_ms_per_window']
+        print(f"simulated    {s['target_hz']:>6} Hz target, {s['achieved_hz']:,.0f} Hz achieved, "
+              f"{s['windows']} windows" +
+              (f", {per_window:.3f} ms each" if per_window is not None else ''))
+    u = report['ui_dispatch']
+    print(f"ui_dispatch  {u['latency_ms']['median']:.3f} ms median, "
+          f"{u['latency_ms']['max']:.3f} ms max ({u['mode']})")
+    for module, s in report['startup'].items():
+        frame = f", first frame {s['first_frame_ms']:.0f} ms" if 'first_frame_ms' in s else ''
+        if 'warm_first_frame_ms' in s:
+            frame += f" ({s['warm_first_frame_ms']:.0f} ms from the zygote)"
+        print(f"startup      {module:<18} import {s['import_ms']:.0f} ms{frame}")
+
+
+if __name__ == "__main__":
+    main()
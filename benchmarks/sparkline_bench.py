@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Sparkline redraw benchmark
+Draws eight 3600-point trend charts on a 1280x720 window and times one
+frame: updating every chart plus Tk's redraw. Target: under 5 ms per frame.
+
+Needs a display for the full measurement; without one only the
+decimation and scaling maths is timed.
+
+    python3 benchmarks/sparkline_bench.py [--frames N] [--json]
+"""
+
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sparkline import Sparkline, np
+
+CHARTS = 8
+POINTS = 3600
+TARGET_MS = 5.0
+
+
+def make_series(seed, length):
+    rng = random.Random(seed)
+    return [50 + 30 * math.sin(i / 200 + seed) + rng.uniform(-5, 5) for i in range(length)]
+
+
+def sliding_windows(frames):
+    """Per chart, a list of POINTS-long windows sliding one sample per frame,
+    like successive MetricsHistory windows"""
+    series = [make_series(i, POINTS + frames) for i in range(CHARTS)]
+    if np is not None:
+        series = [np.array(values) for values in series]
+    return series
+
+
+def bench_decimate(frames):
+    series = sliding_windows(frames)
+    chart = Sparkline.__new__(Sparkline)  # coordinate maths only, no Canvas
+    chart.chart_width, chart.chart_height = 600, 80
+    chart.min_value, chart.max_value = 0, 100
+    coords = chart.coords_numpy if np is not None else chart.coords_python
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        for values in series:
+            coords(values[frame:frame + POINTS])
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_tk(frames):
+    root = tk.Tk()
+    root.geometry("1280x720")
+    charts = []
+    for i in range(CHARTS):
+        chart = Sparkline(root, width=600, height=80, min_value=0, max_value=100)
+        chart.grid(row=i // 2, column=i % 2, padx=10, pady=5)
+        charts.append(chart)
+    series = sliding_windows(frames)
+    root.update()
+
+    times = []
+    for frame in range(frames):
+        start = time.perf_counter()
+        for chart, values in zip(charts, series):
+            chart.set_data(values[frame:frame + POINTS])
+        root.update_idletasks()
+        times.append(time.perf_counter() - start)
+    root.destroy()
+    return times
+
+
+def summary(times):
+    ms = sorted(t * 1000 for t in times)
+    return {
+        'mean_ms': statistics.mean(ms),
+        'p95_ms': ms[int(len(ms) * 0.95) - 1],
+        'max_ms': ms[-1],
+    }
+
+
+def main():
+    frames = 200
+    if '--frames' in sys.argv:
+        frames = int(sys.argv[sys.argv.index('--frames') + 1])
+
+    report = {'charts': CHARTS, 'points': POINTS, 'target_ms': TARGET_MS,
+              'coords': summary(bench_decimate(frames))}
+    try:
+        report['frame'] = summary(bench_tk(frames))
+        report['within_target'] = report['frame']['p95_ms'] < TARGET_MS
+    except tk.TclError as e:
+        report['frame'] = None
+        report['skipped'] = f"no display: {e}"
+
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+    d = report['coords']
+    print(f"decimate+scale x{CHARTS}: mean {d['mean_ms']:.2f} ms, p95 {d['p95_ms']:.2f} ms")
+    if report['frame'] is None:
+        print(f"frame: skipped ({report['skipped']})")
+    else:
+        f = report['frame']
+        verdict = "OK" if report['within_target'] else "OVER TARGET"
+        print(f"frame x{CHARTS}: mean {f['mean_ms']:.2f} ms, p95 {f['p95_ms']:.2f} ms, "
+              f"max {f['max_ms']:.2f} ms ({verdict}, target {TARGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
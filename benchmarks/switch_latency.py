@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Screen switch latency benchmark
+Compares launching each app as a new python3 process (the old launcher
+behaviour) with switching to it in-process via ScreenHost.
+
+Needs a display: run with DISPLAY=:0 on the reTerminal.
+
+    python3 benchmarks/switch_latency.py [--rounds N] [--json]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tkinter as tk
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import startup_probe
+from screen_host import ScreenHost, SCREENS
+
+
+def spawn_latency(filename, timeout=30):
+    """Seconds from Popen to the child's first painted frame"""
+    read_fd, write_fd = os.pipe()
+    env = dict(os.environ)
+    env[startup_probe.READY_FD_ENV] = str(write_fd)
+    start = time.monotonic()
+    child = subprocess.Popen([sys.executable, os.path.join(APP_DIR, filename)],
+                             cwd=APP_DIR, env=env, pass_fds=(write_fd,))
+    os.close(write_fd)
+    try:
+        with os.fdopen(read_fd, 'rb') as pipe:
+            line = pipe.readline()
+        if not line:
+            raise RuntimeError(f"{filename} exited before drawing a frame")
+        return float(line) - start
+    finally:
+        child.terminate()
+        try:
+            child.wait(timeout)
+        except subprocess.TimeoutExpired:
+            child.kill()
+
+
+def in_process_latency(rounds):
+    """Per-app (first switch, warm switches, back-to-menu) in seconds"""
+    root = tk.Tk()
+    root.geometry("1280x720")
+    menu = tk.Frame(root)
+    tk.Label(menu, text="menu").pack()
+    menu.pack(fill='both', expand=True)
+    host = ScreenHost(root, menu)
+    root.update()
+
+    results = {}
+    for filename in SCREENS:
+        host.show(filename)
+        root.update()
+        first = host.last_switch_time
+        warm, back = [], []
+        for _ in range(rounds):
+            host.show_home()
+            root.update()
+            back.append(host.last_switch_time)
+            host.show(filename)
+            root.update()
+            warm.append(host.last_switch_time)
+        host.show_home()
+        results[filename] = (first, warm, back)
+
+    host.close()
+    root.destroy()
+    return results
+
+
+def main():
+    rounds = 5
+    if '--rounds' in sys.argv:
+        rounds = int(sys.argv[sys.argv.index('--rounds') + 1])
+
+    report = {}
+    for filename, (first, warm, back) in in_process_latency(rounds).items():
+        spawned = [spawn_latency(filename) for _ in range(rounds)]
+        report[filename] = {
+            'subprocess_ms': statistics.median(spawned) * 1000,
+            'in_process_first_ms': first * 1000,
+            'in_process_warm_ms': statistics.median(warm) * 1000,
+            'back_to_menu_ms': statistics.median(back) * 1000,
+        }
+
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'app':<22}{'subprocess':>12}{'first':>10}{'warm':>10}{'back':>10}")
+    for filename, r in report.items():
+        print(f"{filename:<22}{r['subprocess_ms']:>10.1f}ms"
+              f"{r['in_process_first_ms']:>8.1f}ms"
+              f"{r['in_process_warm_ms']:>8.1f}ms"
+              f"{r['back_to_menu_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
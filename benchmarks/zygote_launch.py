@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Cold vs warm app launch benchmark
+Time from the launch request to each app's first painted frame, started
+as a fresh python3 (cold) and forked from the app zygote (warm). The
+target for IoTDashboard and HardwareDemo on the CM4 is under 300 ms warm.
+
+Needs a display: run with DISPLAY=:0 on the reTerminal.
+
+    python3 benchmarks/zygote_launch.py [--rounds N] [--json]
+"""
+
+import json
+import os
+import signal
+import statistics
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import psutil
+
+from app_zygote import AppZygote, APPS
+from switch_latency import spawn_latency
+
+TARGET_MS = 300
+
+
+def warm_latency(zygote, filename, timeout=30):
+    """Seconds from the fork request to the child's first painted frame"""
+    read_fd, write_fd = os.pipe()
+    start = time.monotonic()
+    child = zygote.spawn(filename, ready_fd=write_fd)
+    os.close(write_fd)
+    if child is None:
+        os.close(read_fd)
+        raise RuntimeError(f"zygote could not launch {filename}")
+    try:
+        with os.fdopen(read_fd, 'rb') as pipe:
+            line = pipe.readline()
+        if not line:
+            raise RuntimeError(f"{filename} exited before drawing a frame")
+        return float(line) - start
+    finally:
+        try:
+            os.killpg(child.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        child.wait(timeout)
+
+
+def main():
+    rounds = 5
+    if '--rounds' in sys.argv:
+        rounds = int(sys.argv[sys.argv.index('--rounds') + 1])
+
+    start = time.monotonic()
+    zygote = AppZygote(APP_DIR)
+    if not zygote.wait_ready():
+        print("App zygote did not start")
+        sys.exit(1)
+    report = {
+        'zygote': {
+            'ready_ms': (time.monotonic() - start) * 1000,
+            'rss_mb': psutil.Process(zygote.process.pid).memory_info().rss / (1024 * 1024),
+        },
+        'apps': {},
+    }
+    try:
+        for filename in APPS:
+            cold = [spawn_latency(filename) for _ in range(rounds)]
+            warm = [warm_latency(zygote, filename) for _ in range(rounds)]
+            report['apps'][filename] = {
+                'cold_ms': statistics.median(cold) * 1000,
+                'warm_ms': statistics.median(warm) * 1000,
+                'warm_max_ms': max(warm) * 1000,
+            }
+    finally:
+        zygote.close()
+
+    if '--json' in sys.argv:
+        print(json.dumps(report, indent=2))
+        return
+
+    z = report['zygote']
+    print(f"zygote ready in {z['ready_ms']:.0f} ms, {z['rss_mb']:.1f} MB RSS")
+    print(f"{'app':<22}{'cold':>10}{'warm':>10}{'warm max':>11}")
+    for filename, r in report['apps'].items():
+        flag = '' if r['warm_ms'] < TARGET_MS else f"  over {TARGET_MS} ms target"
+        print(f"{filename:<22}{r['cold_ms']:>8.0f}ms{r['warm_ms']:>8.0f}ms"
+              f"{r['warm_max_ms']:>9.0f}ms{flag}")
+
+
+if __name__ == "__main__":
+    main()
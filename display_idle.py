@@ -0,0 +1,81 @@
+"""
+Idle detection for reTerminal screens
+Reports when nobody can see the app: its window is unmapped or iconified,
+or the LCD backlight is switched off. Apps suspend their polling while
+idle and resume (with fresh readings) when the display is back.
+
+Backlight: /sys/class/backlight/*/bl_power (0 = on) and brightness
+"""
+
+import glob
+import os
+
+from hw_paths import hw_path
+
+BACKLIGHT_DIRS = hw_path('/sys/class/backlight/*')
+
+
+class DisplayIdleMonitor:
+    def __init__(self, root, on_idle, on_active, interval=5000):
+        self.root = root
+        self.on_idle = on_idle
+        self.on_active = on_active
+        self.interval = interval  # ms between backlight checks
+        self.unmapped = False
+        self.display_off = False
+        self.idle = False
+        self.suspensions = 0
+
+        # Backlight attribute files, opened once and read with pread
+        self.fds = []
+        for directory in sorted(glob.glob(BACKLIGHT_DIRS)):
+            for attribute in ('bl_power', 'brightness'):
+                try:
+                    fd = os.open(os.path.join(directory, attribute), os.O_RDONLY)
+                except OSError:
+                    continue
+                self.fds.append((attribute, fd))
+
+        root.bind('<Unmap>', self.on_unmap, add='+')
+        root.bind('<Map>', self.on_map, add='+')
+        if self.fds:
+            self.root.after(self.interval, self.poll_backlight)
+
+    def on_unmap(self, event):
+        # Child widgets' events reach the root binding too; only the
+        # window itself going away (or being iconified) counts
+        if event.widget is self.root:
+            self.unmapped = True
+            self.update()
+
+    def on_map(self, event):
+        if event.widget is self.root:
+            self.unmapped = False
+            self.update()
+
+    def backlight_off(self):
+        for attribute, fd in self.fds:
+            try:
+                value = int(os.pread(fd, 16, 0))
+            except (OSError, ValueError):
+                continue
+            if (attribute == 'bl_power' and value != 0) or \
+               (attribute == 'brightness' and value == 0):
+                return True
+        return False
+
+    def poll_backlight(self):
+        self.display_off = self.backlight_off()
+        self.update()
+        self.root.after(self.interval, self.poll_backlight)
+
+    def update(self):
+        idle = self.unmapped or self.display_off
+        if idle == self.idle:
+            return
+        self.idle = idle
+        if idle:
+            self.suspensions += 1
+            self.on_idle()
+        else:
+            self.on_active()
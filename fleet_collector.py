@@ -0,0 +1,345 @@
+"""
+Concurrent metrics collection from many reTerminal units
+Polls the /metrics endpoint (metrics_exporter, or sensor_daemon
+--metrics-port) of every node from one asyncio loop:
+
+- one keep-alive HTTP connection per node, reused across polls
+- at most `concurrency` requests in flight, however many nodes there are
+- a timeout per poll; a node that times out gets a fresh connection
+- If-None-Match with the last ETag, so an unchanged node answers with an
+  empty 304 and costs no parsing
+- polls are spread evenly over the interval instead of bursting
+
+Results are merged into FleetNode rows in place; take_dirty() returns the
+nodes whose values or status changed since the last call, so a view only
+redraws those.
+
+Node lists have one node per line, "[name] host[:port][/path]":
+
+    kitchen 192.168.1.20
+    192.168.1.21:9100
+"""
+
+import asyncio
+import os
+import re
+import time
+
+from latency_histogram import LatencyHistogram
+from metrics_exporter import DEFAULT_PORT
+
+FLEET_FILE = os.path.expanduser('~/.config/reterminal/fleet.txt')
+
+# Row column -> exported family (Prometheus text names)
+FLEET_COLUMNS = {
+    b'reterminal_cpu_usage_percent': 'cpu',
+    b'reterminal_memory_usage_percent': 'memory',
+    b'reterminal_disk_usage_percent': 'disk',
+    b'reterminal_cpu_temperature_celsius': 'temperature',
+    b'reterminal_uptime_seconds': 'uptime',
+}
+INFO_PREFIX = b'reterminal_network_info{'
+HOSTNAME_LABEL = re.compile(rb'hostname="((?:[^"\\]|\\.)*)"')
+
+# Largest response accepted; a full exposition is about 3 kB
+MAX_BODY = 1 << 20
+
+
+class FleetNode:
+    __slots__ = ('name', 'host', 'port', 'path', 'connection', 'etag', 'values',
+                 'status', 'kind', 'last_seen', 'latency', 'polls', 'failures')
+
+    def __init__(self, name, host, port=DEFAULT_PORT, path='/metrics'):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.path = path
+        self.connection = NodeConnection(host, port, path)
+        self.etag = None
+        self.values = {}  # column -> value, plus 'hostname'
+        self.status = 'waiting'  # 'ok', 'timeout' or an error message
+        # status without the details: 'HTTP' or the exception class name
+        # for errors; the collector counts nodes by this
+        self.kind = 'waiting'
+        self.last_seen = None
+        self.latency = None  # seconds, of the last successful poll
+        self.polls = 0
+        self.failures = 0
+
+
+def parse_node(line):
+    """FleetNode from "[name] host[:port][/path]", None for blanks and comments"""
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+    parts = line.split()
+    if len(parts) > 2:
+        raise ValueError(f"expected \"[name] host[:port][/path]\", got {line!r}")
+    address = parts[-1]
+    address, slash, path = address.partition('/')
+    host, colon, port = address.rpartition(':') if ':' in address else (address, '', '')
+    if not host:
+        raise ValueError(f"no host in {parts[-1]!r}")
+    if port and not (port.isdigit() and 0 < int(port) < 65536):
+        raise ValueError(f"{port!r} is not a port number")
+    name = parts[0] if len(parts) > 1 else address
+    return FleetNode(name, host, int(port) if port else DEFAULT_PORT,
+                     '/' + path if slash else '/metrics')
+
+
+def parse_nodes(text, source='<nodes>'):
+    """Nodes in text; lines that don't parse are reported and skipped"""
+    nodes = []
+    for number, line in enumerate(text.splitlines(), 1):
+        try:
+            node = parse_node(line)
+        except ValueError as e:
+            print(f"Fleet nodes {source}:{number}: {e}")
+            continue
+        if node is not None:
+            nodes.append(node)
+    return nodes
+
+
+def load_nodes(path=FLEET_FILE):
+    """Nodes listed in path; [] if it doesn't exist"""
+    try:
+        with open(path) as f:
+            return parse_nodes(f.read(), path)
+    except OSError:
+        return []
+
+
+def parse_metrics(body):
+    """Fleet columns from Prometheus exposition text"""
+    values = {}
+    for line in body.split(b'\n'):
+        if not line or line[0] == 35:  # '#'
+            continue
+        if line.startswith(INFO_PREFIX):
+            match = HOSTNAME_LABEL.search(line)
+            if match:
+                values['hostname'] = match.group(1).decode(errors='replace')
+            continue
+        name, _, value = line.rpartition(b' ')
+        column = FLEET_COLUMNS.get(name)
+        if column is not None:
+            try:
+                values[column] = float(value)
+            except ValueError:
+                pass
+    return values
+
+
+class NodeConnection:
+    """Minimal HTTP/1.1 keep-alive client for one node's metrics"""
+
+    def __init__(self, host, port, path='/metrics'):
+        self.host = host
+        self.port = port
+        self.request_head = (f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                             f"Accept: text/plain\r\n")
+        self.reader = self.writer = None
+        self.connects = 0
+
+    async def fetch(self, etag=None):
+        """(status, etag, body); reconnects once if a reused connection was closed"""
+        reused = self.writer is not None
+        try:
+            return await self.request(etag)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            self.close()
+            if not reused:
+                raise
+        # The node closed an idle connection between polls
+        return await self.request(etag)
+
+    async def request(self, etag):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.connects += 1
+        head = self.request_head
+        if etag is not None:
+            head += f"If-None-Match: {etag}\r\n"
+        self.writer.write((head + "\r\n").encode())
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed")
+        status = int(status_line.split(None, 2)[1])
+        length = 0
+        new_etag = None
+        keep_alive = True
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n'):
+                break
+            if not line:
+                raise ConnectionResetError("connection closed in headers")
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                length = int(value)
+            elif name == b'etag':
+                new_etag = value.strip().decode()
+            elif name == b'connection' and value.strip().lower() == b'close':
+                keep_alive = False
+        if length > MAX_BODY:
+            raise ValueError(f"response of {length} bytes")
+        body = await self.reader.readexactly(length) if length else b''
+        if not keep_alive:
+            self.close()
+        return status, new_etag, body
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+class FleetCollector:
+    def __init__(self, nodes, interval=5.0, concurrency=32, timeout=2.0):
+        self.nodes = nodes
+        self.interval = interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.loop = None
+        self.running = False
+        self.tasks = set()
+        self.semaphore = None
+        self.dirty = set()  # nodes changed since the last take_dirty()
+        self.counts = {'waiting': len(nodes)}  # node kind -> nodes
+
+        self.latency = LatencyHistogram()
+        self.polls = 0
+        self.changed = 0
+        self.not_modified = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.bytes = 0
+        self.started = None
+        self.polls_at_start = 0  # polls/s covers the current run only
+
+    def start(self, loop):
+        if self.running:
+            return
+        self.running = True
+        self.loop = loop
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.started = time.monotonic()
+        self.polls_at_start = self.polls
+        # Spread the first polls over one interval
+        step = self.interval / max(len(self.nodes), 1)
+        for i, node in enumerate(self.nodes):
+            task = loop.create_task(self.run_node(node, i * step))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    def stop(self):
+        self.running = False
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks and not self.loop.is_running() and not self.loop.is_closed():
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        for node in self.nodes:
+            node.connection.close()
+
+    async def run_node(self, node, offset):
+        await asyncio.sleep(offset)
+        deadline = self.loop.time()
+        while True:
+            async with self.semaphore:
+                await self.poll(node)
+            if not self.running:
+                # wait_for (before 3.12) returns a result that arrives
+                # together with the cancellation instead of raising
+                return
+            deadline += self.interval
+            now = self.loop.time()
+            if deadline < now:
+                # Polls are falling behind; skip the slots that passed
+                deadline += (now - deadline) // self.interval * self.interval + self.interval
+            await asyncio.sleep(deadline - now)
+
+    async def poll(self, node):
+        start = time.monotonic()
+        self.polls += 1
+        node.polls += 1
+        try:
+            status, etag, body = await asyncio.wait_for(
+                node.connection.fetch(node.etag), self.timeout)
+        except asyncio.TimeoutError:
+            # The connection may still deliver a late response; start afresh
+            node.connection.close()
+            self.timeouts += 1
+            self.failed(node, 'timeout')
+            return
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+            node.connection.close()
+            self.errors += 1
+            self.failed(node, str(e) or type(e).__name__, type(e).__name__)
+            return
+        node.latency = time.monotonic() - start
+        self.latency.record(node.latency)
+        node.last_seen = time.time()
+        if status == 304:
+            self.not_modified += 1
+        elif status == 200:
+            self.bytes += len(body)
+            node.etag = etag
+            values = parse_metrics(body)
+            if values != node.values:
+                node.values = values
+                self.changed += 1
+                self.dirty.add(node)
+        else:
+            self.errors += 1
+            self.failed(node, f"HTTP {status}", 'HTTP')
+            return
+        self.set_status(node, 'ok')
+
+    def failed(self, node, status, kind=None):
+        node.failures += 1
+        node.etag = None
+        self.set_status(node, status, kind)
+
+    def set_status(self, node, status, kind=None):
+        """status is shown as is; nodes are counted by kind (default status)"""
+        kind = status if kind is None else kind
+        if node.status == status:
+            return
+        # Keyed by kind, not message, so varied errors can't grow the dict
+        self.counts[node.kind] -= 1
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        node.status = status
+        node.kind = kind
+        self.dirty.add(node)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        ok = self.counts.get('ok', 0)
+        return {
+            'nodes': len(self.nodes),
+            'ok': ok,
+            'failing': len(self.nodes) - ok - self.counts.get('waiting', 0),
+            'polls': self.polls,
+            'polls_per_second': (self.polls - self.polls_at_start) / elapsed if elapsed else 0.0,
+            'changed': self.changed,
+            'not_modified': self.not_modified,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'connects': sum(node.connection.connects for node in self.nodes),
+            'latency': self.latency.summary(),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"{s['nodes']} nodes, {s['ok']} ok, {s['failing']} failing; "
+                f"{s['polls_per_second']:.0f} polls/s, {s['not_modified']} unchanged, "
+                f"{s['timeouts']} timeouts, {s['errors']} errors; "
+                f"poll p50 {s['latency']['p50_ms']:.1f} ms p99 {s['latency']['p99_ms']:.1f} ms")
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Fleet View for reTerminal
+Shows CPU, memory, disk, temperature and uptime of every reTerminal in a
+fleet, polled concurrently from their metrics endpoints (fleet_collector).
+The table has a fixed set of rows; scrolling changes which nodes they show,
+and a refresh only touches the cells of visible nodes that changed, so the
+UI costs the same for ten nodes or a thousand.
+
+    python3 fleet_view.py [--nodes FILE]   # default ~/.config/reterminal/fleet.txt
+"""
+
+# First, so a startup profile sees every import below
+import startup_probe
+import tkinter as tk
+import argparse
+import time
+import supervised_app
+from display_idle import DisplayIdleMonitor
+from fleet_collector import FleetCollector, load_nodes, FLEET_FILE
+from latency_histogram import LatencyHistogram
+from tk_asyncio import get_loop
+
+VISIBLE_ROWS = 14
+REFRESH_MS = 500
+# Heading and width in characters of each column
+COLUMNS = [('Node', 18), ('Status', 10), ('CPU', 7), ('Memory', 8), ('Disk', 7),
+           ('Temp', 8), ('Uptime', 9), ('Poll', 8)]
+
+
+def format_uptime(seconds):
+    days, rest = divmod(int(seconds), 86400)
+    return f"{days}d {rest // 3600:02d}h" if days else f"{rest // 3600}h {rest % 3600 // 60:02d}m"
+
+
+def row_cells(node):
+    """Cell texts of one node's row"""
+    v = node.values
+    def percent(name):
+        return f"{v[name]:.1f}%" if name in v else "-"
+    return (node.name,
+            node.status[:10],
+            percent('cpu'),
+            percent('memory'),
+            percent('disk'),
+            f"{v['temperature']:.1f}°C" if 'temperature' in v else "-",
+            format_uptime(v['uptime']) if 'uptime' in v else "-",
+            f"{node.latency * 1000:.0f} ms" if node.latency is not None else "-")
+
+
+class FleetView:
+    def __init__(self, root, container=None, on_back=None, nodes=None):
+        self.root = root
+        # When hosted inside the launcher's window, widgets live in a frame
+        # and the launcher owns the window itself
+        self.container = container if container is not None else root
+        self.on_back = on_back
+        self.container.configure(bg='#1a252f')
+
+        if container is None:
+            self.root.title("reTerminal Fleet View")
+            self.root.geometry("1280x720")  # reTerminal screen size
+            self.root.attributes('-fullscreen', True)
+            self.root.overrideredirect(True)
+            self.root.bind('<Escape>', self.toggle_fullscreen)
+
+        self.running = False
+        self.nodes = nodes if nodes is not None else load_nodes()
+        self.loop = get_loop(root)
+        self.collector = FleetCollector(self.nodes)
+        self.order = sorted(self.nodes, key=lambda node: node.name)
+        self.problems_first = False
+        self.top = 0  # index in order of the first visible row
+        self.shown = [None] * VISIBLE_ROWS  # node shown in each row
+        self.cells = [[None] * len(COLUMNS) for _ in range(VISIBLE_ROWS)]  # text shown
+        self.refresh_id = None
+        self.render_time = LatencyHistogram()
+        self.cells_updated = 0
+        self.setup_ui()
+        if container is None:
+            # Stop polling while the window is hidden or the display is off
+            self.idle_monitor = DisplayIdleMonitor(root, self.stop_polling, self.start_polling)
+            self.start_polling()
+
+    def setup_ui(self):
+        title = tk.Label(self.container, text="Fleet View",
+                        font=('Arial', 36, 'bold'),
+                        fg='#00d4aa', bg='#1a252f')
+        title.pack(pady=20)
+
+        self.summary_label = tk.Label(self.container, text="",
+                                      font=('Arial', 14),
+                                      fg='#bdc3c7', bg='#1a252f')
+        self.summary_label.pack(pady=5)
+        if not self.nodes:
+            self.summary_label.config(text=f"No nodes configured; list them in {FLEET_FILE}")
+
+        table = tk.Frame(self.container, bg='#1a252f')
+        table.pack(pady=10)
+        for column, (heading, width) in enumerate(COLUMNS):
+            tk.Label(table, text=heading, width=width, anchor='w',
+                     font=('Courier', 14, 'bold'),
+                     fg='#00d4aa', bg='#1a252f').grid(row=0, column=column)
+        self.labels = []
+        for row in range(VISIBLE_ROWS):
+            self.labels.append([tk.Label(table, text="", width=width, anchor='w',
+                                         font=('Courier', 14), fg='white', bg='#1a252f')
+                                for _, width in COLUMNS])
+            for column, label in enumerate(self.labels[row]):
+                label.grid(row=row + 1, column=column)
+
+        controls = tk.Frame(self.container, bg='#1a252f')
+        controls.pack(pady=10)
+        for text, command in (("▲ Page Up", lambda: self.scroll(-VISIBLE_ROWS)),
+                              ("▼ Page Down", lambda: self.scroll(VISIBLE_ROWS))):
+            tk.Button(controls, text=text, font=('Arial', 16, 'bold'),
+                      bg='#34495e', fg='white', width=12, height=2,
+                      command=command).pack(side=tk.LEFT, padx=10)
+        self.sort_button = tk.Button(controls, text="Problems First",
+                                     font=('Arial', 16, 'bold'),
+                                     bg='#34495e', fg='white', width=14, height=2,
+                                     command=self.toggle_sort)
+        self.sort_button.pack(side=tk.LEFT, padx=10)
+        self.container.bind('<MouseWheel>', lambda e: self.scroll(-1 if e.delta > 0 else 1))
+        self.container.bind('<Button-4>', lambda e: self.scroll(-1))
+        self.container.bind('<Button-5>', lambda e: self.scroll(1))
+
+        buttons = tk.Frame(self.container, bg='#1a252f')
+        buttons.pack(side=tk.BOTTOM, pady=20)
+        tk.Button(buttons, text="Back to Launcher",
+                  font=('Arial', 18, 'bold'),
+                  bg='#3498db', fg='white',
+                  width=18, height=2,
+                  command=self.back_to_launcher).pack(side=tk.LEFT, padx=20)
+        tk.Button(buttons, text="Exit",
+                  font=('Arial', 18, 'bold'),
+                  bg='#e74c3c', fg='white',
+                  width=15, height=2,
+                  command=self.close_app).pack(side=tk.LEFT, padx=20)
+
+    def scroll(self, rows):
+        top = min(max(self.top + rows, 0), max(len(self.order) - VISIBLE_ROWS, 0))
+        if top != self.top:
+            self.top = top
+            self.render(set())
+
+    def toggle_sort(self):
+        self.problems_first = not self.problems_first
+        self.sort_button.config(text="By Name" if self.problems_first else "Problems First")
+        self.sort()
+        self.render(set())
+
+    def sort(self):
+        if self.problems_first:
+            self.order.sort(key=lambda node: (node.status == 'ok', node.name))
+        else:
+            self.order.sort(key=lambda node: node.name)
+
+    def refresh(self):
+        dirty = self.collector.take_dirty()
+        if dirty and self.problems_first:
+            self.sort()
+        self.render(dirty)
+        self.refresh_id = self.root.after(REFRESH_MS, self.refresh)
+
+    def render(self, dirty):
+        """Update the cells of rows whose node changed or was scrolled in"""
+        started = time.perf_counter()
+        visible = self.order[self.top:self.top + VISIBLE_ROWS]
+        for row in range(VISIBLE_ROWS):
+            node = visible[row] if row < len(visible) else None
+            if node is self.shown[row] and node not in dirty:
+                continue
+            self.shown[row] = node
+            texts = row_cells(node) if node is not None else ("",) * len(COLUMNS)
+            shown = self.cells[row]
+            for column, text in enumerate(texts):
+                if shown[column] != text:
+                    shown[column] = text
+                    self.labels[row][column].config(
+                        text=text, fg='white' if column != 1 or text in ('ok', '') else '#e74c3c')
+                    self.cells_updated += 1
+        if self.nodes:
+            s = self.collector.stats()
+            self.summary_label.config(
+                text=f"{s['nodes']} nodes: {s['ok']} ok, {s['failing']} failing  |  "
+                     f"{s['polls_per_second']:.0f} polls/s, poll p99 "
+                     f"{s['latency']['p99_ms']:.0f} ms  |  rows {self.top + 1}-"
+                     f"{self.top + len(visible)}  |  render p99 "
+                     f"{self.render_time.percentile(99) * 1000:.1f} ms")
+        self.render_time.record(time.perf_counter() - started)
+
+    def start_polling(self):
+        if self.running:
+            return
+        self.running = True
+        self.collector.start(self.loop)
+        self.refresh()
+
+    def stop_polling(self):
+        self.running = False
+        if self.refresh_id is not None:
+            self.root.after_cancel(self.refresh_id)
+            self.refresh_id = None
+        self.collector.stop()
+
+    def activate(self):
+        """Called by the launcher when this screen is shown"""
+        self.start_polling()
+
+    def deactivate(self):
+        """Called by the launcher when this screen is hidden"""
+        self.stop_polling()
+
+    def toggle_fullscreen(self, event=None):
+        """Toggle fullscreen mode (Escape key)"""
+        current_override = self.root.overrideredirect()
+        self.root.overrideredirect(not current_override)
+        if not current_override:
+            self.root.geometry("1280x720")
+
+    def shutdown(self):
+        """Stop polling and close the loop"""
+        self.stop_polling()
+        self.loop.close()
+
+    def close_app(self):
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
+        print(self.collector.format_stats())
+        print(f"Render: {self.cells_updated} cells updated, "
+              f"p50 {self.render_time.percentile(50) * 1000:.2f} ms "
+              f"p99 {self.render_time.percentile(99) * 1000:.2f} ms")
+        self.root.quit()
+        self.root.destroy()
+
+    def back_to_launcher(self):
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
+        self.root.quit()
+        self.root.destroy()
+        supervised_app.return_to_launcher()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Show every reTerminal in a fleet")
+    parser.add_argument('--nodes', metavar='FILE', help=f"nodes file (default {FLEET_FILE})")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    startup_probe.mark('imports')
+    args = parse_args()
+    nodes = load_nodes(args.nodes) if args.nodes is not None else None
+    root = tk.Tk()
+    startup_probe.mark('window')
+    app = FleetView(root, nodes=nodes)
+    startup_probe.mark('app')
+    supervised_app.install_signal_handlers(root, app.close_app)
+    startup_probe.notify_first_frame(root)
+    root.mainloop()
@@ -11,50 +11,109 @@ Sensors:
 - Accelerometer (ST LIS3LV02DL): /dev/input/event9 (via input events)
 """
 
+# First, so a startup profile sees every import below
+import startup_probe
 import tkinter as tk
-from tkinter import ttk
+import argparse
 import time
-import threading
-import subprocess
+import supervised_app
+from alert_rules import AlertNotifier, RuleEngine, load_rules
+from display_idle import DisplayIdleMonitor
+from metrics_history import MetricsHistory, open_history
+from metrics_scheduler import AsyncMetricScheduler
+from network_status import stale_interface_metrics
+from perf_overlay import PerfOverlay
+from sparkline import Sparkline
+from ui_dispatcher import UIDispatcher
+from tk_asyncio import get_loop
+from sensor_client import SensorClient
+try:
+    from vibration import VibrationAnalyzer
+except ImportError:  # numpy not installed; vibration analytics disabled
+    VibrationAnalyzer = None
+
+# Only loaded when sampling here (or recording) instead of through the daemon
+sensor_backends = startup_probe.lazy_import('sensor_backends')
+sensor_recording = startup_probe.lazy_import('sensor_recording')
+system_metrics = startup_probe.lazy_import('system_metrics')
+
+HISTORY_METRICS = ['temperature', 'lux', 'accel_x', 'accel_y', 'accel_z', 'vibration_rms']
 
 class HardwareDemo:
-    def __init__(self, root):
+    def __init__(self, root, container=None, on_back=None, record=None):
         self.root = root
-        self.root.title("reTerminal Hardware Demo")
-        # Set explicit geometry for fullscreen
-        self.root.geometry("1280x720")  # reTerminal screen size
-        self.root.attributes('-fullscreen', True)
-        self.root.configure(bg='#34495e')
-        
-        # Remove window decorations
-        self.root.overrideredirect(True)
+        # When hosted inside the launcher's window, widgets live in a frame
+        # and the launcher owns the window itself
+        self.container = container if container is not None else root
+        self.on_back = on_back
+        self.container.configure(bg='#34495e')
         
-        # Bind escape key to exit fullscreen
-        self.root.bind('<Escape>', self.toggle_fullscreen)
+        if container is None:
+            self.root.title("reTerminal Hardware Demo")
+            # Set explicit geometry for fullscreen
+            self.root.geometry("1280x720")  # reTerminal screen size
+            self.root.attributes('-fullscreen', True)
+            
+            # Remove window decorations
+            self.root.overrideredirect(True)
+            
+            # Bind escape key to exit fullscreen
+            self.root.bind('<Escape>', self.toggle_fullscreen)
         
-        self.running = True
-        # Initialize accelerometer values
-        self.accel_x = 0
-        self.accel_y = 0
-        self.accel_z = 0
+        self.running = False
+        self.ui = UIDispatcher(root)
+        self.backend = None  # opened with the accelerometer, when sampling here
+        self.has_vibration = VibrationAnalyzer is not None
+        # Use the shared sensor daemon when it is running; it owns the
+        # accelerometer and the history
+        self.client = SensorClient.attach()
+        self.accel = None
+        self.vibration = None
+        if self.client is not None:
+            self.history = MetricsHistory(HISTORY_METRICS)
+        else:
+            self.open_accelerometer()
+            # Fixed-size, file-backed history of every reading
+            self.history = open_history('hardware_demo', HISTORY_METRICS)
+        # Optional capture of every sample for later replay (--record FILE)
+        self.recorder = sensor_recording.SensorRecorder(record) if record else None
+        self.recorded_seq = 0
         
+        # Alert rules evaluated on every reading (~/.config/reterminal/alerts.txt)
+        self.alerts = RuleEngine(load_rules(), self.on_alert)
+        self.notifier = AlertNotifier('hardware_demo')
         self.setup_ui()
-        self.start_sensor_thread()
+        self.setup_metrics()
+        # Latency overlay: F2 or a long press on the title; F3 saves it
+        self.overlay = PerfOverlay(root, self.container, 'hardware_demo', self.scheduler, self.ui,
+                                   self.loop, title=self.title, keys=container is None)
+        if container is None:
+            # Stop polling while the window is hidden or the display is off
+            self.idle_monitor = DisplayIdleMonitor(root, self.stop_sensor_thread, self.start_sensor_thread)
+            self.start_sensor_thread()
         
     def setup_ui(self):
         # Title
-        title = tk.Label(self.root, text="Hardware Sensors", 
+        self.title = tk.Label(self.container, text="Hardware Sensors", 
                         font=('Arial', 36, 'bold'), 
                         fg='white', bg='#34495e')
-        title.pack(pady=40)
+        self.title.pack(pady=40)
+        
+        # Firing alert rules; empty while none are
+        self.alert_label = tk.Label(self.container, text="", 
+                                   font=('Arial', 16, 'bold'),
+                                   fg='#ff6b6b', bg='#34495e')
+        self.alert_label.pack()
         
         # Create frames for different sensors
         self.create_sensor_frame("Accelerometer", "accel")
-        self.create_sensor_frame("Light Sensor", "light")
-        self.create_sensor_frame("Temperature", "temp")
+        if self.has_vibration:
+            self.create_sensor_frame("Vibration", "vibration", chart=True)
+        self.create_sensor_frame("Light Sensor", "light", chart=True)
+        self.create_sensor_frame("Temperature", "temp", chart=True)
         
         # Exit button
-        exit_button = tk.Button(self.root, 
+        exit_button = tk.Button(self.container, 
                                text="Exit", 
                                font=('Arial', 18, 'bold'),
                                bg='#e74c3c', fg='white',
@@ -63,7 +122,7 @@ class HardwareDemo:
         exit_button.pack(side=tk.BOTTOM, pady=30)
         
         # Add back button
-        back_button = tk.Button(self.root, 
+        back_button = tk.Button(self.container, 
                                text="Back to Launcher", 
                                font=('Arial', 18, 'bold'),
                                bg='#3498db', fg='white',
@@ -71,8 +130,8 @@ class HardwareDemo:
                                command=self.back_to_launcher)
         back_button.pack(side=tk.BOTTOM, pady=30)
         
-    def create_sensor_frame(self, title, sensor_type):
-        frame = tk.Frame(self.root, bg='#2c3e50', relief='raised', bd=2)
+    def create_sensor_frame(self, title, sensor_type, chart=False):
+        frame = tk.Frame(self.container, bg='#2c3e50', relief='raised', bd=2)
         frame.pack(pady=20, padx=30, fill='x')
         
         # Sensor title
@@ -89,112 +148,188 @@ class HardwareDemo:
         # Store reference for updates
         setattr(self, f"{sensor_type}_label", value_label)
         
-    def read_accelerometer(self):
-        try:
-            # Read from ST LIS3LV02DL Accelerometer via input device
-            import struct
-            import os, fcntl
+        # Optional trend chart under the value
+        if chart:
+            sparkline = Sparkline(frame, width=480, height=40, bg='#2c3e50')
+            sparkline.pack(pady=(0, 10))
+            setattr(self, f"{sensor_type}_chart", sparkline)
+        
+    def open_accelerometer(self):
+        # Real sensors, or the simulator/replay chosen by RETERMINAL_SENSOR_BACKEND
+        self.backend = sensor_backends.get_backend()
+        # Accelerometer (ST LIS3LV02DL) sample stream
+        self.accel = self.backend.accelerometer()
+        if self.has_vibration:
+            self.vibration = VibrationAnalyzer(self.accel.ring)
+        
+    def show_trend(self, chart, name):
+        times, values = self.history.window(name, 300)
+        self.ui.submit((chart, 'data'), values, chart.set_data)
+        
+    def show_accelerometer(self, rate):
+        # The stream keeps /dev/input/event9 open and decodes every event;
+        # here we only show the latest sample and the live rate
+        x, y, z = (self.values.get(f'accel_{axis}', 0) for axis in 'xyz')
+        self.ui.set_text(self.accel_label, f"X: {x:.0f}, Y: {y:.0f}, Z: {z:.0f} ({rate:.0f} Hz)")
+        
+    def show_accel_error(self, error):
+        self.ui.set_text(self.accel_label, f"Accelerometer: {error[:20]}...")
+            
+    def show_vibration(self, roll):
+        # Roll is the last value of each analysed window
+        rms = self.values.get('vibration_rms', 0.0)
+        p2p = self.values.get('vibration_p2p', 0.0)
+        pitch = self.values.get('pitch', 0.0)
+        hz = self.values.get('vibration_hz', 0.0)
+        self.ui.set_text(self.vibration_label,
+                         f"RMS {rms * 1000:.0f} mg, P-P {p2p * 1000:.0f} mg, "
+                         f"Tilt {pitch:+.1f}°/{roll:+.1f}°, Peak {hz:.1f} Hz")
+        self.show_trend(self.vibration_chart, 'vibration_rms')
+            
+    def show_light(self, lux):
+        if lux is None:
+            self.ui.set_text(self.light_label, "Light sensor not available")
+            return
+        self.ui.set_text(self.light_label, f"Light: {lux:g} lux")
+        self.show_trend(self.light_chart, 'lux')
             
-            # Open in non-blocking mode
-            fd = os.open('/dev/input/event9', os.O_RDONLY | os.O_NONBLOCK)
+    def show_temperature(self, temp_celsius):
+        if temp_celsius is None:
+            self.ui.set_text(self.temp_label, "Temperature not available")
+            return
+        self.ui.set_text(self.temp_label, f"CPU: {temp_celsius:.1f}°C")
+        self.show_trend(self.temp_chart, 'temperature')
+    
+    def on_metric(self, name, value, t=None):
+        """Record and display one reading, sampled here or by the daemon"""
+        self.values[name] = value
+        self.alerts.feed(name, value, t)
+        if name in self.history.index and value is not None:
+            self.history.append(name, value, t)
+        if self.recorder is not None:
+            self.record(name, value, t)
+        handler = self.handlers.get(name)
+        if handler is not None:
+            handler(value)
+            
+    def forget_interfaces(self, interfaces):
+        for name in stale_interface_metrics(self.values, interfaces):
+            del self.values[name]
+            
+    def record(self, name, value, t):
+        if value is None:
+            return
+        if name in ('lux', 'temperature'):
+            self.recorder.record(name, t or time.time(), value)
+        elif name == 'accel_rate' and self.accel is None:
+            # From the daemon only the latest sample of each update arrives
+            x, y, z = (self.values.get(f'accel_{axis}', 0) for axis in 'xyz')
+            self.recorder.record('accel', t or time.time(), x, y, z)
             
-            try:
-                # Try to read available data
-                for _ in range(5):  # Read up to 5 events
-                    try:
-                        data = os.read(fd, 24)  # input_event struct size
-                        if len(data) == 24:
-                            # Parse input_event: sec, usec, type, code, value
-                            unpacked = struct.unpack('llHHi', data)
-                            event_type, code, value = unpacked[2], unpacked[3], unpacked[4]
-                            if event_type == 3:  # EV_ABS (absolute axis)
-                                if code == 0:  # X axis
-                                    self.accel_x = value
-                                elif code == 1:  # Y axis  
-                                    self.accel_y = value
-                                elif code == 2:  # Z axis
-                                    self.accel_z = value
-                    except BlockingIOError:
-                        break
-                    except:
-                        break
-            finally:
-                os.close(fd)
+    def drain_accelerometer(self):
+        """Every sample decoded since the last call"""
+        self.recorded_seq, samples = self.accel.ring.since(self.recorded_seq)
+        return samples
             
-            # Return stored values
-            return f"X: {self.accel_x}, Y: {self.accel_y}, Z: {self.accel_z}"
-        except Exception as e:
-            return f"Accelerometer: {str(e)[:20]}..."
+    def on_alert(self, event):
+        self.notifier.notify(event)
+        self.ui.set_text(self.alert_label, self.alerts.format_active())
             
-    def read_light_sensor(self):
+    def on_daemon_update(self, records):
+        # Called on the client's reader thread; history, alerts and handlers
+        # are only touched from the event loop's thread
+        self.call_on_loop(self.apply_daemon_update, records)
+        
+    def on_daemon_lost(self):
+        self.call_on_loop(self.sample_locally)
+        
+    def call_on_loop(self, callback, *args):
         try:
-            # Official path from Seeed documentation
-            with open('/sys/bus/iio/devices/iio:device0/in_illuminance_input', 'r') as f:
-                light = f.read().strip()
-                return f"Light: {light} lux"
-        except:
-            try:
-                # Alternative paths
-                possible_paths = [
-                    '/sys/class/i2c-dev/i2c-1/device/1-0029/iio:device*/in_illuminance_input',
-                    '/sys/bus/i2c/devices/1-0029/iio:device*/in_illuminance_input'
-                ]
-                
-                import glob
-                for path_pattern in possible_paths:
-                    matches = glob.glob(path_pattern)
-                    for path in matches:
-                        try:
-                            with open(path, 'r') as f:
-                                light = f.read().strip()
-                            return f"Light: {light} lux"
-                        except:
-                            continue
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # loop closed: the app is exiting
+            
+    def apply_daemon_update(self, records):
+        with self.ui.batch():
+            for name, t, value in records:
+                self.on_metric(name, value, t)
                 
-                # Fallback: simulate light reading based on time
-                import datetime
-                hour = datetime.datetime.now().hour
-                if 6 <= hour <= 18:
-                    simulated_light = 300 + (hour - 6) * 50  # Daytime simulation
-                else:
-                    simulated_light = 10  # Nighttime simulation
-                return f"Light: ~{simulated_light} lux (simulated)"
-            except:
-                return "Light sensor: Reading..."
+    def sample_locally(self):
+        if self.client is None:
+            return  # already sampling locally
+        print("Sensor daemon went away, sampling locally")
+        self.client = None
+        self.open_accelerometer()
+        self.add_local_sources()
+        if self.running:
+            self.accel.start(self.loop)
             
-    def read_temperature(self):
-        try:
-            # Read CPU temperature
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp_millidegree = int(f.read().strip())
-                temp_celsius = temp_millidegree / 1000
-            return f"CPU: {temp_celsius:.1f}°C"
-        except:
-            return "Temperature not available"
+    def add_local_sources(self):
+        system_metrics.SystemMetrics(sensors=self.backend).add_to(
+            self.scheduler, self.on_metric, only=['temperature'])
+        system_metrics.SensorMetrics(self.accel, self.vibration, self.backend).add_to(
+            self.scheduler, self.on_metric)
+        if self.recorder is not None:
+            self.recorded_seq = self.accel.ring.seq
+            self.scheduler.add('recorder', self.drain_accelerometer, 1.0,
+                               self.recorder.record_samples)
     
-    def update_sensors(self):
-        while self.running:
-            try:
-                # Update accelerometer
-                accel_data = self.read_accelerometer()
-                self.root.after(0, lambda: self.accel_label.config(text=accel_data))
-                
-                # Update light sensor
-                light_data = self.read_light_sensor()
-                self.root.after(0, lambda: self.light_label.config(text=light_data))
-                
-                # Update temperature
-                temp_data = self.read_temperature()
-                self.root.after(0, lambda: self.temp_label.config(text=temp_data))
-                
-            except Exception as e:
-                print(f"Sensor update error: {e}")
-                
-            time.sleep(1)  # Update every second
+    def setup_metrics(self):
+        self.values = {}
+        self.handlers = {
+            'accel_rate': self.show_accelerometer,
+            'accel_error': self.show_accel_error,
+            'lux': self.show_light,
+            'temperature': self.show_temperature,
+            # The daemon sends network readings too; drop gone interfaces
+            'net_interfaces': self.forget_interfaces,
+        }
+        if self.has_vibration:
+            self.handlers['roll'] = self.show_vibration
+        
+        # Sources and the accelerometer share the Tk thread's event loop
+        self.loop = get_loop(self.root)
+        self.scheduler = AsyncMetricScheduler(self.loop, batch=self.ui.batch)
+        if self.client is not None:
+            # The daemon samples for us: start from its history and values
+            for name in HISTORY_METRICS:
+                times, values = self.client.history(name, 300)
+                for t, value in zip(times, values):
+                    self.history.append(name, value, t)
+            with self.ui.batch():
+                for name, (t, value) in self.client.snapshot().items():
+                    self.on_metric(name, value, t)
+        else:
+            self.add_local_sources()
     
     def start_sensor_thread(self):
-        self.sensor_thread = threading.Thread(target=self.update_sensors, daemon=True)
-        self.sensor_thread.start()
+        if self.running:
+            return
+        self.running = True
+        if self.accel is not None:
+            self.accel.start(self.loop)
+        self.scheduler.start()
+        if self.client is not None:
+            self.client.subscribe(self.on_daemon_update, on_close=self.on_daemon_lost)
+        
+    def stop_sensor_thread(self):
+        self.running = False
+        self.scheduler.stop()
+        if self.client is not None:
+            self.client.unsubscribe()
+        if self.accel is not None:
+            self.accel.stop()
+        if self.recorder is not None:
+            self.recorder.flush()
+            
+    def activate(self):
+        """Called by the launcher when this screen is shown"""
+        self.start_sensor_thread()
+        
+    def deactivate(self):
+        """Called by the launcher when this screen is hidden"""
+        self.overlay.hide()
+        self.stop_sensor_thread()
         
     def toggle_fullscreen(self, event=None):
         """Toggle fullscreen mode (Escape key)"""
@@ -204,18 +339,52 @@ class HardwareDemo:
         if not current_override:
             self.root.geometry("1280x720")
         
+    def shutdown(self):
+        """Stop sampling and release the loop, history, recording and daemon connection"""
+        self.stop_sensor_thread()
+        self.loop.close()
+        self.history.flush()
+        self.notifier.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.client is not None:
+            self.client.close()
+            
     def close_app(self):
-        self.running = False
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
+        # Report each source's base and current (adaptive) period
+        print(self.scheduler.format_stats())
+        print(self.alerts.format_stats())
         self.root.quit()
         self.root.destroy()
         
     def back_to_launcher(self):
-        self.running = False
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
         self.root.quit()
         self.root.destroy()
-        subprocess.Popen(['python3', 'app_launcher.py'])
+        supervised_app.return_to_launcher()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="reTerminal hardware sensor demo")
+    parser.add_argument('--record', metavar='FILE',
+                        help="also record the sensor streams (see sensor_recording)")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
+    startup_probe.mark('imports')
+    args = parse_args()
     root = tk.Tk()
-    app = HardwareDemo(root)
+    startup_probe.mark('window')
+    app = HardwareDemo(root, record=args.record)
+    startup_probe.mark('app')
+    supervised_app.install_signal_handlers(root, app.close_app)
+    startup_probe.notify_first_frame(root)
     root.mainloop()
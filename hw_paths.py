@@ -0,0 +1,15 @@
+"""
+Filesystem root for reTerminal hardware paths
+Every /sys, /proc and /dev path the apps read goes through hw_path, so
+setting RETERMINAL_FS_ROOT points them all at another tree, such as the
+fake device tree the benchmarks generate on a machine without the hardware.
+"""
+
+import os
+
+FS_ROOT = os.environ.get('RETERMINAL_FS_ROOT', '').rstrip('/')
+
+
+def hw_path(path):
+    """Absolute hardware path under FS_ROOT (unchanged when unset)"""
+    return FS_ROOT + path
@@ -4,38 +4,89 @@ Simple IoT Dashboard for reTerminal
 Displays system information and network status
 """
 
+# First, so a startup profile sees every import below
+import startup_probe
 import tkinter as tk
-from tkinter import ttk
-import psutil
 import time
-import threading
-import subprocess
+import supervised_app
+from alert_rules import AlertNotifier, RuleEngine, load_rules
+from display_idle import DisplayIdleMonitor
+from network_status import NetworkStatusCollector, InterfaceHistory, InterfaceRates, \
+    RATE_FIELDS, format_rate, stale_interface_metrics
+from metrics_scheduler import AsyncMetricScheduler
+from metrics_history import MetricsHistory, open_history
+from perf_overlay import PerfOverlay
+from sparkline import Sparkline
+from ui_dispatcher import UIDispatcher
+from tk_asyncio import get_loop
+from sensor_client import SensorClient
+
+# Only loaded when sampling here instead of through the sensor daemon
+sensor_backends = startup_probe.lazy_import('sensor_backends')
+system_metrics = startup_probe.lazy_import('system_metrics')
+
+HISTORY_METRICS = ['cpu', 'memory', 'disk', 'temperature']
+# Interfaces shown with their own throughput row and chart
+MAX_INTERFACE_ROWS = 6
 
 class IoTDashboard:
-    def __init__(self, root):
+    def __init__(self, root, container=None, on_back=None):
         self.root = root
-        self.root.title("reTerminal IoT Dashboard")
-        # Set explicit geometry for fullscreen
-        self.root.geometry("1280x720")  # reTerminal screen size
-        self.root.attributes('-fullscreen', True)
-        self.root.configure(bg='#1a252f')
+        # When hosted inside the launcher's window, widgets live in a frame
+        # and the launcher owns the window itself
+        self.container = container if container is not None else root
+        self.on_back = on_back
+        self.container.configure(bg='#1a252f')
         
-        # Remove window decorations
-        self.root.overrideredirect(True)
-        
-        # Bind escape key to exit fullscreen
-        self.root.bind('<Escape>', self.toggle_fullscreen)
+        if container is None:
+            self.root.title("reTerminal IoT Dashboard")
+            # Set explicit geometry for fullscreen
+            self.root.geometry("1280x720")  # reTerminal screen size
+            self.root.attributes('-fullscreen', True)
+            
+            # Remove window decorations
+            self.root.overrideredirect(True)
+            
+            # Bind escape key to exit fullscreen
+            self.root.bind('<Escape>', self.toggle_fullscreen)
         
-        self.running = True
+        self.running = False
+        self.ui = UIDispatcher(root)
+        # Use the shared sensor daemon when it is running
+        self.client = SensorClient.attach()
+        if self.client is not None:
+            # History comes from the daemon on every start
+            self.history = MetricsHistory(HISTORY_METRICS)
+        else:
+            # Fixed-size, file-backed history of the resource readouts
+            self.history = open_history('iot_dashboard', HISTORY_METRICS)
+        # Ten minutes of RX/TX per interface, in preallocated slots
+        self.net_history = InterfaceHistory(max_interfaces=MAX_INTERFACE_ROWS)
+        # Alert rules evaluated on every reading (~/.config/reterminal/alerts.txt)
+        self.alerts = RuleEngine(load_rules(), self.on_alert)
+        self.notifier = AlertNotifier('iot_dashboard')
         self.setup_ui()
-        self.start_update_thread()
+        self.setup_metrics()
+        # Latency overlay: F2 or a long press on the title; F3 saves it
+        self.overlay = PerfOverlay(root, self.container, 'iot_dashboard', self.scheduler, self.ui,
+                                   self.loop, title=self.title, keys=container is None)
+        if container is None:
+            # Stop polling while the window is hidden or the display is off
+            self.idle_monitor = DisplayIdleMonitor(root, self.stop_update_thread, self.start_update_thread)
+            self.start_update_thread()
         
     def setup_ui(self):
         # Main title
-        title = tk.Label(self.root, text="IoT Dashboard", 
+        self.title = tk.Label(self.container, text="IoT Dashboard", 
                         font=('Arial', 36, 'bold'), 
                         fg='#00d4aa', bg='#1a252f')
-        title.pack(pady=30)
+        self.title.pack(pady=30)
+        
+        # Firing alert rules; empty while none are
+        self.alert_label = tk.Label(self.container, text="", 
+                                   font=('Arial', 16, 'bold'),
+                                   fg='#ff6b6b', bg='#1a252f')
+        self.alert_label.pack()
         
         # System info frame
         self.create_info_frame()
@@ -46,8 +97,11 @@ class IoTDashboard:
         # Resource usage frame
         self.create_resource_frame()
         
+        # Top processes frame
+        self.create_process_frame()
+        
         # Exit button
-        exit_button = tk.Button(self.root, 
+        exit_button = tk.Button(self.container, 
                                text="Exit Dashboard", 
                                font=('Arial', 18, 'bold'),
                                bg='#ff6b6b', fg='white',
@@ -56,7 +110,7 @@ class IoTDashboard:
         exit_button.pack(side=tk.BOTTOM, pady=30)
         
         # Add back button
-        back_button = tk.Button(self.root, 
+        back_button = tk.Button(self.container, 
                                text="Back to Launcher", 
                                font=('Arial', 18, 'bold'),
                                bg='#3498db', fg='white',
@@ -65,7 +119,7 @@ class IoTDashboard:
         back_button.pack(side=tk.BOTTOM, pady=30)
         
     def create_info_frame(self):
-        frame = tk.LabelFrame(self.root, text="System Information", 
+        frame = tk.LabelFrame(self.container, text="System Information", 
                              font=('Arial', 18, 'bold'),
                              fg='#00d4aa', bg='#1a252f', 
                              labelanchor='n')
@@ -90,7 +144,7 @@ class IoTDashboard:
         self.time_label.pack(anchor='w', padx=15, pady=5)
         
     def create_network_frame(self):
-        frame = tk.LabelFrame(self.root, text="Network Status", 
+        frame = tk.LabelFrame(self.container, text="Network Status", 
                              font=('Arial', 18, 'bold'),
                              fg='#00d4aa', bg='#1a252f',
                              labelanchor='n')
@@ -108,24 +162,25 @@ class IoTDashboard:
                                   fg='white', bg='#1a252f')
         self.wifi_label.pack(anchor='w', padx=10, pady=2)
         
+        # One row per interface, added as interfaces appear
+        self.interface_frame = tk.Frame(frame, bg='#1a252f')
+        self.interface_frame.pack(fill='x')
+        self.interface_rows = {}
+        
     def create_resource_frame(self):
-        frame = tk.LabelFrame(self.root, text="Resource Usage", 
+        frame = tk.LabelFrame(self.container, text="Resource Usage", 
                              font=('Arial', 18, 'bold'),
                              fg='#00d4aa', bg='#1a252f',
                              labelanchor='n')
         frame.pack(pady=15, padx=30, fill='x')
         
         # CPU Usage
-        self.cpu_label = tk.Label(frame, text="CPU: Loading...", 
-                                 font=('Arial', 16),
-                                 fg='white', bg='#1a252f')
-        self.cpu_label.pack(anchor='w', padx=15, pady=5)
+        self.cpu_label, self.cpu_chart = self.create_chart_row(
+            frame, "CPU: Loading...", 16, min_value=0, max_value=100)
         
         # Memory Usage
-        self.memory_label = tk.Label(frame, text="Memory: Loading...", 
-                                    font=('Arial', 16),
-                                    fg='white', bg='#1a252f')
-        self.memory_label.pack(anchor='w', padx=15, pady=5)
+        self.memory_label, self.memory_chart = self.create_chart_row(
+            frame, "Memory: Loading...", 16, min_value=0, max_value=100)
         
         # Disk Usage
         self.disk_label = tk.Label(frame, text="Disk: Loading...", 
@@ -134,99 +189,225 @@ class IoTDashboard:
         self.disk_label.pack(anchor='w', padx=10, pady=2)
         
         # Temperature
-        self.temp_label = tk.Label(frame, text="Temperature: Loading...", 
-                                  font=('Arial', 12),
-                                  fg='white', bg='#1a252f')
-        self.temp_label.pack(anchor='w', padx=10, pady=2)
+        self.temp_label, self.temp_chart = self.create_chart_row(
+            frame, "Temperature: Loading...", 12)
         
-    def get_ip_address(self):
-        try:
-            result = subprocess.run(['hostname', '-I'], 
-                                  capture_output=True, text=True)
-            return result.stdout.strip().split()[0] if result.stdout.strip() else "Not connected"
-        except:
-            return "Unknown"
+    def create_process_frame(self):
+        frame = tk.LabelFrame(self.container, text="Top Processes", 
+                             font=('Arial', 18, 'bold'),
+                             fg='#00d4aa', bg='#1a252f',
+                             labelanchor='n')
+        frame.pack(pady=15, padx=30, fill='x')
+        
+        # By CPU on the left, by memory on the right
+        self.top_cpu_label = tk.Label(frame, text="By CPU: Loading...", 
+                                     font=('Courier', 11), justify=tk.LEFT,
+                                     fg='white', bg='#1a252f')
+        self.top_cpu_label.pack(side=tk.LEFT, anchor='n', padx=15, pady=5)
+        self.top_rss_label = tk.Label(frame, text="By memory: Loading...", 
+                                     font=('Courier', 11), justify=tk.LEFT,
+                                     fg='white', bg='#1a252f')
+        self.top_rss_label.pack(side=tk.RIGHT, anchor='n', padx=15, pady=5)
+        
+    def create_chart_row(self, frame, text, size, **chart_options):
+        """A readout label with a trend chart to its right"""
+        row = tk.Frame(frame, bg='#1a252f')
+        row.pack(fill='x', padx=15, pady=5)
+        label = tk.Label(row, text=text, 
+                        font=('Arial', size),
+                        fg='white', bg='#1a252f')
+        label.pack(side=tk.LEFT)
+        chart = Sparkline(row, width=240, height=36, **chart_options)
+        chart.pack(side=tk.RIGHT)
+        return label, chart
+        
+    def show(self, label, text):
+        self.ui.set_text(label, text)
+        
+    def show_trend(self, chart, name, seconds):
+        # Copy the window here on the worker thread; the UI thread only
+        # moves the chart's existing line
+        times, values = self.history.window(name, seconds)
+        self.ui.submit((chart, 'data'), values, chart.set_data)
+        
+    def show_cpu(self, cpu):
+        stats = self.history.stats('cpu', 300)
+        if stats is None:
+            # Nothing in the last 5 minutes, e.g. a stale daemon timestamp
+            self.show(self.cpu_label, f"CPU: {cpu:.1f}%")
+        else:
+            low, high, mean, count = stats
+            self.show(self.cpu_label, f"CPU: {cpu:.1f}% (5m avg {mean:.1f}%, peak {high:.1f}%)")
+        self.show_trend(self.cpu_chart, 'cpu', 300)
+        
+    def show_memory(self, used):
+        percent = self.values.get('memory', 0.0)
+        self.show(self.memory_label,
+                  f"Memory: {percent:.1f}% ({int(used)//1024//1024}MB used)")
+        self.show_trend(self.memory_chart, 'memory', 600)
+        
+    def show_disk(self, used):
+        percent = self.values.get('disk', 0.0)
+        self.show(self.disk_label,
+                  f"Disk: {percent:.1f}% ({int(used)//1024//1024//1024}GB used)")
+        
+    def show_temperature(self, temp):
+        if temp is None:
+            self.show(self.temp_label, "Temperature: N/A")
+        else:
+            self.show(self.temp_label, f"Temperature: {temp:.1f}°C")
+            self.show_trend(self.temp_chart, 'temperature', 600)
             
-    def get_wifi_status(self):
-        try:
-            result = subprocess.run(['iwconfig'], 
-                                  capture_output=True, text=True, 
-                                  stderr=subprocess.DEVNULL)
-            if 'ESSID:' in result.stdout:
-                lines = result.stdout.split('\n')
-                for line in lines:
-                    if 'ESSID:' in line:
-                        essid = line.split('ESSID:')[1].strip().strip('"')
-                        return f"Connected to {essid}" if essid != "off/any" else "Not connected"
-            return "Not connected"
-        except:
-            return "Unknown"
+    def show_interfaces(self, names):
+        """Per-interface rates, after every net_*:<interface> reading of a tick"""
+        # Interfaces that went away (veth, usb0 ...) leave nothing behind
+        stale = stale_interface_metrics(self.values, names)
+        for name in stale:
+            del self.values[name]
+        for interface in {name.partition(':')[2] for name in stale}:
+            self.ui.forget((interface, 'net'))
+        rates = []
+        for interface in names.split(',') if names else []:
+            rates.append(InterfaceRates(interface, *(
+                self.values.get(f'net_{field}:{interface}') or 0.0 for field in RATE_FIELDS)))
+        self.net_history.record(rates)
+        for r in rates:
+            text = (f"{r.interface}: ↓ {format_rate(r.rx_bytes)} ↑ {format_rate(r.tx_bytes)}, "
+                    f"{r.rx_packets + r.tx_packets:.0f} pkt/s, "
+                    f"{r.errors:.0f} err/s, {r.drops:.0f} drop/s")
+            times, values = self.net_history.window(r.interface, 'rx', 300)
+            self.ui.submit((r.interface, 'net'), (r.interface, text, values),
+                           self.apply_interface_row)
+        self.ui.submit('interfaces', {r.interface for r in rates}, self.remove_interface_rows)
+        
+    def apply_interface_row(self, update):
+        interface, text, values = update
+        row = self.interface_rows.get(interface)
+        if row is None:
+            if len(self.interface_rows) >= MAX_INTERFACE_ROWS:
+                return
+            label, chart = self.create_chart_row(self.interface_frame, text, 12)
+            row = self.interface_rows[interface] = (label.master, label, chart)
+        row[1].config(text=text)
+        row[2].set_data(values)
+        
+    def remove_interface_rows(self, present):
+        for interface in [i for i in self.interface_rows if i not in present]:
+            self.interface_rows.pop(interface)[0].destroy()
+            
+    def show_uptime(self, uptime):
+        hours = int(uptime // 3600)
+        minutes = int((uptime % 3600) // 60)
+        self.show(self.uptime_label, f"Uptime: {hours}h {minutes}m")
     
-    def update_dashboard(self):
-        while self.running:
-            try:
-                # Update hostname
-                hostname = subprocess.run(['hostname'], 
-                                        capture_output=True, text=True).stdout.strip()
-                self.root.after(0, lambda: self.hostname_label.config(
-                    text=f"Hostname: {hostname}"))
-                
-                # Update uptime
-                uptime = time.time() - psutil.boot_time()
-                hours = int(uptime // 3600)
-                minutes = int((uptime % 3600) // 60)
-                self.root.after(0, lambda: self.uptime_label.config(
-                    text=f"Uptime: {hours}h {minutes}m"))
-                
-                # Update current time
-                current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                self.root.after(0, lambda: self.time_label.config(
-                    text=f"Time: {current_time}"))
-                
-                # Update IP address
-                ip_addr = self.get_ip_address()
-                self.root.after(0, lambda: self.ip_label.config(
-                    text=f"IP Address: {ip_addr}"))
-                
-                # Update WiFi status
-                wifi_status = self.get_wifi_status()
-                self.root.after(0, lambda: self.wifi_label.config(
-                    text=f"WiFi: {wifi_status}"))
-                
-                # Update CPU usage
-                cpu_percent = psutil.cpu_percent(interval=1)
-                self.root.after(0, lambda: self.cpu_label.config(
-                    text=f"CPU: {cpu_percent:.1f}%"))
-                
-                # Update memory usage
-                memory = psutil.virtual_memory()
-                self.root.after(0, lambda: self.memory_label.config(
-                    text=f"Memory: {memory.percent:.1f}% ({memory.used//1024//1024}MB used)"))
-                
-                # Update disk usage
-                disk = psutil.disk_usage('/')
-                disk_percent = (disk.used / disk.total) * 100
-                self.root.after(0, lambda: self.disk_label.config(
-                    text=f"Disk: {disk_percent:.1f}% ({disk.used//1024//1024//1024}GB used)"))
-                
-                # Update temperature
-                try:
-                    with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                        temp = int(f.read().strip()) / 1000
-                    self.root.after(0, lambda: self.temp_label.config(
-                        text=f"Temperature: {temp:.1f}°C"))
-                except:
-                    self.root.after(0, lambda: self.temp_label.config(
-                        text="Temperature: N/A"))
-                
-            except Exception as e:
-                print(f"Dashboard update error: {e}")
+    def on_metric(self, name, value, t=None):
+        """Record and display one reading, sampled here or by the daemon"""
+        self.values[name] = value
+        self.alerts.feed(name, value, t)
+        if name in self.history.index and value is not None:
+            self.history.append(name, value, t)
+        handler = self.handlers.get(name)
+        if handler is not None:
+            handler(value)
+            
+    def on_alert(self, event):
+        self.notifier.notify(event)
+        self.ui.set_text(self.alert_label, self.alerts.format_active())
+            
+    def on_daemon_update(self, records):
+        # Called on the client's reader thread; history, alerts and handlers
+        # are only touched from the event loop's thread
+        self.call_on_loop(self.apply_daemon_update, records)
+        
+    def on_daemon_lost(self):
+        self.call_on_loop(self.sample_locally)
+        
+    def call_on_loop(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # loop closed: the app is exiting
+            
+    def apply_daemon_update(self, records):
+        with self.ui.batch():
+            for name, t, value in records:
+                self.on_metric(name, value, t)
                 
-            time.sleep(2)  # Update every 2 seconds
+    def sample_locally(self):
+        if self.client is None:
+            return  # already sampling locally
+        print("Sensor daemon went away, sampling locally")
+        self.client = None
+        self.add_local_sources()
+        
+    def add_local_sources(self):
+        # Built on first use, so attaching to the daemon never loads psutil
+        # or the sensor backends; the thermal zone reader (or the
+        # simulator/replay from RETERMINAL_SENSOR_BACKEND) feeds temperature
+        if self.system_metrics is None:
+            self.system_metrics = system_metrics.SystemMetrics(
+                NetworkStatusCollector(), sensor_backends.get_backend())
+        self.system_metrics.add_to(self.scheduler, self.on_metric)
+    
+    def setup_metrics(self):
+        """Register every readout with its own refresh period"""
+        self.values = {}
+        self.handlers = {
+            'cpu': self.show_cpu,
+            'memory_used': self.show_memory,
+            'disk_used': self.show_disk,
+            'temperature': self.show_temperature,
+            'uptime': self.show_uptime,
+            'hostname': lambda name: self.show(self.hostname_label, f"Hostname: {name}"),
+            'ip': lambda ip: self.show(self.ip_label, f"IP Address: {ip}"),
+            'wifi': lambda wifi: self.show(self.wifi_label, f"WiFi: {wifi}"),
+            'net_interfaces': self.show_interfaces,
+            'top_cpu': lambda top: self.show(self.top_cpu_label, f"By CPU:\n{top}"),
+            'top_rss': lambda top: self.show(self.top_rss_label, f"By memory:\n{top}"),
+        }
+        
+        # Sources run as tasks on the Tk thread's event loop; slow reads go
+        # to worker threads and their label updates are applied in one callback
+        self.loop = get_loop(self.root)
+        self.scheduler = AsyncMetricScheduler(self.loop, batch=self.ui.batch)
+        self.scheduler.add('clock', lambda: time.strftime("%Y-%m-%d %H:%M:%S"), 1.0,
+                           lambda t: self.show(self.time_label, f"Time: {t}"))
+        self.system_metrics = None
+        
+        if self.client is not None:
+            # The daemon samples for us: start from its history and values
+            for name in HISTORY_METRICS:
+                times, values = self.client.history(name, 3600)
+                for t, value in zip(times, values):
+                    self.history.append(name, value, t)
+            with self.ui.batch():
+                for name, (t, value) in self.client.snapshot().items():
+                    self.on_metric(name, value, t)
+        else:
+            self.add_local_sources()
     
     def start_update_thread(self):
-        self.update_thread = threading.Thread(target=self.update_dashboard, daemon=True)
-        self.update_thread.start()
+        if self.running:
+            return
+        self.running = True
+        self.scheduler.start()
+        if self.client is not None:
+            self.client.subscribe(self.on_daemon_update, on_close=self.on_daemon_lost)
+        
+    def stop_update_thread(self):
+        self.running = False
+        self.scheduler.stop()
+        if self.client is not None:
+            self.client.unsubscribe()
+            
+    def activate(self):
+        """Called by the launcher when this screen is shown"""
+        self.start_update_thread()
+        
+    def deactivate(self):
+        """Called by the launcher when this screen is hidden"""
+        self.overlay.hide()
+        self.stop_update_thread()
         
     def toggle_fullscreen(self, event=None):
         """Toggle fullscreen mode (Escape key)"""
@@ -236,18 +417,42 @@ class IoTDashboard:
         if not current_override:
             self.root.geometry("1280x720")
         
+    def shutdown(self):
+        """Stop sampling and release the loop, history and daemon connection"""
+        self.stop_update_thread()
+        self.loop.close()
+        self.history.flush()
+        self.notifier.close()
+        if self.client is not None:
+            self.client.close()
+            
     def close_app(self):
-        self.running = False
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
+        # Report how late each metric's ticks ran during this session
+        print(self.scheduler.format_stats())
+        print(self.ui.format_stats())
+        print(self.alerts.format_stats())
         self.root.quit()
         self.root.destroy()
         
     def back_to_launcher(self):
-        self.running = False
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
         self.root.quit()
         self.root.destroy()
-        subprocess.Popen(['python3', 'app_launcher.py'])
+        supervised_app.return_to_launcher()
 
 if __name__ == "__main__":
+    startup_probe.mark('imports')
     root = tk.Tk()
+    startup_probe.mark('window')
     app = IoTDashboard(root)
+    startup_probe.mark('app')
+    supervised_app.install_signal_handlers(root, app.close_app)
+    startup_probe.notify_first_frame(root)
     root.mainloop()
@@ -0,0 +1,102 @@
+"""
+Fixed-size latency histograms for the instrumentation overlay
+Buckets are log-linear as in HdrHistogram: each power of two of
+microseconds is split into SUB_BUCKETS/2 equal steps, so any recorded
+duration from 1 us to a minute is kept to within about 3% in under 700
+counters. Recording is a few integer operations and never allocates.
+"""
+
+from array import array
+
+UNIT = 1e-6  # seconds per count: microsecond resolution
+SUB_BITS = 6
+SUB_BUCKETS = 1 << SUB_BITS
+HALF = SUB_BUCKETS >> 1
+
+
+def bucket_index(units):
+    exponent = max(units.bit_length() - SUB_BITS, 0)
+    return exponent * HALF + (units >> exponent)
+
+
+def bucket_upper(index):
+    """Largest value (in units) that falls into bucket index"""
+    exponent = max(index // HALF - 1, 0)
+    mantissa = index - exponent * HALF
+    return ((mantissa + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    def __init__(self, highest=60.0):
+        self.highest = int(highest / UNIT)
+        self.counts = array('Q', bytes(8 * (bucket_index(self.highest) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.overflows = 0  # longer than highest, counted in the last bucket
+
+    def record(self, seconds):
+        units = int(seconds / UNIT) if seconds > 0 else 0
+        if units > self.highest:
+            units = self.highest
+            self.overflows += 1
+        self.counts[bucket_index(units)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Seconds at or below which p percent of the recordings fall"""
+        if not self.count:
+            return 0.0
+        rank = max(int(self.count * p / 100 + 0.5), 1)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper(index) * UNIT, self.max)
+        return self.max
+
+    def bins(self, edges):
+        """Counts between successive edges (seconds); the last bin also
+        holds everything above the last edge"""
+        counts = [0] * (len(edges) - 1)
+        bin_index = 0
+        for index, n in enumerate(self.counts):
+            if not n:
+                continue
+            value = bucket_upper(index) * UNIT
+            while bin_index < len(counts) - 1 and value >= edges[bin_index + 1]:
+                bin_index += 1
+            counts[bin_index] += n
+        return counts
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.overflows = 0
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.mean() * 1000,
+            'p50_ms': self.percentile(50) * 1000,
+            'p90_ms': self.percentile(90) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'p999_ms': self.percentile(99.9) * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+    def to_dict(self):
+        """summary() plus the non-empty buckets as [upper bound ms, count]"""
+        report = self.summary()
+        report['buckets'] = [[bucket_upper(i) * UNIT * 1000, n]
+                             for i, n in enumerate(self.counts) if n]
+        return report
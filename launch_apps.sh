@@ -12,5 +12,5 @@ export DISPLAY=:0
 # Change to app directory
 cd /home/jharris/reTerminal_apps
 
-# Launch the app launcher
-python3 app_launcher.py
+# Launch the app launcher with all apps hosted in one process
+python3 app_launcher.py --single-process
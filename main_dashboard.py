@@ -4,12 +4,16 @@ Main Dashboard for reTerminal
 Allows navigation between IoT Dashboard, Hardware Demo, and Touchscreen Demo
 """
 
+# First, so a startup profile sees every import below
+import startup_probe
 import tkinter as tk
-import subprocess
 import os
+import sys
+from screen_host import ScreenHost
+from app_supervisor import AppSupervisor
 
 class MainDashboard:
-    def __init__(self, root):
+    def __init__(self, root, single_process=False):
         self.root = root
         self.root.title("reTerminal Main Dashboard")
         self.root.geometry("1280x720")  # reTerminal screen size
@@ -21,56 +25,88 @@ class MainDashboard:
         # Bind escape key to exit fullscreen
         self.root.bind('<Escape>', self.close_app)
 
+        # Menu widgets live in their own frame so in-process app screens
+        # can be swapped in and out of the same window
+        self.menu = tk.Frame(self.root, bg='#1a252f')
+        self.menu.pack(fill='both', expand=True)
+        self.host = ScreenHost(self.root, self.menu) if single_process else None
+        # Apps started as separate processes; one instance each, forked
+        # from a pre-imported zygote so they start quickly
+        self.supervisor = AppSupervisor(os.path.dirname(os.path.abspath(__file__)), self.root,
+                                        zygote=not single_process)
         self.setup_ui()
+        self.supervisor.on_change = self.show_usage
 
     def setup_ui(self):
         # Main title
-        title = tk.Label(self.root, text="Main Dashboard", 
+        title = tk.Label(self.menu, text="Main Dashboard", 
                         font=('Arial', 36, 'bold'), 
                         fg='#00d4aa', bg='#1a252f')
         title.pack(pady=30)
 
         # Buttons for launching apps
-        tk.Button(self.root, text="IoT Dashboard", 
+        tk.Button(self.menu, text="IoT Dashboard", 
                   font=('Arial', 18, 'bold'), 
                   bg='#00d4aa', fg='white', 
                   width=20, height=2, 
                   command=self.launch_iot_dashboard).pack(pady=20)
 
-        tk.Button(self.root, text="Hardware Demo", 
+        tk.Button(self.menu, text="Hardware Demo", 
                   font=('Arial', 18, 'bold'), 
                   bg='#00d4aa', fg='white', 
                   width=20, height=2, 
                   command=self.launch_hardware_demo).pack(pady=20)
 
-        tk.Button(self.root, text="Touchscreen Demo", 
+        tk.Button(self.menu, text="Touchscreen Demo", 
                   font=('Arial', 18, 'bold'), 
                   bg='#00d4aa', fg='white', 
                   width=20, height=2, 
                   command=self.launch_touchscreen_demo).pack(pady=20)
 
         # Exit button
-        tk.Button(self.root, text="Exit Dashboard", 
+        tk.Button(self.menu, text="Exit Dashboard", 
                   font=('Arial', 18, 'bold'), 
                   bg='#ff6b6b', fg='white', 
                   width=20, height=2, 
                   command=self.close_app).pack(pady=30)
 
+        # What each running app costs
+        self.usage_label = tk.Label(self.menu, text="",
+                                    font=('Arial', 12),
+                                    fg='#7f8c8d', bg='#1a252f', justify=tk.LEFT)
+        self.usage_label.pack(pady=5)
+
+    def launch(self, filename):
+        if self.host is not None:
+            self.host.show(filename)
+            return
+        self.supervisor.launch(filename)
+
+    def show_usage(self, usage):
+        self.usage_label.config(text=self.supervisor.format_usage(usage))
+
     def launch_iot_dashboard(self):
-        subprocess.Popen(["python3", "iot_dashboard.py"], cwd=os.path.dirname(__file__))
+        self.launch("iot_dashboard.py")
 
     def launch_hardware_demo(self):
-        subprocess.Popen(["python3", "hardware_demo.py"], cwd=os.path.dirname(__file__))
+        self.launch("hardware_demo.py")
 
     def launch_touchscreen_demo(self):
-        subprocess.Popen(["python3", "touchscreen_demo.py"], cwd=os.path.dirname(__file__))
+        self.launch("touchscreen_demo.py")
 
-    def close_app(self):
+    def close_app(self, event=None):
+        if self.host is not None:
+            self.host.close()
+        # Stop only the apps this dashboard started
+        self.supervisor.shutdown()
         self.root.quit()
         self.root.destroy()
-        os.system("pkill -f python3")
 
 if __name__ == "__main__":
+    startup_probe.mark('imports')
     root = tk.Tk()
-    app = MainDashboard(root)
+    startup_probe.mark('window')
+    app = MainDashboard(root, single_process='--single-process' in sys.argv)
+    startup_probe.mark('app')
+    startup_probe.notify_first_frame(root)
     root.mainloop()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+OpenMetrics scrape endpoint for reTerminal readings
+Keeps the latest value of every metric as it is emitted and serves them at
+http://<address>:<port>/metrics. The exposition text is rendered at most
+once per change and the cached bytes are sent to every scraper, so a scrape
+never reads a sensor and costs the same however often pollers ask.
+
+Serves OpenMetrics 1.0 to scrapers that accept it and the Prometheus 0.0.4
+text format otherwise. Connections are HTTP/1.1 keep-alive, and a poller
+that sends back the ETag of its last response gets an empty 304 until a
+value changes.
+
+    python3 metrics_exporter.py [--port 9100] [--address 127.0.0.1]
+"""
+
+import argparse
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_PORT = 9100
+
+# family -> (type, unit, help, [(metric name, labels)])
+FAMILIES = [
+    ('reterminal_cpu_usage_percent', 'gauge', 'percent', 'CPU utilisation',
+     [('cpu', '')]),
+    ('reterminal_memory_usage_percent', 'gauge', 'percent', 'Memory in use',
+     [('memory', '')]),
+    ('reterminal_memory_used_bytes', 'gauge', 'bytes', 'Memory in use',
+     [('memory_used', '')]),
+    ('reterminal_disk_usage_percent', 'gauge', 'percent', 'Root filesystem in use',
+     [('disk', '')]),
+    ('reterminal_disk_used_bytes', 'gauge', 'bytes', 'Root filesystem in use',
+     [('disk_used', '')]),
+    ('reterminal_cpu_temperature_celsius', 'gauge', 'celsius', 'CPU temperature',
+     [('temperature', '')]),
+    ('reterminal_uptime_seconds', 'gauge', 'seconds', 'Time since boot',
+     [('uptime', '')]),
+    ('reterminal_illuminance_lux', 'gauge', 'lux', 'Ambient light (LTR-303ALS-01)',
+     [('lux', '')]),
+    ('reterminal_acceleration_counts', 'gauge', 'counts', 'Latest accelerometer sample',
+     [('accel_x', 'axis="x"'), ('accel_y', 'axis="y"'), ('accel_z', 'axis="z"')]),
+    ('reterminal_accelerometer_rate_hertz', 'gauge', 'hertz', 'Accelerometer sample rate',
+     [('accel_rate', '')]),
+    ('reterminal_vibration_rms_g', 'gauge', 'g', 'Vibration RMS over the last window',
+     [('vibration_rms', '')]),
+    ('reterminal_vibration_peak_to_peak_g', 'gauge', 'g', 'Largest peak-to-peak axis',
+     [('vibration_p2p', '')]),
+    ('reterminal_vibration_dominant_hertz', 'gauge', 'hertz', 'Strongest vibration frequency',
+     [('vibration_hz', '')]),
+    ('reterminal_tilt_degrees', 'gauge', 'degrees', 'Board tilt from gravity',
+     [('pitch', 'axis="pitch"'), ('roll', 'axis="roll"')]),
+]
+
+# Per-interface readings arrive as '<prefix>:<interface>'; family ->
+# (type, unit, help, prefix), labelled by interface
+INTERFACE_FAMILIES = [
+    ('reterminal_network_receive_bytes_per_second', 'gauge', 'bytes_per_second',
+     'Bytes received per second', 'net_rx_bytes'),
+    ('reterminal_network_transmit_bytes_per_second', 'gauge', 'bytes_per_second',
+     'Bytes sent per second', 'net_tx_bytes'),
+    ('reterminal_network_receive_packets_per_second', 'gauge', 'packets_per_second',
+     'Packets received per second', 'net_rx_packets'),
+    ('reterminal_network_transmit_packets_per_second', 'gauge', 'packets_per_second',
+     'Packets sent per second', 'net_tx_packets'),
+    ('reterminal_network_errors_per_second', 'gauge', 'errors_per_second',
+     'Receive and transmit errors per second', 'net_errors'),
+    ('reterminal_network_drops_per_second', 'gauge', 'drops_per_second',
+     'Packets dropped per second', 'net_drops'),
+]
+# Lists the current interfaces; readings of any other interface are stale
+INTERFACES = 'net_interfaces'
+
+# Text readings are exported together as labels of one info metric
+INFO_FAMILY = 'reterminal_network'
+INFO_LABELS = ['hostname', 'ip', 'wifi']
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_value(value):
+    # A failed sensor read can yield NaN or inf, which int() rejects
+    if not math.isfinite(value):
+        return 'NaN' if math.isnan(value) else ('+Inf' if value > 0 else '-Inf')
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsExporter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.version = 0
+        # Distinguishes ETags of this process from those of an earlier run
+        self.epoch = f'{time.time_ns() & 0xFFFFFFFF:x}'
+        self.cache = {}  # openmetrics flag -> (version, bytes)
+        self.scrapes = 0
+        self.renders = 0
+        self.exported = {name for family in FAMILIES for name, _ in family[4]}
+        self.exported.update(INFO_LABELS)
+        self.interface_prefixes = {family[4] for family in INTERFACE_FAMILIES}
+
+    def update(self, name, value, t=None):
+        """Same signature as the metric sources' emit callback"""
+        if name == INTERFACES:
+            self.prune_interfaces(set(value.split(',')) if value else set())
+            return
+        if name not in self.exported and name.partition(':')[0] not in self.interface_prefixes:
+            return
+        with self.lock:
+            if self.values.get(name, self) != value:
+                self.values[name] = value
+                self.version += 1
+
+    def prune_interfaces(self, present):
+        with self.lock:
+            stale = [name for name in self.values
+                     if name.partition(':')[0] in self.interface_prefixes
+                     and name.partition(':')[2] not in present]
+            for name in stale:
+                del self.values[name]
+            if stale:
+                self.version += 1
+
+    def render(self, openmetrics=True):
+        """Exposition text as bytes, rebuilt only if a value changed"""
+        with self.lock:
+            self.scrapes += 1
+            cached = self.cache.get(openmetrics)
+            if cached is not None and cached[0] == self.version:
+                return cached[1]
+            values = dict(self.values)
+            version = self.version
+            self.renders += 1
+        body = self.build(values, openmetrics)
+        with self.lock:
+            self.cache[openmetrics] = (version, body)
+        return body
+
+    def etag(self, openmetrics=True):
+        """Entity tag of what render() returns now"""
+        return f'"{self.epoch}-{self.version}{"o" if openmetrics else "p"}"'
+
+    def build(self, values, openmetrics):
+        lines = []
+        for family, kind, unit, help_text, samples in FAMILIES:
+            present = [(labels, values[name]) for name, labels in samples
+                       if isinstance(values.get(name), (int, float))]
+            if not present:
+                continue  # sensor missing or not read yet
+            lines.append(f'# TYPE {family} {kind}')
+            if openmetrics:
+                lines.append(f'# UNIT {family} {unit}')
+            lines.append(f'# HELP {family} {help_text}')
+            for labels, value in present:
+                label_text = f'{{{labels}}}' if labels else ''
+                lines.append(f'{family}{label_text} {format_value(value)}')
+
+        for family, kind, unit, help_text, prefix in INTERFACE_FAMILIES:
+            present = sorted((name.partition(':')[2], value) for name, value in values.items()
+                             if name.partition(':')[0] == prefix
+                             and isinstance(value, (int, float)))
+            if not present:
+                continue
+            lines.append(f'# TYPE {family} {kind}')
+            if openmetrics:
+                lines.append(f'# UNIT {family} {unit}')
+            lines.append(f'# HELP {family} {help_text}')
+            for interface, value in present:
+                lines.append(f'{family}{{interface="{escape(interface)}"}} {format_value(value)}')
+
+        info = [f'{name}="{escape(values[name])}"' for name in INFO_LABELS
+                if isinstance(values.get(name), str)]
+        if info:
+            # Prometheus text has no info type; it is a gauge of 1 there
+            lines.append(f'# TYPE {INFO_FAMILY} info' if openmetrics
+                         else f'# TYPE {INFO_FAMILY}_info gauge')
+            lines.append(f'{INFO_FAMILY}_info{{{",".join(info)}}} 1')
+
+        if openmetrics:
+            lines.append('# EOF')
+        return ('\n'.join(lines) + '\n').encode()
+
+    def stats(self):
+        with self.lock:
+            return {'scrapes': self.scrapes, 'renders': self.renders,
+                    'metrics': len(self.values)}
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so pollers reuse connections
+    timeout = 60  # close idle connections
+    # Headers and body are separate writes; without this, Nagle plus the
+    # scraper's delayed ACK stalls every keep-alive response by ~40 ms
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        if self.path.split('?', 1)[0] != '/metrics':
+            body = b'Not found\n'
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        else:
+            exporter = self.server.exporter
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            # Taken before rendering: a change in between only costs a refetch
+            etag = exporter.etag(openmetrics)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = exporter.render(openmetrics)
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+            self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # a scrape every few seconds would flood the journal
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, exporter, address='127.0.0.1', port=DEFAULT_PORT):
+        self.exporter = exporter
+        super().__init__((address, port), MetricsHandler)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve reTerminal readings for scraping")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--address', default='127.0.0.1')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    # Standalone: sample locally with the same sources the apps use
+    from metrics_scheduler import MetricScheduler
+    from sensor_backends import get_backend
+    from system_metrics import SystemMetrics, SensorMetrics
+
+    args = parse_args()
+    address, port = args.address, args.port
+    exporter = MetricsExporter()
+    accel = get_backend().accelerometer()
+    scheduler = MetricScheduler()
+    SystemMetrics().add_to(scheduler, exporter.update)
+    SensorMetrics(accel).add_to(scheduler, exporter.update)
+    accel.start()
+    scheduler.start()
+    server = MetricsServer(exporter, address, port)
+    print(f"Serving metrics on http://{address}:{port}/metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        accel.stop()
+        server.server_close()
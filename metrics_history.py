@@ -0,0 +1,212 @@
+"""
+Metrics history store for reTerminal apps
+Keeps a fixed-capacity ring of (timestamp, value) doubles per metric in one
+flat buffer, so appends are O(1) and memory use is known up front
+(see nbytes). The buffer can be a memory-mapped file, which lets history
+survive an app restart without reading anything back in.
+
+File layout (native byte order):
+    header   magic 'RTMH', version, capacity, metric count
+    names    32 bytes per metric, NUL padded
+    seqs     u64 per metric, total samples ever appended
+    data     per metric: capacity timestamps, then capacity values
+"""
+
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+from startup_probe import lazy_import
+
+# Loaded on the first query; queries fall back to pure Python without it
+np = lazy_import('numpy')
+
+MAGIC = b'RTMH'
+VERSION = 1
+HEADER = struct.Struct('4sIII')
+NAME_SIZE = 32
+
+HISTORY_DIR = os.path.expanduser('~/.cache/reterminal')
+
+
+def history_path(app_name):
+    """Default history file for an app"""
+    return os.path.join(HISTORY_DIR, f"{app_name}_history.bin")
+
+
+class MetricsHistory:
+    def __init__(self, names, capacity=3600, path=None):
+        self.names = list(names)
+        self.capacity = capacity
+        self.path = path
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.lock = threading.Lock()
+
+        count = len(self.names)
+        self.names_offset = HEADER.size
+        self.seqs_offset = self.names_offset + NAME_SIZE * count
+        self.data_offset = self.seqs_offset + 8 * count
+        self.nbytes = self.data_offset + 16 * capacity * count
+
+        self.file = None
+        self.buffer = self.open_buffer()
+        view = memoryview(self.buffer)
+        self.seqs = view[self.seqs_offset:self.data_offset].cast('Q')
+        self.times = []
+        self.values = []
+        for i in range(count):
+            start = self.data_offset + 16 * capacity * i
+            middle = start + 8 * capacity
+            self.times.append(view[start:middle].cast('d'))
+            self.values.append(view[middle:middle + 8 * capacity].cast('d'))
+
+    def header_bytes(self):
+        names = b''.join(n.encode()[:NAME_SIZE].ljust(NAME_SIZE, b'\0') for n in self.names)
+        return HEADER.pack(MAGIC, VERSION, self.capacity, len(self.names)) + names
+
+    def open_buffer(self):
+        header = self.header_bytes()
+        if self.path is None:
+            buffer = bytearray(self.nbytes)
+            buffer[:len(header)] = header
+            return buffer
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.file = fd
+        existing = os.pread(fd, len(header), 0)
+        if existing != header or os.fstat(fd).st_size != self.nbytes:
+            # New file, or one written with other metrics/capacity: start over
+            if existing:
+                print(f"History layout changed, resetting {self.path}")
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, self.nbytes)
+            os.pwrite(fd, header, 0)
+        return mmap.mmap(fd, self.nbytes)
+
+    def append(self, name, value, t=None):
+        if value is None:
+            return
+        i = self.index[name]
+        if t is None:
+            t = time.time()
+        with self.lock:
+            seq = self.seqs[i]
+            slot = seq % self.capacity
+            self.times[i][slot] = t
+            self.values[i][slot] = value
+            self.seqs[i] = seq + 1
+
+    def clear(self, name):
+        """Forget every sample of a metric (e.g. to reuse its slot)"""
+        with self.lock:
+            self.seqs[self.index[name]] = 0
+
+    def count(self, name):
+        return min(self.seqs[self.index[name]], self.capacity)
+
+    def latest(self, name):
+        """(timestamp, value) of the newest sample, or None"""
+        i = self.index[name]
+        with self.lock:
+            seq = self.seqs[i]
+            if not seq:
+                return None
+            slot = (seq - 1) % self.capacity
+            return self.times[i][slot], self.values[i][slot]
+
+    def _window_slices(self, i, since):
+        """Ring slot ranges, oldest first, of samples with timestamp >= since
+
+        Timestamps are appended in order, so the start is found with a
+        binary search over the logical (oldest-to-newest) positions.
+        """
+        seq = self.seqs[i]
+        n = min(seq, self.capacity)
+        first = seq - n  # logical sequence of the oldest stored sample
+        times = self.times[i]
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[(first + mid) % self.capacity] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = (first + lo) % self.capacity
+        length = n - lo
+        if start + length <= self.capacity:
+            return [(start, start + length)]
+        return [(start, self.capacity), (0, start + length - self.capacity)]
+
+    def window(self, name, seconds, now=None):
+        """Samples from the last `seconds` as (timestamps, values) lists"""
+        i = self.index[name]
+        since = (time.time() if now is None else now) - seconds
+        with self.lock:
+            slices = self._window_slices(i, since)
+            times = [t for a, b in slices for t in self.times[i][a:b]]
+            values = [v for a, b in slices for v in self.values[i][a:b]]
+        return times, values
+
+    def stats(self, name, seconds, now=None):
+        """(min, max, mean, count) over the last `seconds`, or None if empty"""
+        i = self.index[name]
+        since = (time.time() if now is None else now) - seconds
+        with self.lock:
+            slices = self._window_slices(i, since)
+            count = sum(b - a for a, b in slices)
+            if not count:
+                return None
+            low, high, total = math.inf, -math.inf, 0.0
+            for a, b in slices:
+                if np is not None:
+                    chunk = np.frombuffer(self.values[i], dtype=np.float64)[a:b]
+                    low = min(low, float(chunk.min()))
+                    high = max(high, float(chunk.max()))
+                    total += float(chunk.sum())
+                else:
+                    chunk = self.values[i][a:b]
+                    low = min(low, min(chunk))
+                    high = max(high, max(chunk))
+                    total += sum(chunk)
+        return low, high, total / count, count
+
+    def flush(self):
+        if self.file is not None:
+            self.buffer.flush()
+
+    def close(self):
+        if self.file is None:
+            return
+        # Drop our memoryviews before unmapping
+        self.seqs.release()
+        for view in self.times + self.values:
+            view.release()
+        self.buffer.flush()
+        self.buffer.close()
+        os.close(self.file)
+        self.file = None
+
+
+def open_history(app_name, names, capacity=3600):
+    """File-backed history for an app, or in-memory if the file can't be used"""
+    try:
+        return MetricsHistory(names, capacity, history_path(app_name))
+    except OSError as e:
+        print(f"History not persisted ({e}), keeping it in memory")
+        return MetricsHistory(names, capacity)
+
+
+def open_history_file(path):
+    """Open an existing history file with the metrics and capacity it was
+    written with (e.g. to replay it), instead of resetting it"""
+    with open(path, 'rb') as f:
+        magic, version, capacity, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a metrics history file")
+        raw = f.read(NAME_SIZE * count)
+    names = [raw[i:i + NAME_SIZE].rstrip(b'\0').decode() for i in range(0, len(raw), NAME_SIZE)]
+    return MetricsHistory(names, capacity, path)
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Per-metric scheduler for reTerminal dashboards
+Runs each metric source on its own period from a single deadline-ordered
+thread. Sources marked blocking run on worker threads so a slow read never
+delays the fast ones. Tracks how late each tick starts (jitter).
+Read durations and tick lateness also go into per-source latency
+histograms; a read that takes longer than its period counts as an overrun.
+AsyncMetricScheduler does the same with one asyncio task per source on an
+event loop, such as the Tk-driven loop from tk_asyncio.
+
+Sources given a max_period are adaptive: each reading that stays within
+tolerance of the last significant one stretches the period by BACKOFF, up
+to max_period; a larger change or a threshold crossing snaps it back to
+the base period.
+"""
+
+import asyncio
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from latency_histogram import LatencyHistogram
+
+# Period growth per stable reading for adaptive sources
+BACKOFF = 1.5
+
+
+class MetricSource:
+    def __init__(self, name, read, period, on_value, blocking=False, only_changes=False,
+                 max_period=None, tolerance=0.0, thresholds=(), key=None):
+        self.name = name
+        self.read = read
+        self.period = period
+        self.on_value = on_value
+        self.blocking = blocking
+        # Skip on_value when the value is the same as last time
+        self.only_changes = only_changes
+
+        # Adaptive sampling; key maps a reading to the number (or tuple of
+        # numbers) compared against tolerance and thresholds
+        self.max_period = max(max_period or period, period)
+        self.tolerance = tolerance
+        self.thresholds = thresholds
+        self.key = key
+        self.effective_period = period
+        self.reference = None
+
+        self.last_value = None
+        self.has_value = False
+        self.future = None
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.last_duration = 0.0
+        self.jitter_total = 0.0
+        self.jitter_max = 0.0
+        self.jitter_last = 0.0
+        self.overruns = 0  # reads that took longer than the period
+        self.latency = LatencyHistogram()
+        self.lateness = LatencyHistogram()
+
+    def run(self):
+        start = time.monotonic()
+        try:
+            value = self.read()
+        except Exception as e:
+            self.failed(e)
+            return
+        finally:
+            self.finished(start)
+        self.deliver(value)
+
+    def failed(self, error):
+        self.errors += 1
+        print(f"Metric {self.name} error: {error}")
+
+    def finished(self, start):
+        self.last_duration = time.monotonic() - start
+        self.runs += 1
+        self.latency.record(self.last_duration)
+        if self.last_duration > self.effective_period:
+            self.overruns += 1
+
+    def deliver(self, value):
+        if self.max_period > self.period:
+            self.adapt(value)
+        if self.only_changes and self.has_value and value == self.last_value:
+            return
+        self.last_value = value
+        self.has_value = True
+        self.on_value(value)
+
+    def adapt(self, value):
+        current = self.key(value) if self.key is not None and value is not None else value
+        if self.significant(self.reference, current):
+            self.reference = current
+            self.effective_period = self.period
+        else:
+            self.effective_period = min(self.effective_period * BACKOFF, self.max_period)
+
+    def significant(self, old, new):
+        if old is None or new is None:
+            return old is not new
+        if isinstance(new, (int, float)) and isinstance(old, (int, float)):
+            old, new = (old,), (new,)
+        elif not isinstance(new, tuple):
+            return new != old  # text readings: any change counts
+        for a, b in zip(old, new):
+            if abs(b - a) > self.tolerance:
+                return True
+            for limit in self.thresholds:
+                if (a < limit) != (b < limit):
+                    return True
+        return False
+
+    def record_jitter(self, late):
+        self.jitter_last = late
+        self.lateness.record(late)
+        self.jitter_total += late
+        if late > self.jitter_max:
+            self.jitter_max = late
+
+    def stats(self):
+        ticks = self.runs + self.missed
+        return {
+            'period': self.period,
+            'effective_period': self.effective_period,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'overruns': self.overruns,
+            'last_duration_ms': self.last_duration * 1000,
+            'read_p50_ms': self.latency.percentile(50) * 1000,
+            'read_p99_ms': self.latency.percentile(99) * 1000,
+            'jitter_last_ms': self.jitter_last * 1000,
+            'jitter_mean_ms': self.jitter_total / ticks * 1000 if ticks else 0.0,
+            'jitter_max_ms': self.jitter_max * 1000,
+        }
+
+
+class MetricScheduler:
+    def __init__(self, workers=2, batch=None):
+        self.sources = []
+        # Context manager wrapped around each round of due sources, e.g.
+        # UIDispatcher.batch so their UI updates land in one callback
+        self.batch = batch or nullcontext
+        self.workers = workers
+        self.executor = None
+        self.thread = None
+        self.stop_event = None
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.queue = []
+
+    def add(self, name, read, period, on_value, blocking=False, only_changes=False, **adaptive):
+        """Register a source; it first runs as soon as the scheduler starts
+
+        adaptive: max_period, tolerance, thresholds, key (see MetricSource)
+        """
+        source = MetricSource(name, read, period, on_value, blocking, only_changes, **adaptive)
+        self.sources.append(source)
+        if self.thread is not None:
+            with self.lock:
+                heapq.heappush(self.queue, (time.monotonic(), len(self.sources) - 1))
+            self.wakeup.set()
+        return source
+
+    def start(self):
+        if self.thread is not None:
+            return
+        now = time.monotonic()
+        self.queue = [(now, i) for i in range(len(self.sources))]
+        heapq.heapify(self.queue)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix='metric')
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(self.stop_event,),
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.wakeup.set()
+        self.thread = None
+        # Don't wait for a slow read in flight; its result is simply dropped
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    def run(self, stop_event):
+        executor = self.executor
+        while not stop_event.is_set():
+            with self.lock:
+                deadline = self.queue[0][0] if self.queue else None
+            now = time.monotonic()
+            if deadline is None or deadline > now:
+                self.wakeup.wait(None if deadline is None else deadline - now)
+                self.wakeup.clear()
+                continue
+
+            # Run every source that is due as one batch
+            with self.batch():
+                while True:
+                    with self.lock:
+                        if not self.queue or self.queue[0][0] > now:
+                            break
+                        deadline, index = heapq.heappop(self.queue)
+                    source = self.sources[index]
+                    if not self.dispatch(source, deadline, now, executor):
+                        return
+                    with self.lock:
+                        heapq.heappush(self.queue, (self.next_deadline(source, deadline), index))
+
+    def dispatch(self, source, deadline, now, executor):
+        source.record_jitter(now - deadline)
+        if source.blocking:
+            # At most one read in flight per slow source
+            if source.future is None or source.future.done():
+                try:
+                    source.future = executor.submit(source.run)
+                except RuntimeError:
+                    return False  # executor shut down
+            else:
+                source.missed += 1
+        else:
+            source.run()
+        return True
+
+    def next_deadline(self, source, deadline):
+        # Relative to the schedule, not to when the read finished, so
+        # periods don't drift; slots that have already passed are skipped
+        period = source.effective_period
+        next_deadline = deadline + period
+        now = time.monotonic()
+        if next_deadline <= now:
+            skipped = int((now - next_deadline) // period) + 1
+            source.missed += skipped
+            next_deadline += skipped * period
+        return next_deadline
+
+    def stats(self):
+        return {source.name: source.stats() for source in self.sources}
+
+    def histograms(self):
+        """Full read and lateness histograms of every source, for dumps"""
+        return {source.name: {'period': source.period,
+                              'runs': source.runs,
+                              'errors': source.errors,
+                              'missed': source.missed,
+                              'overruns': source.overruns,
+                              'read': source.latency.to_dict(),
+                              'lateness': source.lateness.to_dict()}
+                for source in self.sources}
+
+    def format_stats(self):
+        lines = [f"{'metric':<14}{'period':>8}{'now':>8}{'runs':>7}{'missed':>8}{'over':>6}"
+                 f"{'read p50':>10}{'p99':>9}{'jitter mean':>13}{'max':>9}"]
+        for name, s in self.stats().items():
+            lines.append(f"{name:<14}{s['period']:>7.1f}s{s['effective_period']:>7.1f}s"
+                         f"{s['runs']:>7}{s['missed']:>8}{s['overruns']:>6}"
+                         f"{s['read_p50_ms']:>8.2f}ms{s['read_p99_ms']:>7.2f}ms"
+                         f"{s['jitter_mean_ms']:>11.2f}ms{s['jitter_max_ms']:>7.2f}ms")
+        return "\n".join(lines)
+
+
+class AsyncMetricScheduler(MetricScheduler):
+    """MetricScheduler whose sources are tasks on an asyncio loop
+
+    Fast reads and on_value run on the loop's thread (the Tk thread for a
+    TkEventLoop, so on_value may touch widgets). Blocking reads run in the
+    executor and are abandoned after timeout seconds. stop() cancels every
+    task and waits for them to finish, so no callback fires after it returns.
+    """
+
+    def __init__(self, loop, workers=2, batch=None, timeout=10.0):
+        super().__init__(workers, batch)
+        self.loop = loop
+        self.timeout = timeout
+        self.tasks = set()
+        self.running = False
+
+    def add(self, name, read, period, on_value, blocking=False, only_changes=False, **adaptive):
+        source = MetricSource(name, read, period, on_value, blocking, only_changes, **adaptive)
+        self.sources.append(source)
+        if self.running:
+            # Fallback paths may add sources from a client thread
+            self.loop.call_soon_threadsafe(self.spawn, source)
+        return source
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.workers,
+                                           thread_name_prefix='metric')
+        for source in self.sources:
+            self.spawn(source)
+
+    def spawn(self, source):
+        if self.running:
+            task = self.loop.create_task(self.run_source(source))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_source(self, source):
+        deadline = self.loop.time()
+        while True:
+            delay = deadline - self.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            source.record_jitter(self.loop.time() - deadline)
+            if not source.blocking:
+                with self.batch():
+                    source.run()
+            elif source.future is None or source.future.done():
+                # At most one read in flight per slow source
+                source.future = self.loop.create_task(self.run_blocking(source))
+                self.tasks.add(source.future)
+                source.future.add_done_callback(self.tasks.discard)
+            else:
+                source.missed += 1
+            deadline = self.next_deadline(source, deadline)
+
+    async def run_blocking(self, source):
+        start = time.monotonic()
+        try:
+            value = await asyncio.wait_for(
+                self.loop.run_in_executor(self.executor, source.read), self.timeout)
+        except asyncio.TimeoutError:
+            source.failed(f"no reading after {self.timeout:g} s")
+            return
+        except Exception as e:
+            source.failed(e)
+            return
+        finally:
+            source.finished(start)
+        if not self.running:
+            # Before Python 3.12, wait_for returns a result that arrives
+            # together with stop()'s cancellation instead of raising
+            return
+        with self.batch():
+            source.deliver(value)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks and not self.loop.is_running() and not self.loop.is_closed():
+            # Let the cancellations land before returning
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        for source in self.sources:
+            source.future = None
+        # A slow read in flight keeps its worker thread; its result is dropped
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+
+if __name__ == "__main__":
+    # Demo: a slow blocking source must not delay the 100 ms fast source
+    scheduler = MetricScheduler()
+    scheduler.add('fast', time.monotonic, 0.1, lambda v: None)
+    scheduler.add('medium', time.monotonic, 0.5, lambda v: None)
+    scheduler.add('slow', lambda: time.sleep(0.8), 1.0, lambda v: None, blocking=True)
+    # A flat reading backs off towards its 2 s ceiling
+    scheduler.add('flat', lambda: 42.0, 0.1, lambda v: None, max_period=2.0, tolerance=0.5)
+    scheduler.start()
+    time.sleep(5)
+    scheduler.stop()
+    print(scheduler.format_stats())
@@ -0,0 +1,290 @@
+"""
+Network status collection for reTerminal
+Reads hostname, interface addresses and WiFi link state without forking
+hostname/iwconfig: uses uname, psutil.net_if_addrs, /proc/net/wireless and
+the wireless-extensions SIOCGIWESSID ioctl. Per-interface throughput comes
+from deltas of the /proc/net/dev counters.
+"""
+
+import array
+import fcntl
+import os
+import socket
+import struct
+import time
+from collections import namedtuple
+
+from hw_paths import hw_path
+from metrics_history import MetricsHistory
+from startup_probe import lazy_import
+
+psutil = lazy_import('psutil')
+
+SIOCGIWESSID = 0x8B1B
+IW_ESSID_MAX_SIZE = 32
+IFNAMSIZ = 16
+
+WIRELESS_TABLE = hw_path('/proc/net/wireless')
+NET_DEV = hw_path('/proc/net/dev')
+
+WifiStatus = namedtuple('WifiStatus', 'interface essid link_quality signal_dbm')
+# Everything per second; errors and drops count both directions
+InterfaceRates = namedtuple('InterfaceRates',
+                            'interface rx_bytes tx_bytes rx_packets tx_packets errors drops')
+RATE_FIELDS = InterfaceRates._fields[1:]
+
+
+
+def stale_interface_metrics(names, interfaces):
+    """Per-interface metric names (net_<rate>:<interface>) among names whose
+    interface is not in interfaces, the value of a net_interfaces reading"""
+    present = set(interfaces.split(',')) if interfaces else set()
+    return [name for name in names
+            if name.startswith('net_') and ':' in name and name.partition(':')[2] not in present]
+
+
+# /proc/net/dev columns after "name:" that make up each rate
+RX_BYTES, RX_PACKETS, RX_ERRS, RX_DROP = 0, 1, 2, 3
+TX_BYTES, TX_PACKETS, TX_ERRS, TX_DROP = 8, 9, 10, 11
+
+
+def read_wireless_table(path=WIRELESS_TABLE):
+    """Parse /proc/net/wireless into {interface: (link quality, level dBm)}"""
+    table = {}
+    try:
+        with open(path, 'r') as f:
+            lines = f.readlines()[2:]  # two header lines
+    except OSError:
+        return table
+    for line in lines:
+        if ':' not in line:
+            continue
+        name, fields = line.split(':', 1)
+        fields = fields.split()
+        try:
+            table[name.strip()] = (float(fields[1].rstrip('.')),
+                                   float(fields[2].rstrip('.')))
+        except (IndexError, ValueError):
+            continue
+    return table
+
+
+def read_essid(sock, interface):
+    """Ask the driver for the ESSID of an interface, '' if not associated"""
+    buf = array.array('b', bytes(IW_ESSID_MAX_SIZE + 1))
+    addr, length = buf.buffer_info()
+    # struct iwreq: char ifr_name[16]; struct iw_point { void *pointer;
+    # __u16 length; __u16 flags; } padded to the 16-byte iwreq_data union
+    point = struct.pack('PHH', addr, length, 0)
+    request = interface.encode()[:IFNAMSIZ].ljust(IFNAMSIZ, b'\0')
+    request += point.ljust(max(16, len(point)), b'\0')
+    result = fcntl.ioctl(sock, SIOCGIWESSID, request)
+    essid_len = struct.unpack('PHH', result[IFNAMSIZ:IFNAMSIZ + len(point)])[1]
+    return buf.tobytes()[:essid_len].rstrip(b'\0').decode(errors='replace')
+
+
+def format_rate(bytes_per_second):
+    """1536 -> '1.5 kB/s'"""
+    for unit in ('B/s', 'kB/s', 'MB/s'):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.0f} {unit}" if unit == 'B/s' \
+                else f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
+
+
+class NetworkThroughput:
+    """Per-interface rates from successive /proc/net/dev readings
+
+    The file stays open and each sample is one pread. The previous
+    counters of every interface live in a fixed array that is updated in
+    place. Interfaces that disappear are forgotten; a counter that goes
+    backwards (interface re-created) counts as no traffic for that tick.
+    """
+
+    def __init__(self, path=NET_DEV, exclude=('lo',)):
+        self.path = path
+        self.exclude = set(exclude)
+        self.fd = None
+        self.size = 4096
+        self.counters = {}  # interface -> array of the 6 counters below
+        self.last_time = None
+
+    def read(self):
+        if self.fd is None:
+            self.fd = os.open(self.path, os.O_RDONLY)
+        while True:
+            data = os.pread(self.fd, self.size, 0)
+            if len(data) < self.size:
+                return data
+            self.size *= 2  # many interfaces; read it all in one go
+
+    def sample(self):
+        """[InterfaceRates] since the previous call ([] on the first)"""
+        try:
+            data = self.read()
+        except OSError:
+            self.close()
+            return []
+        now = time.monotonic()
+        elapsed = now - self.last_time if self.last_time is not None else None
+        self.last_time = now
+
+        rates = []
+        seen = set()
+        for line in data.split(b'\n')[2:]:  # two header lines
+            name, sep, fields = line.partition(b':')
+            if not sep:
+                continue
+            interface = name.strip().decode()
+            if interface in self.exclude:
+                continue
+            fields = fields.split()
+            try:
+                current = (int(fields[RX_BYTES]), int(fields[TX_BYTES]),
+                           int(fields[RX_PACKETS]), int(fields[TX_PACKETS]),
+                           int(fields[RX_ERRS]) + int(fields[TX_ERRS]),
+                           int(fields[RX_DROP]) + int(fields[TX_DROP]))
+            except (IndexError, ValueError):
+                continue
+            seen.add(interface)
+            previous = self.counters.get(interface)
+            if previous is None:
+                self.counters[interface] = array.array('Q', current)
+                continue
+            deltas = [0.0] * len(current)
+            for i, value in enumerate(current):
+                deltas[i] = max(value - previous[i], 0) / elapsed if elapsed else 0.0
+                previous[i] = value
+            rates.append(InterfaceRates(interface, *deltas))
+        for interface in self.counters.keys() - seen:
+            del self.counters[interface]
+        return rates
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class InterfaceHistory:
+    """RX/TX history for up to max_interfaces interfaces in fixed buffers
+
+    Each interface takes a slot of one preallocated MetricsHistory when it
+    first appears and gives it back when it disappears, so tunnels and
+    bridges coming and going never grow memory.
+    """
+
+    def __init__(self, max_interfaces=8, capacity=600):
+        self.history = MetricsHistory([f'{slot}_{direction}' for slot in range(max_interfaces)
+                                       for direction in ('rx', 'tx')], capacity)
+        self.slots = {}  # interface -> slot
+        self.free = list(range(max_interfaces - 1, -1, -1))
+
+    def record(self, rates, t=None):
+        present = {r.interface for r in rates}
+        for interface in [i for i in self.slots if i not in present]:
+            self.free.append(self.slots.pop(interface))
+        for r in rates:
+            slot = self.slots.get(r.interface)
+            if slot is None:
+                if not self.free:
+                    continue  # more interfaces than slots; show the first ones
+                slot = self.slots[r.interface] = self.free.pop()
+                self.history.clear(f'{slot}_rx')
+                self.history.clear(f'{slot}_tx')
+            self.history.append(f'{slot}_rx', r.rx_bytes, t)
+            self.history.append(f'{slot}_tx', r.tx_bytes, t)
+
+    def window(self, interface, direction, seconds):
+        """(timestamps, values) of 'rx' or 'tx' bytes/s, empty if untracked"""
+        slot = self.slots.get(interface)
+        if slot is None:
+            return [], []
+        return self.history.window(f'{slot}_{direction}', seconds)
+
+
+class NetworkStatusCollector:
+    """Cached, subprocess-free source for the dashboard's network readouts
+
+    Addresses and WiFi state are re-read at most once per max_age seconds.
+    The hostname is re-checked every hostname_interval seconds and
+    hostname_changed() tells callers when it actually changed.
+    """
+
+    def __init__(self, max_age=5.0, hostname_interval=10.0):
+        self.max_age = max_age
+        self.hostname_interval = hostname_interval
+        self.sock = None
+
+        self._hostname = None
+        self._hostname_checked = 0.0
+        self._hostname_changed = False
+        self._addresses = {}
+        self._addresses_time = None
+        self._wifi = None
+        self._wifi_time = None
+
+    def hostname(self):
+        now = time.monotonic()
+        if self._hostname is None or now - self._hostname_checked >= self.hostname_interval:
+            self._hostname_checked = now
+            name = socket.gethostname()
+            if name != self._hostname:
+                self._hostname = name
+                self._hostname_changed = True
+        return self._hostname
+
+    def hostname_changed(self):
+        """True once after each change of the hostname (and on first read)"""
+        self.hostname()
+        changed = self._hostname_changed
+        self._hostname_changed = False
+        return changed
+
+    def addresses(self):
+        """{interface: [IPv4 addresses]} for every non-loopback interface"""
+        now = time.monotonic()
+        if self._addresses_time is None or now - self._addresses_time >= self.max_age:
+            self._addresses_time = now
+            addresses = {}
+            for name, addrs in psutil.net_if_addrs().items():
+                ips = [a.address for a in addrs
+                       if a.family == socket.AF_INET and not a.address.startswith('127.')]
+                if ips:
+                    addresses[name] = ips
+            self._addresses = addresses
+        return self._addresses
+
+    def primary_address(self):
+        """First non-loopback IPv4 address, like `hostname -I | cut -d' ' -f1`"""
+        for ips in self.addresses().values():
+            return ips[0]
+        return None
+
+    def wifi(self):
+        """WifiStatus of the first wireless interface, or None if there is none"""
+        now = time.monotonic()
+        if self._wifi_time is None or now - self._wifi_time >= self.max_age:
+            self._wifi_time = now
+            self._wifi = self._read_wifi()
+        return self._wifi
+
+    def _read_wifi(self):
+        table = read_wireless_table()
+        if not table:
+            return None
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        interface = sorted(table)[0]
+        quality, level = table[interface]
+        try:
+            essid = read_essid(self.sock, interface)
+        except OSError:
+            essid = ''
+        return WifiStatus(interface, essid, quality, level)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
@@ -0,0 +1,128 @@
+"""
+On-screen latency overlay for reTerminal apps
+Shows p50/p99/max read time, overruns and missed ticks of every metric
+source, plus how long UI updates wait to be applied. Toggle it with F2 or
+a long press on the app's title; F3 or the Save button writes the full
+histograms to ~/.cache/reterminal/<app>_latency.json.
+"""
+
+import json
+import os
+import time
+import tkinter as tk
+
+from metrics_history import HISTORY_DIR
+
+LONG_PRESS_MS = 800
+REFRESH_MS = 1000
+
+
+def latency_path(app_name):
+    """Default latency dump for an app"""
+    return os.path.join(HISTORY_DIR, f"{app_name}_latency.json")
+
+
+class PerfOverlay:
+    def __init__(self, root, container, app_name, scheduler, ui, loop=None, title=None,
+                 keys=True):
+        self.root = root
+        self.container = container
+        self.app_name = app_name
+        self.scheduler = scheduler
+        self.ui = ui
+        self.loop = loop  # TkEventLoop, for the time each iteration holds the UI
+        self.frame = None
+        self.table = None
+        self.refresh_id = None
+        self.press_id = None
+        if keys:
+            # Not for screens hosted in the launcher, which share the root
+            root.bind('<F2>', self.toggle, add='+')
+            root.bind('<F3>', self.dump, add='+')
+        if title is not None:
+            title.bind('<ButtonPress-1>', self.on_press, add='+')
+            title.bind('<ButtonRelease-1>', self.on_release, add='+')
+
+    def on_press(self, event=None):
+        self.on_release()
+        self.press_id = self.root.after(LONG_PRESS_MS, self.toggle)
+
+    def on_release(self, event=None):
+        if self.press_id is not None:
+            self.root.after_cancel(self.press_id)
+            self.press_id = None
+
+    def toggle(self, event=None):
+        self.press_id = None
+        if self.frame is None:
+            self.show()
+        else:
+            self.hide()
+
+    def show(self):
+        self.frame = tk.Frame(self.container, bg='black', bd=2, relief='ridge')
+        self.table = tk.Label(self.frame, font=('Courier', 12), fg='#7CFC00', bg='black',
+                              justify='left', anchor='nw')
+        self.table.pack(padx=8, pady=(8, 4))
+        buttons = tk.Frame(self.frame, bg='black')
+        buttons.pack(pady=(0, 8))
+        tk.Button(buttons, text="Save", font=('Arial', 14), command=self.dump,
+                  width=8).pack(side='left', padx=5)
+        tk.Button(buttons, text="Close", font=('Arial', 14), command=self.hide,
+                  width=8).pack(side='left', padx=5)
+        self.frame.place(relx=1.0, x=-10, y=10, anchor='ne')
+        self.frame.lift()
+        self.refresh()
+
+    def hide(self):
+        if self.refresh_id is not None:
+            self.root.after_cancel(self.refresh_id)
+            self.refresh_id = None
+        if self.frame is not None:
+            self.frame.destroy()
+            self.frame = self.table = None
+
+    def refresh(self):
+        self.table.config(text=self.format())
+        self.refresh_id = self.root.after(REFRESH_MS, self.refresh)
+
+    def format(self):
+        lines = [f"{'source':<13}{'p50':>8}{'p99':>8}{'max':>8}{'over':>6}{'miss':>6}"]
+        for source in self.scheduler.sources:
+            h = source.latency
+            lines.append(f"{source.name[:12]:<13}{h.percentile(50) * 1000:>8.2f}"
+                         f"{h.percentile(99) * 1000:>8.2f}{h.max * 1000:>8.2f}"
+                         f"{source.overruns:>6}{source.missed:>6}")
+        rows = [('ui wait', self.ui.latency), ('ui apply', self.ui.apply_time)]
+        if self.loop is not None:
+            rows.append(('loop step', self.loop.iteration))
+        for name, h in rows:
+            lines.append(f"{name:<13}{h.percentile(50) * 1000:>8.2f}"
+                         f"{h.percentile(99) * 1000:>8.2f}{h.max * 1000:>8.2f}")
+        lines.append("all times in ms")
+        return "\n".join(lines)
+
+    def report(self):
+        report = {
+            'app': self.app_name,
+            'time': time.time(),
+            'sources': self.scheduler.histograms(),
+            'ui_latency': self.ui.latency.to_dict(),
+            'ui_apply': self.ui.apply_time.to_dict(),
+        }
+        if self.loop is not None:
+            report['loop_iteration'] = self.loop.iteration.to_dict()
+        return report
+
+    def dump(self, event=None, path=None):
+        """Write report() as JSON; returns the path"""
+        path = path or latency_path(self.app_name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+        except OSError as e:
+            print(f"Latency dump failed: {e}")
+            return None
+        print(f"Latency histograms written to {path}")
+        return path
@@ -0,0 +1,168 @@
+"""
+Cached process table for the top-N process view
+Keeps one entry per process, keyed by (pid, start time) so a reused pid is
+never mistaken for the old process, with /proc/<pid>/stat held open and
+re-read with a single pread. CPU usage is the delta of utime+stime between
+an entry's own refreshes. Each scan lists /proc once to find new and exited
+processes and then re-reads at most `budget` entries, oldest first, so the
+cost per scan stays flat however many processes are running. The top N
+are picked with a heap.
+"""
+
+import collections
+import heapq
+import os
+import time
+
+from hw_paths import hw_path
+
+PROC = hw_path('/proc')
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# Fields of /proc/<pid>/stat counted after the ")" closing the name
+UTIME, STIME, STARTTIME, RSS = 11, 12, 19, 21
+
+
+class ProcessEntry:
+    __slots__ = ('pid', 'start', 'name', 'fd', 'ticks', 'sampled', 'cpu_percent', 'rss')
+
+    def __init__(self, pid, start, name, fd):
+        self.pid = pid
+        self.start = start
+        self.name = name
+        self.fd = fd  # None when over max_open; reopened for each read
+        self.ticks = 0
+        self.sampled = None
+        self.cpu_percent = 0.0  # of one core, like top
+        self.rss = 0
+
+
+def parse_stat(data):
+    """(name, utime+stime ticks, start time, rss pages) from a stat line"""
+    close = data.rfind(b')')
+    name = data[data.find(b'(') + 1:close].decode(errors='replace')
+    fields = data[close + 2:].split()
+    return name, int(fields[UTIME]) + int(fields[STIME]), int(fields[STARTTIME]), int(fields[RSS])
+
+
+class ProcessTable:
+    def __init__(self, budget=128, max_open=512, proc=PROC):
+        self.budget = budget  # stat reads per scan
+        self.max_open = max_open  # stat files kept open between scans
+        self.proc = proc
+        self.entries = {}  # pid -> ProcessEntry
+        self.queue = collections.deque()  # entries, least recently refreshed first
+        self.open_count = 0
+        self.cpu_time = 0.0  # spent in scan()
+        self.first_scan = None
+        self.scans = 0
+
+    def read(self, pid, fd):
+        if fd is not None:
+            return os.pread(fd, 1024, 0)
+        fd = os.open(f'{self.proc}/{pid}/stat', os.O_RDONLY)
+        try:
+            return os.read(fd, 1024)
+        finally:
+            os.close(fd)
+
+    def add(self, pid, now):
+        try:
+            fd = os.open(f'{self.proc}/{pid}/stat', os.O_RDONLY) \
+                if self.open_count < self.max_open else None
+        except OSError:
+            return  # exited since the listing
+        if fd is not None:
+            self.open_count += 1
+        try:
+            name, ticks, start, rss = parse_stat(self.read(pid, fd))
+        except (OSError, ValueError, IndexError):
+            if fd is not None:
+                os.close(fd)
+                self.open_count -= 1
+            return
+        entry = self.entries[pid] = ProcessEntry(pid, start, name, fd)
+        entry.ticks, entry.sampled, entry.rss = ticks, now, rss * PAGE_SIZE
+        self.queue.append(entry)
+
+    def remove(self, pid):
+        entry = self.entries.pop(pid)
+        if entry.fd is not None:
+            os.close(entry.fd)
+            self.open_count -= 1
+        # Its queue slot is skipped when it comes up
+
+    def refresh(self, entry, now):
+        """Re-read one entry; False if the process is gone"""
+        try:
+            name, ticks, start, rss = parse_stat(self.read(entry.pid, entry.fd))
+        except (OSError, ValueError, IndexError):
+            return False  # ESRCH once the held process has exited
+        if start != entry.start:
+            return False  # pid reused by a new process
+        elapsed = now - entry.sampled
+        if elapsed > 0:
+            entry.cpu_percent = (ticks - entry.ticks) / CLOCK_TICKS / elapsed * 100
+        entry.name, entry.ticks, entry.sampled, entry.rss = name, ticks, now, rss * PAGE_SIZE
+        return True
+
+    def scan(self):
+        """Pick up new and exited processes, then refresh up to budget entries"""
+        started = time.thread_time()
+        now = time.monotonic()
+        if self.first_scan is None:
+            self.first_scan = now
+        try:
+            pids = {int(name) for name in os.listdir(self.proc) if name.isdigit()}
+        except OSError:
+            pids = set()
+        for pid in [pid for pid in self.entries if pid not in pids]:
+            self.remove(pid)
+
+        reads = 0
+        for pid in pids:
+            if pid not in self.entries:
+                if reads >= self.budget:
+                    break  # found again by the next scan
+                self.add(pid, now)
+                reads += 1
+
+        # Refresh the longest-waiting entries; new ones were just read
+        for _ in range(len(self.queue)):
+            if reads >= self.budget:
+                break
+            entry = self.queue[0]
+            if self.entries.get(entry.pid) is not entry:
+                self.queue.popleft()  # removed since it was queued
+                continue
+            if entry.sampled == now:
+                break  # reached this scan's new entries
+            self.queue.rotate(-1)
+            reads += 1
+            if not self.refresh(entry, now):
+                self.remove(entry.pid)
+        self.scans += 1
+        self.cpu_time += time.thread_time() - started
+
+    def top(self, n=5, by='cpu_percent'):
+        """The n entries with the highest cpu_percent (or rss)"""
+        return heapq.nlargest(n, self.entries.values(), key=lambda e: getattr(e, by))
+
+    def overhead(self):
+        """CPU used by scan() as a percentage of one core since the first scan"""
+        if self.first_scan is None:
+            return 0.0
+        elapsed = time.monotonic() - self.first_scan
+        return self.cpu_time / elapsed * 100 if elapsed > 0 else 0.0
+
+    def close(self):
+        for pid in list(self.entries):
+            self.remove(pid)
+        self.queue.clear()
+
+
+def format_top(entries):
+    """One 'pid name cpu% rss' line per entry"""
+    return "\n".join(f"{e.pid:>7} {e.name[:15]:<15} {e.cpu_percent:5.1f}% "
+                     f"{e.rss / (1024 * 1024):6.1f} MB" for e in entries)
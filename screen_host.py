@@ -0,0 +1,87 @@
+"""
+In-process screen switching for reTerminal apps
+Hosts the demo apps as frames inside a single Tk root so changing screens
+does not start a new interpreter
+"""
+
+import importlib
+import time
+import tkinter as tk
+
+from display_idle import DisplayIdleMonitor
+
+# App file -> (module, class); modules are imported on first use
+SCREENS = {
+    "touchscreen_demo.py": ("touchscreen_demo", "TouchscreenDemo"),
+    "hardware_demo.py": ("hardware_demo", "HardwareDemo"),
+    "iot_dashboard.py": ("iot_dashboard", "IoTDashboard"),
+    "fleet_view.py": ("fleet_view", "FleetView"),
+}
+
+
+class ScreenHost:
+    def __init__(self, root, home_frame):
+        self.root = root
+        self.home_frame = home_frame
+        self.screens = {}  # filename -> (frame, app)
+        self.current = None
+        # Duration of the most recent switch in seconds
+        self.last_switch_time = None
+        # The visible screen stops polling while the display is off
+        self.idle_monitor = DisplayIdleMonitor(root, self.suspend, self.resume)
+
+    def get_screen(self, filename):
+        """Build a screen the first time it is requested, then reuse it"""
+        if filename not in self.screens:
+            module_name, class_name = SCREENS[filename]
+            module = importlib.import_module(module_name)
+            frame = tk.Frame(self.root)
+            app = getattr(module, class_name)(self.root, container=frame,
+                                              on_back=self.show_home)
+            self.screens[filename] = (frame, app)
+        return self.screens[filename]
+
+    def show(self, filename):
+        """Switch to an app screen"""
+        start = time.perf_counter()
+        frame, app = self.get_screen(filename)
+        self.hide_current()
+        frame.pack(fill='both', expand=True)
+        app.activate()
+        self.current = filename
+        self.root.update_idletasks()
+        self.last_switch_time = time.perf_counter() - start
+
+    def show_home(self):
+        """Switch back to the launcher menu"""
+        start = time.perf_counter()
+        self.hide_current()
+        self.home_frame.pack(fill='both', expand=True)
+        self.current = None
+        self.root.update_idletasks()
+        self.last_switch_time = time.perf_counter() - start
+
+    def hide_current(self):
+        if self.current is None:
+            self.home_frame.pack_forget()
+            return
+        frame, app = self.screens[self.current]
+        app.deactivate()
+        frame.pack_forget()
+
+    def suspend(self):
+        if self.current is not None:
+            self.screens[self.current][1].deactivate()
+
+    def resume(self):
+        if self.current is not None:
+            self.screens[self.current][1].activate()
+
+    def close(self):
+        """Shut down every screen that was built, as its own exit would"""
+        for frame, app in self.screens.values():
+            app.deactivate()
+        # Screens share the root's asyncio loop, so close it only once
+        # nothing is running on it
+        for frame, app in self.screens.values():
+            app.shutdown()
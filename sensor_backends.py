@@ -0,0 +1,300 @@
+"""
+Sensor backends for reTerminal apps
+Every app reads its scalar sensors (lux, temperature) with backend.read(name)
+and gets its accelerometer stream from backend.accelerometer(), so the same
+code runs against:
+
+  real       sysfs files via the sensor registry, evdev via AccelerometerStream
+  simulated  deterministic synthetic readings; the accelerometer can run far
+             above the hardware's rate to load-test the UI and analytics
+  replay     a sensor recording (see sensor_recording) or a metrics history
+             file played back against the clock
+
+The process-wide backend comes from RETERMINAL_SENSOR_BACKEND:
+    real (default) | simulated[:RATE_HZ[:SEED]] | replay:PATH[:SPEED]
+"""
+
+import abc
+import bisect
+import math
+import os
+import random
+import select
+import struct
+import threading
+import time
+
+from accel_reader import AccelerometerStream, EVENT_FORMAT, EV_ABS, EV_SYN, SYN_REPORT, \
+    ABS_X, ABS_Y, ABS_Z
+from sensor_registry import get_registry
+
+# One accelerometer sample as evdev frames: X, Y, Z, SYN_REPORT
+SAMPLE_FRAMES = struct.Struct(EVENT_FORMAT * 4)
+
+
+def pack_sample(t, x, y, z):
+    sec = int(t)
+    usec = int((t - sec) * 1e6)
+    return SAMPLE_FRAMES.pack(sec, usec, EV_ABS, ABS_X, x,
+                              sec, usec, EV_ABS, ABS_Y, y,
+                              sec, usec, EV_ABS, ABS_Z, z,
+                              sec, usec, EV_SYN, SYN_REPORT, 0)
+
+
+class SensorBackend(abc.ABC):
+    """Interface shared by all backends"""
+    name = 'none'
+
+    def read(self, name):
+        """Scaled reading of a scalar sensor, or None if unavailable"""
+        return None
+
+    @abc.abstractmethod
+    def accelerometer(self):
+        """A new AccelerometerStream-compatible object (start/stop/ring)"""
+
+    def close(self):
+        pass
+
+
+class RealBackend(SensorBackend):
+    name = 'real'
+
+    def __init__(self, registry=None):
+        self.registry = registry or get_registry()
+
+    def read(self, name):
+        return self.registry.read(name)
+
+    def accelerometer(self):
+        return AccelerometerStream()
+
+    def close(self):
+        self.registry.close()
+
+
+class GeneratedStream(AccelerometerStream):
+    """AccelerometerStream fed by a thread that generates evdev frames
+    instead of reading the device; decoding and the ring are unchanged"""
+
+    tick = 0.01  # seconds of samples generated per wake-up
+
+    def __init__(self, capacity=4096):
+        super().__init__(device=None, capacity=capacity)
+
+    def start(self, loop=None):
+        # Generation paces itself with sleeps, so it keeps its own thread
+        super().start()
+
+    def run(self, wake_fd):
+        try:
+            deadline = time.monotonic()
+            while True:
+                data = self.generate(time.time())
+                if data:
+                    self.decode(memoryview(data))
+                deadline += self.tick
+                delay = deadline - time.monotonic()
+                if delay < -1.0:
+                    deadline = time.monotonic()  # fell far behind; don't burst
+                if select.select([wake_fd], [], [], max(delay, 0))[0]:
+                    return
+        finally:
+            os.close(wake_fd)
+
+    def generate(self, now):
+        """evdev bytes for the samples due by wall-clock time now"""
+        return b''
+
+
+class SimulatedAccelerometer(GeneratedStream):
+    """Gravity on Z plus 25 Hz and 7 Hz vibration and repeatable noise,
+    at counts_per_g = 1000 like the lis3lv02d driver"""
+
+    def __init__(self, rate=400.0, seed=1, capacity=4096):
+        super().__init__(capacity)
+        self.rate = rate
+        rng = random.Random(seed)
+        self.noise = [int(rng.gauss(0, 5)) for _ in range(4093)]
+        self.index = 0
+        self.due = 0.0  # fractional samples carried between ticks
+        self.last = None
+
+    def generate(self, now):
+        if self.last is None:
+            self.last = now
+            return b''
+        self.due += (now - self.last) * self.rate
+        self.last = now
+        count = int(self.due)
+        self.due -= count
+        if not count:
+            return b''
+        interval = 1.0 / self.rate
+        noise = self.noise
+        parts = []
+        for k in range(count):
+            i = self.index + k
+            t = now - (count - 1 - k) * interval
+            phase = i * interval
+            x = int(40 * math.sin(2 * math.pi * 25 * phase)) + noise[i % 4093]
+            y = int(15 * math.sin(2 * math.pi * 7 * phase)) + noise[(i * 7) % 4093]
+            z = 1000 + noise[(i * 13) % 4093]
+            parts.append(pack_sample(t, x, y, z))
+        self.index += count
+        return b''.join(parts)
+
+
+class SimulatedBackend(SensorBackend):
+    name = 'simulated'
+
+    def __init__(self, rate=400.0, seed=1):
+        self.rate = rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def read(self, name):
+        now = time.time()
+        if name == 'lux':
+            # Daylight curve by local hour, brightest at 14:00
+            hour = time.localtime(now).tm_hour + time.localtime(now).tm_min / 60
+            daylight = max(0.0, math.cos((hour - 14) / 12 * math.pi))
+            return round(10 + 640 * daylight + self.rng.uniform(-5, 5), 1)
+        if name == 'temperature':
+            return round(47 + 4 * math.sin(now / 120) + self.rng.uniform(-0.3, 0.3), 2)
+        return None
+
+    def accelerometer(self):
+        return SimulatedAccelerometer(self.rate, self.seed)
+
+
+class ReplayAccelerometer(GeneratedStream):
+    def __init__(self, backend, capacity=4096):
+        super().__init__(capacity)
+        self.backend = backend
+        self.next = 0  # unwrapped index of the next sample to emit
+
+    def generate(self, now):
+        b = self.backend
+        times, xs, ys, zs = b.accel
+        count = len(times)
+        if not count:
+            return b''
+        position = b.position()
+        parts = []
+        while True:
+            lap, k = divmod(self.next, count)
+            if not b.loop and lap:
+                break
+            sample_position = lap * b.span + times[k]
+            if sample_position > position:
+                break
+            parts.append(pack_sample(b.epoch + sample_position / b.speed, xs[k], ys[k], zs[k]))
+            self.next += 1
+        return b''.join(parts)
+
+
+class ReplayBackend(SensorBackend):
+    """Plays recorded samples back; scalar reads return the value current
+    at the replay position, the accelerometer re-emits recorded samples"""
+    name = 'replay'
+
+    def __init__(self, scalars, accel, speed=1.0, loop=True):
+        # scalars: {name: (times, values)}; accel: (times, xs, ys, zs);
+        # timestamps are absolute and sorted
+        starts = [ts[0] for ts, _ in scalars.values() if ts]
+        if accel[0]:
+            starts.append(accel[0][0])
+        self.t0 = min(starts) if starts else 0.0
+        self.scalars = {name: ([t - self.t0 for t in ts], list(vs))
+                        for name, (ts, vs) in scalars.items()}
+        self.accel = ([t - self.t0 for t in accel[0]],) + tuple(list(a) for a in accel[1:])
+        ends = [ts[-1] for ts, _ in self.scalars.values() if ts]
+        if self.accel[0]:
+            ends.append(self.accel[0][-1])
+        # A lap is the recording plus one second, so laps don't overlap
+        self.span = (max(ends) if ends else 0.0) + 1.0
+        self.speed = speed
+        self.loop = loop
+        self.epoch = time.time()
+        self.start = time.monotonic()
+
+    @classmethod
+    def from_history(cls, path, speed=1.0, loop=True):
+        """Replay a MetricsHistory file, e.g. hardware_demo's"""
+        from metrics_history import open_history_file
+        history = open_history_file(path)
+        try:
+            scalars = {name: history.window(name, math.inf)
+                       for name in ('lux', 'temperature') if name in history.index}
+            if all(axis in history.index for axis in ('accel_x', 'accel_y', 'accel_z')):
+                times, xs = history.window('accel_x', math.inf)
+                ys = history.window('accel_y', math.inf)[1]
+                zs = history.window('accel_z', math.inf)[1]
+                n = min(len(times), len(ys), len(zs))
+                accel = (times[:n], [int(v) for v in xs[:n]],
+                         [int(v) for v in ys[:n]], [int(v) for v in zs[:n]])
+            else:
+                accel = ([], [], [], [])
+        finally:
+            history.close()
+        return cls(scalars, accel, speed, loop)
+
+    def position(self):
+        """Seconds into the recording, counting completed laps"""
+        position = (time.monotonic() - self.start) * self.speed
+        return position if self.loop else min(position, self.span)
+
+    def read(self, name):
+        times, values = self.scalars.get(name, ((), ()))
+        if not times:
+            return None
+        position = self.position() % self.span
+        i = bisect.bisect_right(times, position) - 1
+        return values[i] if i >= 0 else None
+
+    def accelerometer(self):
+        return ReplayAccelerometer(self)
+
+
+def backend_from_spec(spec):
+    """Backend for a RETERMINAL_SENSOR_BACKEND value"""
+    kind, _, options = spec.partition(':')
+    if kind == 'real':
+        return RealBackend()
+    if kind in ('simulated', 'sim'):
+        parts = options.split(':') if options else []
+        rate = float(parts[0]) if parts else 400.0
+        seed = int(parts[1]) if len(parts) > 1 else 1
+        return SimulatedBackend(rate, seed)
+    if kind == 'replay':
+        path, _, speed = options.rpartition(':')
+        try:
+            speed = float(speed)
+        except ValueError:
+            path, speed = options, 1.0  # no speed given
+        with open(path, 'rb') as f:
+            magic = f.read(4)
+        if magic == b'RTRC':
+            from sensor_recording import RecordingBackend
+            return RecordingBackend(path, speed)
+        return ReplayBackend.from_history(path, speed)
+    raise ValueError(f"unknown sensor backend {spec!r}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide backend chosen by RETERMINAL_SENSOR_BACKEND"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            spec = os.environ.get('RETERMINAL_SENSOR_BACKEND', 'real')
+            try:
+                _backend = backend_from_spec(spec)
+            except (OSError, ValueError) as e:
+                print(f"Sensor backend {spec!r} unavailable ({e}), using real sensors")
+                _backend = RealBackend()
+        return _backend
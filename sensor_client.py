@@ -0,0 +1,152 @@
+"""
+Client for the reTerminal sensor daemon
+Attaches to sensor_daemon.py over its Unix socket, returns the current
+snapshot and history on connect, and streams updates to a callback from a
+reader thread.
+"""
+
+import queue
+import socket
+import struct
+import threading
+
+import sensor_protocol as proto
+
+
+class SensorClient:
+    def __init__(self, path=proto.SOCKET_PATH):
+        self.path = path
+        self.sock = None
+        self.reader = proto.FrameReader()
+        self.names = []
+        self.ids = {}
+        self.latest = {}  # name -> (timestamp, value)
+        self.callback = None
+        self.on_close = None
+        self.histories = queue.Queue()
+        self.thread = None
+        self.closed = False
+
+    @classmethod
+    def attach(cls, path=proto.SOCKET_PATH, timeout=0.5):
+        """A connected client, or None if no daemon is running"""
+        client = cls(path)
+        try:
+            client.connect(timeout)
+        except (OSError, ValueError, IndexError, struct.error):
+            client.close()
+            return None
+        return client
+
+    def connect(self, timeout=0.5):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(self.path)
+        # The daemon opens with the name table and a snapshot
+        got_snapshot = False
+        while not got_snapshot:
+            data = self.sock.recv(65536)
+            if not data:
+                raise OSError("sensor daemon closed the connection")
+            for msg_type, payload in self.reader.feed(data):
+                self.handle(msg_type, payload)
+                got_snapshot = got_snapshot or msg_type == proto.SNAPSHOT
+        self.sock.settimeout(None)
+        self.thread = threading.Thread(target=self.read_loop, daemon=True)
+        self.thread.start()
+
+    def handle(self, msg_type, payload):
+        if msg_type == proto.NAMES:
+            self.names = proto.decode_names(payload)
+            self.ids = {name: i for i, name in enumerate(self.names) if name}
+            # Metrics the daemon dropped (gone interfaces) are not current
+            self.latest = {name: v for name, v in self.latest.items() if name in self.ids}
+        elif msg_type in (proto.SNAPSHOT, proto.UPDATE):
+            records = [(self.names[i], t, v) for i, t, v in proto.decode_records(payload)]
+            for name, t, value in records:
+                self.latest[name] = (t, value)
+            callback = self.callback
+            if msg_type == proto.UPDATE and callback is not None:
+                callback(records)
+        elif msg_type == proto.HISTORY:
+            self.histories.put(proto.decode_history(payload))
+
+    def read_loop(self):
+        try:
+            while True:
+                data = self.sock.recv(65536)
+                if not data:
+                    break
+                for msg_type, payload in self.reader.feed(data):
+                    self.handle(msg_type, payload)
+        except OSError:
+            pass
+        except (ValueError, IndexError, struct.error) as e:
+            # A frame we can't decode (e.g. an id missing from the name
+            # table); treat it like a lost daemon so the app falls back
+            print(f"Sensor daemon protocol error: {e!r}")
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.closed = True
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
+
+    def snapshot(self):
+        """{name: (timestamp, value)} as of the latest message"""
+        return dict(self.latest)
+
+    def history(self, name, seconds, timeout=2.0):
+        """(timestamps, values) of a metric over the last `seconds`"""
+        metric_id = self.ids.get(name)
+        if metric_id is None or self.closed:
+            return [], []
+        self.sock.sendall(proto.frame(proto.HISTORY_REQUEST,
+                                      proto.HISTORY_QUERY.pack(metric_id, seconds)))
+        try:
+            while True:
+                got_id, times, values = self.histories.get(timeout=timeout)
+                if got_id == metric_id:
+                    return times, values
+        except queue.Empty:
+            return [], []
+
+    def subscribe(self, callback, on_close=None):
+        """Call callback([(name, timestamp, value), ...]) for every update.
+        on_close is called when the daemon goes away, also while
+        unsubscribed; False (after calling on_close) if it already has"""
+        self.callback = callback
+        self.on_close = on_close
+        if not self.closed:
+            try:
+                self.sock.sendall(proto.frame(proto.SUBSCRIBE))
+                return True
+            except OSError:
+                pass
+        # The daemon died while we were unsubscribed, or just now
+        self.callback = None
+        if on_close is not None and self.on_close is on_close:
+            self.on_close = None
+            on_close()
+        return False
+
+    def unsubscribe(self):
+        # on_close stays set, so a daemon dying while the app is hidden is
+        # still reported
+        self.callback = None
+        if not self.closed:
+            try:
+                self.sock.sendall(proto.frame(proto.UNSUBSCRIBE))
+            except OSError:
+                pass
+
+    def close(self):
+        self.on_close = None
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
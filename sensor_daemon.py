@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+reTerminal sensor daemon
+One background process that owns all system and sensor sampling and serves
+the readings to any number of apps over a Unix domain socket
+(see sensor_protocol for the wire format). Sampling costs the same no
+matter how many screens are attached, and a newly started app gets current
+values and history immediately.
+
+    python3 sensor_daemon.py [--socket PATH] [--metrics-port PORT [--metrics-address ADDR]]
+"""
+
+import argparse
+import os
+import selectors
+import signal
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import sensor_protocol as proto
+from metrics_exporter import INTERFACES, MetricsExporter, MetricsServer
+from metrics_history import open_history
+from metrics_scheduler import MetricScheduler
+from network_status import stale_interface_metrics
+from sensor_backends import get_backend
+from system_metrics import SystemMetrics, SensorMetrics
+try:
+    from vibration import VibrationAnalyzer
+except ImportError:  # numpy not installed; vibration analytics disabled
+    VibrationAnalyzer = None
+
+HISTORY_METRICS = ['cpu', 'memory', 'disk', 'temperature', 'lux',
+                   'accel_x', 'accel_y', 'accel_z', 'vibration_rms']
+
+# A subscriber that stops reading is dropped once this much is queued
+MAX_BUFFERED = 1 << 20
+
+
+class Client:
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = proto.FrameReader()
+        self.out = bytearray()
+        self.subscribed = False
+        self.names_sent = None  # version of the last name table sent
+
+
+class SensorServer:
+    def __init__(self, path, daemon):
+        self.path = path
+        self.daemon = daemon
+        self.selector = selectors.DefaultSelector()
+        self.clients = {}
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+
+        self.remove_stale_socket()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(16)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+
+    def remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)  # left behind by a daemon that died
+        else:
+            raise RuntimeError(f"another sensor daemon is serving {self.path}")
+        finally:
+            probe.close()
+
+    def wake(self):
+        """Ask the server thread to publish new readings"""
+        try:
+            os.write(self.wake_w, b'x')
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def serve_forever(self, stop_event):
+        while not stop_event.is_set():
+            for key, events in self.selector.select(timeout=1.0):
+                if key.fileobj is self.listener:
+                    self.accept()
+                elif key.fileobj == self.wake_r:
+                    try:
+                        while os.read(self.wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self.publish()
+                else:
+                    client = self.clients.get(key.fileobj)
+                    if client is None:
+                        continue
+                    if events & selectors.EVENT_READ:
+                        self.receive(client)
+                    if events & selectors.EVENT_WRITE and client.sock in self.clients:
+                        self.flush(client)
+        self.close()
+
+    def accept(self):
+        try:
+            sock, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        client = Client(sock)
+        self.clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ)
+        # Current values straight away, before any subscription
+        version, names, records = self.daemon.snapshot()
+        client.names_sent = version
+        self.send(client, proto.encode_names(names) +
+                  proto.encode_records(proto.SNAPSHOT, records))
+
+    def receive(self, client):
+        try:
+            data = client.sock.recv(65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.drop(client)
+            return
+        try:
+            messages = client.reader.feed(data)
+        except ValueError:
+            self.drop(client)
+            return
+        for msg_type, payload in messages:
+            if msg_type == proto.SUBSCRIBE:
+                client.subscribed = True
+            elif msg_type == proto.UNSUBSCRIBE:
+                client.subscribed = False
+            elif msg_type == proto.HISTORY_REQUEST:
+                metric_id, seconds = proto.HISTORY_QUERY.unpack(payload)
+                times, values = self.daemon.history_window(metric_id, seconds)
+                self.send(client, proto.encode_history(metric_id, times, values))
+
+    def publish(self):
+        version, names, records = self.daemon.take_updates()
+        if not records:
+            return
+        # Encoded once, whatever the number of subscribers
+        update = proto.encode_records(proto.UPDATE, records)
+        table = None
+        for client in list(self.clients.values()):
+            if not client.subscribed:
+                continue
+            if client.names_sent != version:
+                table = table or proto.encode_names(names)
+                client.names_sent = version
+                self.send(client, table + update)
+            else:
+                self.send(client, update)
+
+    def send(self, client, data):
+        client.out += data
+        self.flush(client)
+
+    def flush(self, client):
+        try:
+            sent = client.sock.send(client.out)
+            del client.out[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.drop(client)
+            return
+        if len(client.out) > MAX_BUFFERED:
+            print("Dropping sensor client that stopped reading")
+            self.drop(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.out else 0)
+        self.selector.modify(client.sock, events)
+
+    def drop(self, client):
+        self.clients.pop(client.sock, None)
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def close(self):
+        for client in list(self.clients.values()):
+            self.drop(client)
+        self.selector.close()
+        self.listener.close()
+        os.close(self.wake_r)
+        os.close(self.wake_w)
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class SensorDaemon:
+    def __init__(self, path=proto.SOCKET_PATH, metrics_endpoint=None):
+        self.lock = threading.Lock()
+        self.names = []  # by id, '' for a free id
+        self.ids = {}
+        self.free_ids = []  # of metrics that went away, reused first
+        self.names_version = 0  # bumped whenever an id changes name
+        self.latest = {}  # id -> (timestamp, value)
+        self.dirty = {}  # id -> None, in emission order
+        self.history = open_history('sensor_daemon', HISTORY_METRICS)
+        # Optional OpenMetrics endpoint, (address, port)
+        self.exporter = MetricsExporter() if metrics_endpoint else None
+        self.metrics_server = None
+        self.metrics_endpoint = metrics_endpoint
+
+        self.backend = get_backend()
+        self.accel = self.backend.accelerometer()
+        self.vibration = VibrationAnalyzer(self.accel.ring) if VibrationAnalyzer else None
+        self.scheduler = MetricScheduler(batch=self.batch)
+        SystemMetrics(sensors=self.backend).add_to(self.scheduler, self.emit)
+        SensorMetrics(self.accel, self.vibration, self.backend).add_to(self.scheduler, self.emit)
+        self.server = SensorServer(path, self)
+        self.stop_event = threading.Event()
+
+    def emit(self, name, value, t=None):
+        if t is None:
+            t = time.time()
+        with self.lock:
+            if name == INTERFACES:
+                # Interfaces come and go (veth, docker, usb0); free their ids
+                self.forget(stale_interface_metrics(self.ids, value))
+            metric_id = self.ids.get(name)
+            if metric_id is None:
+                metric_id = self.assign_id(name)
+            if metric_id is not None:
+                self.latest[metric_id] = (t, value)
+                self.dirty[metric_id] = None
+        if name in self.history.index and isinstance(value, (int, float)):
+            self.history.append(name, value, t)
+        if self.exporter is not None:
+            self.exporter.update(name, value, t)
+
+    def assign_id(self, name):
+        """A free id for a new metric, None once all are taken (lock held)"""
+        if self.free_ids:
+            metric_id = self.free_ids.pop()
+            self.names[metric_id] = name
+        elif len(self.names) < proto.MAX_METRICS:
+            metric_id = len(self.names)
+            self.names.append(name)
+        else:
+            return None
+        self.ids[name] = metric_id
+        self.names_version += 1
+        return metric_id
+
+    def forget(self, names):
+        """Free the ids of metrics that no longer exist (lock held)"""
+        for name in names:
+            metric_id = self.ids.pop(name)
+            self.names[metric_id] = ''
+            self.latest.pop(metric_id, None)
+            self.dirty.pop(metric_id, None)
+            self.free_ids.append(metric_id)
+        if names:
+            self.names_version += 1
+
+    @contextmanager
+    def batch(self):
+        """Publish each scheduler round's readings as one UPDATE"""
+        yield
+        if self.dirty:
+            self.server.wake()
+
+    def snapshot(self):
+        with self.lock:
+            records = [(i, t, v) for i, (t, v) in self.latest.items()]
+            return self.names_version, list(self.names), records
+
+    def take_updates(self):
+        with self.lock:
+            # In first emission order, so handlers that render on the last
+            # metric of a group (net_interfaces) see the rest of it first,
+            # even when reused ids are out of order
+            records = [(i,) + self.latest[i] for i in self.dirty]
+            self.dirty.clear()
+            return self.names_version, list(self.names), records
+
+    def history_window(self, metric_id, seconds):
+        with self.lock:
+            name = self.names[metric_id] if metric_id < len(self.names) else None
+        if name not in self.history.index:
+            return [], []
+        return self.history.window(name, seconds)
+
+    def run(self):
+        self.accel.start()
+        self.scheduler.start()
+        if self.exporter is not None:
+            self.metrics_server = MetricsServer(self.exporter, *self.metrics_endpoint).start()
+        try:
+            self.server.serve_forever(self.stop_event)
+        finally:
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.scheduler.stop()
+            self.accel.stop()
+            self.history.flush()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve reTerminal sensor readings to apps")
+    parser.add_argument('--socket', metavar='PATH', default=proto.SOCKET_PATH,
+                        help="Unix socket to listen on")
+    parser.add_argument('--metrics-port', metavar='PORT', type=int,
+                        help="also serve OpenMetrics on this port")
+    parser.add_argument('--metrics-address', metavar='ADDR', default='127.0.0.1')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    path = args.socket
+    metrics_endpoint = None
+    if args.metrics_port is not None:
+        metrics_endpoint = (args.metrics_address, args.metrics_port)
+    daemon = SensorDaemon(path, metrics_endpoint)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    print(f"Serving sensor readings on {path}")
+    if metrics_endpoint:
+        print(f"Serving metrics on http://{metrics_endpoint[0]}:{metrics_endpoint[1]}/metrics")
+    daemon.run()
@@ -0,0 +1,133 @@
+"""
+Wire format for the reTerminal sensor daemon
+Every message is a 5-byte header (payload length u32, type u8) followed by
+a binary payload; all integers and doubles are little-endian.
+
+Metrics are referred to by a u16 id. The daemon sends the id -> name table
+(NAMES) before any record that uses a new or reused id; each table replaces
+the last, and an id whose metric went away (a network interface that
+disappeared) is '' until it is reused. A record is
+    id u16, timestamp f64, kind u8, then a f64 (kind 0), a u16-length
+    UTF-8 string (kind 1) or nothing (kind 2, value unavailable)
+"""
+
+import os
+import struct
+
+SOCKET_PATH = os.environ.get(
+    'RETERMINAL_SENSOR_SOCKET',
+    os.path.join(os.environ.get('XDG_RUNTIME_DIR', '/tmp'), 'reterminal-sensors.sock'))
+
+# Daemon -> client
+NAMES = 1
+SNAPSHOT = 2
+UPDATE = 3
+HISTORY = 4
+# Client -> daemon
+SUBSCRIBE = 10
+UNSUBSCRIBE = 11
+HISTORY_REQUEST = 12
+
+HEADER = struct.Struct('<IB')
+COUNT = struct.Struct('<H')
+RECORD = struct.Struct('<HdB')
+NUMBER = struct.Struct('<d')
+HISTORY_HEADER = struct.Struct('<HI')
+HISTORY_QUERY = struct.Struct('<Hd')
+
+KIND_NUMBER = 0
+KIND_TEXT = 1
+KIND_NONE = 2
+
+MAX_MESSAGE = 1 << 22
+MAX_METRICS = 1 << 16  # ids are u16
+
+
+def frame(msg_type, payload=b''):
+    return HEADER.pack(len(payload), msg_type) + payload
+
+
+def encode_names(names):
+    parts = [COUNT.pack(len(names))]
+    for name in names:
+        data = name.encode()
+        parts.append(bytes((len(data),)) + data)
+    return frame(NAMES, b''.join(parts))
+
+
+def decode_names(payload):
+    count, = COUNT.unpack_from(payload)
+    names, offset = [], COUNT.size
+    for _ in range(count):
+        length = payload[offset]
+        names.append(payload[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+    return names
+
+
+def encode_records(msg_type, records):
+    """records: iterable of (id, timestamp, value)"""
+    parts = []
+    for metric_id, t, value in records:
+        if value is None:
+            parts.append(RECORD.pack(metric_id, t, KIND_NONE))
+        elif isinstance(value, str):
+            data = value.encode()
+            parts.append(RECORD.pack(metric_id, t, KIND_TEXT) + COUNT.pack(len(data)) + data)
+        else:
+            parts.append(RECORD.pack(metric_id, t, KIND_NUMBER) + NUMBER.pack(value))
+    return frame(msg_type, COUNT.pack(len(parts)) + b''.join(parts))
+
+
+def decode_records(payload):
+    count, = COUNT.unpack_from(payload)
+    records, offset = [], COUNT.size
+    for _ in range(count):
+        metric_id, t, kind = RECORD.unpack_from(payload, offset)
+        offset += RECORD.size
+        if kind == KIND_NUMBER:
+            value, = NUMBER.unpack_from(payload, offset)
+            offset += NUMBER.size
+        elif kind == KIND_TEXT:
+            length, = COUNT.unpack_from(payload, offset)
+            offset += COUNT.size
+            value = payload[offset:offset + length].decode()
+            offset += length
+        else:
+            value = None
+        records.append((metric_id, t, value))
+    return records
+
+
+def encode_history(metric_id, times, values):
+    count = len(times)
+    samples = [x for pair in zip(times, values) for x in pair]
+    return frame(HISTORY, HISTORY_HEADER.pack(metric_id, count) +
+                 struct.pack(f'<{2 * count}d', *samples))
+
+
+def decode_history(payload):
+    metric_id, count = HISTORY_HEADER.unpack_from(payload)
+    samples = struct.unpack_from(f'<{2 * count}d', payload, HISTORY_HEADER.size)
+    return metric_id, list(samples[0::2]), list(samples[1::2])
+
+
+class FrameReader:
+    """Splits a byte stream into (type, payload) messages"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer += data
+        messages = []
+        while len(self.buffer) >= HEADER.size:
+            length, msg_type = HEADER.unpack_from(self.buffer)
+            if length > MAX_MESSAGE:
+                raise ValueError(f"message too large ({length} bytes)")
+            end = HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            messages.append((msg_type, bytes(self.buffer[HEADER.size:end])))
+            del self.buffer[:end]
+        return messages
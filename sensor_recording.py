@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Compact recording and replay of reTerminal sensor streams
+A recording captures every accelerometer sample plus the lux and
+temperature readings, so a fault seen in the field can be replayed on a
+desk exactly as the app saw it.
+
+File layout (little-endian):
+    header   magic 'RTRC', version u16, record size u16
+    chunks   'CHNK', codec u8 (0 raw, 1 zlib), record count u32,
+             payload size u32, first and last timestamp f64, then payload
+    record   timestamp f64, channel u8, three f32 values
+             (accel: x, y, z counts; lux/temperature: value, 0, 0)
+
+Records are buffered and written one whole chunk at a time with a single
+append, so the SD card sees few, large writes; a chunk cut short by a crash
+is ignored on replay. Recordings are read through mmap one chunk at a time.
+
+Records are sorted by time within a chunk, but a late batch (buffered
+accelerometer samples) can hold records older than the end of the chunk
+before it, so chunk time ranges may overlap. Readers look a time up by
+the running maximum of chunk end times, which never decreases.
+
+    python3 sensor_recording.py record FILE [--seconds N] [--raw]
+    python3 sensor_recording.py info FILE
+    python3 sensor_recording.py replay FILE [--speed N]   (0 = as fast as possible)
+"""
+
+import argparse
+import bisect
+import collections
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from sensor_backends import SensorBackend, GeneratedStream, pack_sample
+
+MAGIC = b'RTRC'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+CHUNK_MAGIC = b'CHNK'
+CHUNK_HEADER = struct.Struct('<4sBIIdd')
+RECORD = struct.Struct('<dBfff')
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+CHANNELS = ['accel', 'lux', 'temperature']
+CHANNEL_IDS = {name: i for i, name in enumerate(CHANNELS)}
+
+
+class SensorRecorder:
+    def __init__(self, path, compress=True, chunk_records=8192, flush_interval=30.0):
+        self.path = path
+        self.codec = CODEC_ZLIB if compress else CODEC_RAW
+        self.chunk_records = chunk_records  # ~170 KB of raw records
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+        self.count = 0
+        self.first_t = self.last_t = None
+        self.ordered = True
+        self.last_flush = time.monotonic()
+
+        self.records = 0
+        self.chunks = 0
+        self.bytes_written = 0
+
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if os.fstat(self.fd).st_size == 0:
+            self.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size))
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+        self.bytes_written += len(data)
+
+    def record(self, channel, t, a, b=0.0, c=0.0):
+        """Append one reading; channel is 'accel', 'lux' or 'temperature'"""
+        with self.lock:
+            self.buffer += RECORD.pack(t, CHANNEL_IDS[channel], a, b, c)
+            self.added(t, 1)
+
+    def record_samples(self, samples):
+        """Append accelerometer (t, x, y, z) samples, e.g. SampleRing.since()"""
+        if not samples:
+            return
+        accel = CHANNEL_IDS['accel']
+        with self.lock:
+            self.buffer += b''.join(RECORD.pack(t, accel, x, y, z) for t, x, y, z in samples)
+            self.added(samples[-1][0], len(samples), samples[0][0])
+
+    def added(self, last_t, count, first_t=None):
+        first_t = last_t if first_t is None else first_t
+        if self.first_t is None:
+            self.first_t = first_t
+        elif first_t < self.last_t:
+            # e.g. a second of buffered accelerometer samples after a
+            # reading taken just now
+            self.ordered = False
+        self.last_t = last_t
+        self.count += count
+        self.records += count
+        if (self.count >= self.chunk_records or
+                time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush_chunk()
+
+    def flush_chunk(self):
+        self.last_flush = time.monotonic()
+        if not self.count:
+            return
+        if self.ordered:
+            payload = bytes(self.buffer)
+        else:
+            # Replay expects time order within a chunk
+            size = RECORD.size
+            times = [RECORD.unpack_from(self.buffer, i)[0]
+                     for i in range(0, len(self.buffer), size)]
+            view = memoryview(self.buffer)
+            order = sorted(range(self.count), key=times.__getitem__)
+            payload = b''.join(view[i * size:(i + 1) * size] for i in order)
+            self.first_t, self.last_t = times[order[0]], times[order[-1]]
+            view.release()
+        if self.codec == CODEC_ZLIB:
+            payload = zlib.compress(payload, 6)
+        header = CHUNK_HEADER.pack(CHUNK_MAGIC, self.codec, self.count, len(payload),
+                                   self.first_t, self.last_t)
+        # Header and payload in one append: one write per chunk
+        self.write(header + payload)
+        self.chunks += 1
+        self.buffer.clear()
+        self.count = 0
+        self.first_t = self.last_t = None
+        self.ordered = True
+
+    def flush(self):
+        with self.lock:
+            self.flush_chunk()
+
+    def stats(self):
+        raw = FILE_HEADER.size + self.records * RECORD.size
+        return {
+            'records': self.records,
+            'chunks': self.chunks,
+            'bytes_written': self.bytes_written,
+            'bytes_per_record': self.bytes_written / self.records if self.records else 0.0,
+            'size_vs_raw': self.bytes_written / raw if self.records else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            if self.fd is None:
+                return
+            self.flush_chunk()
+            os.fsync(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+
+class SensorRecording:
+    """Read-only view of a recording; records are decoded chunk by chunk"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < FILE_HEADER.size:
+            raise ValueError(f"{path} is not a sensor recording")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size = FILE_HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a sensor recording")
+
+        # Index of complete chunks: (payload offset, codec, count, size, first t, last t)
+        self.chunks = []
+        offset = FILE_HEADER.size
+        while offset + CHUNK_HEADER.size <= size:
+            tag, codec, count, length, first_t, last_t = CHUNK_HEADER.unpack_from(self.map, offset)
+            start = offset + CHUNK_HEADER.size
+            if tag != CHUNK_MAGIC or start + length > size:
+                break  # truncated by a crash or power loss
+            self.chunks.append((start, codec, count, length, first_t, last_t))
+            offset = start + length
+        # Latest time in each chunk or any before it; unlike the chunks'
+        # own ranges this is sorted even when they overlap
+        self.end_times = list(itertools.accumulate((chunk[5] for chunk in self.chunks), max))
+        self.records = sum(chunk[2] for chunk in self.chunks)
+        self.start_time = min((chunk[4] for chunk in self.chunks), default=0.0)
+        self.end_time = max((chunk[5] for chunk in self.chunks), default=0.0)
+
+    def chunk_records(self, index):
+        start, codec, count, length, first_t, last_t = self.chunks[index]
+        data = memoryview(self.map)[start:start + length]
+        if codec == CODEC_ZLIB:
+            data = zlib.decompress(data)
+        return struct.iter_unpack(RECORD.format, data)
+
+    def iter_records(self, since=None):
+        """(t, channel, a, b, c) in file order, from the first chunk that
+        can hold records at or after since"""
+        first = 0
+        if since is not None:
+            first = bisect.bisect_left(self.end_times, since)
+        for index in range(first, len(self.chunks)):
+            for record in self.chunk_records(index):
+                if since is None or record[0] >= since:
+                    yield record
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def play(recording, on_record, speed=1.0, stop_event=None):
+    """Call on_record(t, channel, a, b, c) for every record, paced at speed
+    times real time, or as fast as possible when speed is 0 or None"""
+    start_wall = time.monotonic()
+    played = 0
+    for record in recording.iter_records():
+        if speed:
+            delay = (record[0] - recording.start_time) / speed - (time.monotonic() - start_wall)
+            if delay > 0:
+                if stop_event is not None:
+                    if stop_event.wait(delay):
+                        break
+                else:
+                    time.sleep(delay)
+        on_record(*record)
+        played += 1
+    return played
+
+
+class RecordingAccelerometer(GeneratedStream):
+    def __init__(self, backend, capacity=4096):
+        super().__init__(capacity)
+        self.backend = backend
+
+    def generate(self, now):
+        return self.backend.take_frames()
+
+
+class RecordingBackend(SensorBackend):
+    """Replays a recording as a sensor backend, streamed from the mmap"""
+    name = 'replay'
+    batch = 4096  # records per step when replaying as fast as possible
+
+    def __init__(self, path, speed=1.0, loop=True):
+        self.recording = SensorRecording(path)
+        self.speed = speed
+        self.loop = loop
+        self.lock = threading.Lock()
+        self.latest = {}
+        # Frames for the accelerometer; bounded so a stopped stream can't grow it
+        self.frames = collections.deque(maxlen=65536)
+        self.span = self.recording.end_time - self.recording.start_time + 1.0
+        self.lap = 0
+        self.cursor = self.recording.iter_records()
+        self.next_record = None
+        self.epoch = time.time()
+        self.start = time.monotonic()
+
+    def advance(self):
+        """Apply every record due at the current replay position"""
+        recording = self.recording
+        if not recording.records:
+            return
+        with self.lock:
+            if self.speed:
+                position = (time.monotonic() - self.start) * self.speed
+                limit = None
+            else:
+                position = float('inf')
+                limit = self.batch
+            while limit is None or limit > 0:
+                if self.next_record is None:
+                    self.next_record = next(self.cursor, None)
+                    if self.next_record is None:
+                        if not self.loop:
+                            return
+                        self.lap += 1
+                        self.cursor = recording.iter_records()
+                        continue
+                t, channel, a, b, c = self.next_record
+                offset = self.lap * self.span + t - recording.start_time
+                if offset > position:
+                    return
+                if channel == 0:
+                    t_emit = self.epoch + offset / (self.speed or 1.0)
+                    self.frames.append(pack_sample(t_emit, int(a), int(b), int(c)))
+                else:
+                    self.latest[CHANNELS[channel]] = a
+                self.next_record = None
+                if limit is not None:
+                    limit -= 1
+
+    def take_frames(self):
+        self.advance()
+        with self.lock:
+            data = b''.join(self.frames)
+            self.frames.clear()
+        return data
+
+    def read(self, name):
+        self.advance()
+        return self.latest.get(name)
+
+    def accelerometer(self):
+        return RecordingAccelerometer(self)
+
+    def close(self):
+        self.recording.close()
+
+
+def record_backend(path, seconds=None, compress=True):
+    """Record the configured backend (see sensor_backends) without a UI"""
+    from sensor_backends import get_backend
+    backend = get_backend()
+    accel = backend.accelerometer()
+    recorder = SensorRecorder(path, compress)
+    accel.start()
+    seq = 0
+    deadline = None if seconds is None else time.monotonic() + seconds
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(1)
+            seq, samples = accel.ring.since(seq)
+            recorder.record_samples(samples)
+            now = time.time()
+            for name in ('lux', 'temperature'):
+                value = backend.read(name)
+                if value is not None:
+                    recorder.record(name, now, value)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        accel.stop()
+        recorder.close()
+    return recorder.stats()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Record and replay reTerminal sensor streams")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="record the configured sensor backend")
+    record.add_argument('path', metavar='FILE')
+    record.add_argument('--seconds', type=float, help="stop after this long (default: Ctrl-C)")
+    record.add_argument('--raw', action='store_true', help="don't compress chunks")
+    info = commands.add_parser('info', help="summarise a recording")
+    info.add_argument('path', metavar='FILE')
+    replay = commands.add_parser('replay', help="time a replay of a recording")
+    replay.add_argument('path', metavar='FILE')
+    replay.add_argument('--speed', type=float, default=1.0,
+                        help="times real time, 0 = as fast as possible")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    path = args.path
+    if args.command == 'record':
+        stats = record_backend(path, args.seconds, compress=not args.raw)
+        print(f"{stats['records']} records in {stats['chunks']} chunks, "
+              f"{stats['bytes_per_record']:.1f} bytes/record")
+    elif args.command == 'info':
+        recording = SensorRecording(path)
+        counts = collections.Counter(record[1] for record in recording.iter_records())
+        print(f"{recording.records} records in {len(recording.chunks)} chunks, "
+              f"{recording.end_time - recording.start_time:.1f} s")
+        for channel, count in sorted(counts.items()):
+            print(f"  {CHANNELS[channel]:<12}{count:>10}")
+        recording.close()
+    else:
+        recording = SensorRecording(path)
+        start = time.perf_counter()
+        played = play(recording, lambda *record: None, args.speed)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {played} records in {elapsed:.2f} s "
+              f"({played / elapsed if elapsed else 0:,.0f} records/s)")
+        recording.close()
@@ -0,0 +1,169 @@
+"""
+Sensor registry for reTerminal sysfs readings
+Finds the light sensor and thermal zone files once, keeps them open and
+reads them with os.pread at offset 0, so the per-tick cost is one syscall.
+Paths are searched again only after a read error or a kernel hotplug
+(uevent) for a relevant subsystem.
+
+Light Sensor (LTR-303ALS-01): /sys/bus/iio/devices/iio:device0/in_illuminance_input
+CPU temperature: /sys/class/thermal/thermal_zone0/temp
+"""
+
+import glob
+import os
+import socket
+import threading
+import time
+
+from hw_paths import hw_path
+
+NETLINK_KOBJECT_UEVENT = 15
+
+
+class SensorSpec:
+    def __init__(self, name, paths, patterns=(), scale=1.0, subsystems=()):
+        self.name = name
+        self.paths = [hw_path(p) for p in paths]  # tried first, in order
+        self.patterns = [hw_path(p) for p in patterns]  # glob patterns tried next
+        self.scale = scale
+        # uevent SUBSYSTEM values that may make this sensor (re)appear
+        self.subsystems = [f"SUBSYSTEM={s}".encode() for s in subsystems]
+
+
+SENSORS = [
+    SensorSpec('lux',
+               ['/sys/bus/iio/devices/iio:device0/in_illuminance_input'],
+               ['/sys/class/i2c-dev/i2c-1/device/1-0029/iio:device*/in_illuminance_input',
+                '/sys/bus/i2c/devices/1-0029/iio:device*/in_illuminance_input',
+                '/sys/bus/iio/devices/iio:device*/in_illuminance_input'],
+               subsystems=('iio', 'i2c')),
+    SensorSpec('temperature',
+               ['/sys/class/thermal/thermal_zone0/temp'],
+               ['/sys/class/thermal/thermal_zone*/temp'],
+               scale=0.001,
+               subsystems=('thermal',)),
+]
+
+
+class SensorRegistry:
+    def __init__(self, specs=SENSORS, retry_interval=60.0):
+        self.specs = {spec.name: spec for spec in specs}
+        self.fds = {}  # name -> open fd
+        self.paths = {}  # name -> path in use
+        self.stale = set(self.specs)  # sensors that need a path search
+        self.last_search = {}
+        # Without uevents (no netlink), missing sensors are retried this often
+        self.retry_interval = retry_interval
+        self.lock = threading.Lock()
+        self.uevents = self.open_uevent_socket()
+        self.discoveries = 0
+        self.errors = 0
+
+    def open_uevent_socket(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                                 NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))  # kernel uevent multicast group
+            sock.setblocking(False)
+            return sock
+        except (OSError, AttributeError):
+            return None
+
+    def check_hotplug(self):
+        """Drain pending uevents; mark sensors whose subsystem changed"""
+        if self.uevents is None:
+            return
+        while True:
+            try:
+                message = self.uevents.recv(8192)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            for name, spec in self.specs.items():
+                if name not in self.fds and any(s in message for s in spec.subsystems):
+                    self.stale.add(name)
+
+    def discover(self, name):
+        spec = self.specs[name]
+        self.discoveries += 1
+        self.last_search[name] = time.monotonic()
+        candidates = list(spec.paths)
+        for pattern in spec.patterns:
+            candidates.extend(sorted(glob.glob(pattern)))
+        for path in candidates:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            self.fds[name] = fd
+            self.paths[name] = path
+            return True
+        return False
+
+    def close_sensor(self, name):
+        fd = self.fds.pop(name, None)
+        self.paths.pop(name, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def read_raw(self, name):
+        """Contents of the sensor file as stripped bytes, or None"""
+        with self.lock:
+            self.check_hotplug()
+            if name not in self.fds:
+                due = (self.uevents is None and
+                       time.monotonic() - self.last_search.get(name, 0) >= self.retry_interval)
+                if name not in self.stale and not due:
+                    return None
+                self.stale.discard(name)
+                if not self.discover(name):
+                    return None
+            try:
+                return os.pread(self.fds[name], 64, 0).strip()
+            except OSError:
+                # Device went away or the file became unreadable: search
+                # again right away, once
+                self.errors += 1
+                self.close_sensor(name)
+                if not self.discover(name):
+                    return None
+                try:
+                    return os.pread(self.fds[name], 64, 0).strip()
+                except OSError:
+                    self.close_sensor(name)
+                    return None
+
+    def read(self, name):
+        """Scaled numeric reading, or None if the sensor is unavailable"""
+        raw = self.read_raw(name)
+        if not raw:
+            return None
+        try:
+            return float(raw) * self.specs[name].scale
+        except ValueError:
+            return None
+
+    def close(self):
+        with self.lock:
+            for name in list(self.fds):
+                self.close_sensor(name)
+            if self.uevents is not None:
+                self.uevents.close()
+                self.uevents = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry, shared by every screen in single-process mode"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SensorRegistry()
+        return _registry
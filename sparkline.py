@@ -0,0 +1,128 @@
+"""
+Sparkline trend chart for reTerminal apps
+A small Canvas that draws one line item once and afterwards only moves it
+with coords(). Data is decimated to the pixel width first, keeping the
+min and max of each pixel column so spikes stay visible.
+"""
+
+import tkinter as tk
+
+from startup_probe import lazy_import
+
+# Loaded on the first redraw; decimation falls back to pure Python without it
+np = lazy_import('numpy')
+
+
+def decimate(values, columns):
+    """Reduce values to (x, value) points, at most a min and max per column
+
+    Returns the points and the number of x positions they span. This is the
+    pure-Python path; Sparkline uses NumPy when it is installed.
+    """
+    n = len(values)
+    if n <= 2 * columns:
+        return list(enumerate(values)), n
+    per_column = n // columns
+    # Drop the oldest few samples so the data splits into whole columns
+    start = n - per_column * columns
+    points = []
+    for col in range(columns):
+        chunk = values[start + col * per_column:start + (col + 1) * per_column]
+        points.append((col, min(chunk)))
+        points.append((col, max(chunk)))
+    return points, columns
+
+
+class Sparkline(tk.Canvas):
+    def __init__(self, parent, width=240, height=40, color='#00d4aa', bg='#1a252f',
+                 min_value=None, max_value=None, **kwargs):
+        super().__init__(parent, width=width, height=height, bg=bg,
+                         highlightthickness=0, **kwargs)
+        self.chart_width = width
+        self.chart_height = height
+        # Fixed range if given (e.g. 0-100 for percentages), else auto-scale
+        self.min_value = min_value
+        self.max_value = max_value
+        self.last_coords = None
+        self.line = self.create_line(0, height, 0, height, fill=color, width=2)
+        self.redraws = 0
+
+    def value_range(self, low, high):
+        if self.min_value is not None:
+            low = self.min_value
+        if self.max_value is not None:
+            high = self.max_value
+        if high <= low:
+            high = low + 1.0
+        return low, high
+
+    def set_data(self, values):
+        """Show values (oldest first), or no line with fewer than two; does
+        nothing if the picture is unchanged
+
+        values may be a list or a NumPy array, e.g. a MetricsHistory window.
+        """
+        if len(values) < 2:
+            # Cleared history or a new series: hide the old line, don't
+            # leave it standing for data it no longer shows
+            if self.last_coords is not None:
+                self.itemconfigure(self.line, state='hidden')
+                self.last_coords = None
+            return
+        if np is not None:
+            coords = self.coords_numpy(values)
+        else:
+            coords = self.coords_python(values)
+        if coords == self.last_coords:
+            return
+        if self.last_coords is None:
+            self.itemconfigure(self.line, state='normal')
+        self.last_coords = coords
+        self.coords(self.line, coords)
+        self.redraws += 1
+
+    def coords_python(self, values):
+        points, span = decimate(values, self.chart_width)
+        low, high = self.value_range(min(values), max(values))
+        x_scale = (self.chart_width - 1) / max(span - 1, 1)
+        y_scale = (self.chart_height - 2) / (high - low)
+        bottom = self.chart_height - 1
+        coords = []
+        for x, value in points:
+            coords.append(round(x * x_scale))
+            coords.append(round(bottom - (min(max(value, low), high) - low) * y_scale))
+        return coords
+
+    def coords_numpy(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        columns = self.chart_width
+        if n > 2 * columns:
+            per_column = n // columns
+            block = values[n - per_column * columns:].reshape(columns, per_column)
+            ys = np.empty(2 * columns)
+            lows, highs = ys[0::2], ys[1::2]
+            if per_column <= 32:
+                # Reducing across a few strided columns is much faster than
+                # min/max along many tiny rows
+                np.copyto(lows, block[:, 0])
+                np.copyto(highs, block[:, 0])
+                for k in range(1, per_column):
+                    np.minimum(lows, block[:, k], out=lows)
+                    np.maximum(highs, block[:, k], out=highs)
+            else:
+                block.min(axis=1, out=lows)
+                block.max(axis=1, out=highs)
+            xs = np.repeat(np.arange(columns), 2)
+            span = columns
+        else:
+            ys = values
+            xs = np.arange(n)
+            span = n
+        low, high = self.value_range(float(ys.min()), float(ys.max()))
+        points = np.empty((len(ys), 2))
+        points[:, 0] = xs * ((self.chart_width - 1) / max(span - 1, 1))
+        np.clip(ys, low, high, out=points[:, 1])
+        points[:, 1] = (self.chart_height - 1) - (points[:, 1] - low) * (
+            (self.chart_height - 2) / (high - low))
+        return np.rint(points).astype(np.int32).ravel().tolist()
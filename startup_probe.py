@@ -0,0 +1,195 @@
+"""
+Startup timing hooks for reTerminal apps
+Lets a parent process (launcher, benchmark) learn when a child app has
+drawn its first frame, and profiles startup when RETERMINAL_STARTUP_PROFILE
+is set:
+
+    RETERMINAL_STARTUP_PROFILE=1 python3 hardware_demo.py          # table on stderr
+    RETERMINAL_STARTUP_PROFILE=out.json python3 hardware_demo.py   # JSON report
+
+The profile lists every module imported after this one, with self and
+cumulative time as in `python3 -X importtime`, and a timeline from process
+start to the first frame. Entry points import this module first so the
+hook sees their imports.
+
+lazy_import() defers heavy optional modules until first use.
+"""
+
+import os
+import sys
+import time
+
+# Set by whoever spawned us to the number of an inherited pipe fd
+READY_FD_ENV = "RETERMINAL_READY_FD"
+# "1" to print the startup profile, or a path to write it to as JSON
+PROFILE_ENV = "RETERMINAL_STARTUP_PROFILE"
+
+
+def lazy_import(name):
+    """The named module, loaded on first attribute access; None if missing"""
+    if name in sys.modules:
+        return sys.modules[name]
+    import importlib.util
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def process_uptime():
+    """Seconds since this process started, from /proc (10 ms resolution)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22, counted after the parenthesised command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ImportTimer:
+    """Meta path finder that times every module execution, nested"""
+    def __init__(self):
+        self.records = []  # (depth, name, self seconds, cumulative seconds)
+        self.stack = []  # child time accumulated per active import
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = TimedLoader(self, spec.loader)
+                return spec
+        return None
+
+
+class TimedLoader:
+    def __init__(self, timer, loader):
+        self.timer = timer
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        # Single-phase extension modules do all their work in here
+        start = time.perf_counter()
+        try:
+            return self.loader.create_module(spec)
+        finally:
+            self.created = time.perf_counter() - start
+
+    def exec_module(self, module):
+        timer = self.timer
+        record = len(timer.records)
+        timer.records.append(None)
+        depth = len(timer.stack)
+        timer.stack.append(0.0)
+        start = time.perf_counter() - getattr(self, 'created', 0.0)
+        try:
+            self.loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = timer.stack.pop()
+            if timer.stack:
+                timer.stack[-1] += total
+            timer.records[record] = (depth, module.__name__, total - children, total)
+
+
+class StartupProfile:
+    def __init__(self, destination):
+        self.destination = destination
+        self.started = time.perf_counter()
+        uptime = process_uptime()
+        # Interpreter startup: from exec to this module being imported
+        self.marks = [('interpreter', uptime if uptime is not None else 0.0)]
+        self.timer = ImportTimer()
+        sys.meta_path.insert(0, self.timer)
+
+    def mark(self, phase):
+        self.marks.append((phase, self.elapsed()))
+
+    def elapsed(self):
+        return self.marks[0][1] + time.perf_counter() - self.started
+
+    def finish(self):
+        sys.meta_path.remove(self.timer)
+        report = {
+            'app': os.path.basename(sys.argv[0]),
+            'timeline_ms': [(phase, at * 1000) for phase, at in self.marks],
+            'imports': [{'module': name, 'depth': depth, 'self_us': own * 1e6,
+                         'cumulative_us': total * 1e6}
+                        for depth, name, own, total in self.timer.records],
+        }
+        if self.destination in ('1', 'stderr'):
+            print(format_profile(report), file=sys.stderr)
+        else:
+            import json
+            with open(self.destination, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+def format_profile(report, top=15):
+    lines = [f"startup profile of {report['app']}"]
+    previous = 0.0
+    for phase, at in report['timeline_ms']:
+        lines.append(f"  {phase:<14}{at:>9.1f} ms  (+{at - previous:.1f})")
+        previous = at
+    lines.append(f"  {'self [us]':>10} | {'cumulative':>10} | imported package")
+    heaviest = sorted(report['imports'], key=lambda r: -r['cumulative_us'])[:top]
+    for r in heaviest:
+        lines.append(f"  {r['self_us']:>10.0f} | {r['cumulative_us']:>10.0f} | "
+                     f"{'  ' * r['depth']}{r['module']}")
+    return "\n".join(lines)
+
+
+def start_profile():
+    """Profile from now on if PROFILE_ENV is set; an app forked from the
+    zygote calls this again once its own environment is in place"""
+    global profile
+    if profile is not None and profile.timer in sys.meta_path:
+        sys.meta_path.remove(profile.timer)
+    profile = StartupProfile(os.environ[PROFILE_ENV]) if os.environ.get(PROFILE_ENV) else None
+
+
+profile = None
+start_profile()
+
+
+def mark(phase):
+    """Note a startup phase (e.g. 'imports', 'window') in the profile"""
+    if profile is not None:
+        profile.mark(phase)
+
+
+def notify_first_frame(root):
+    """Write the first-frame timestamp to the ready pipe, if one was given
+
+    The timestamp is time.monotonic(), which on Linux is the system-wide
+    CLOCK_MONOTONIC and can be compared directly with the parent's clock.
+    """
+    fd = os.environ.get(READY_FD_ENV)
+    if not fd and profile is None:
+        return
+
+    def report():
+        # Flush pending geometry and redraw work so the window is painted
+        root.update_idletasks()
+        if profile is not None:
+            profile.mark('first frame')
+            profile.finish()
+        if not fd:
+            return
+        try:
+            os.write(int(fd), f"{time.monotonic():.6f}\n".encode())
+            os.close(int(fd))
+        except (OSError, ValueError):
+            pass
+
+    root.after(0, report)
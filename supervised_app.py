@@ -0,0 +1,63 @@
+"""
+Child side of the launcher's app supervisor (see app_supervisor)
+Apps started by the supervisor are told so through the environment. They
+come to the front on SIGUSR1 instead of the launcher starting a second
+copy, close cleanly on SIGTERM, and simply exit when going back to the
+launcher because the launcher is still running.
+"""
+
+import os
+import signal
+import tkinter as tk
+
+# Set to the supervisor's pid in every child it starts
+SUPERVISOR_ENV = "RETERMINAL_SUPERVISOR_PID"
+
+
+def is_supervised():
+    return bool(os.environ.get(SUPERVISOR_ENV))
+
+
+def return_to_launcher():
+    """Show the launcher again after this app's window is gone"""
+    if is_supervised():
+        return  # the supervising launcher is still running
+    import subprocess
+    subprocess.Popen(['python3', 'app_launcher.py'])
+
+
+def bring_to_front(root):
+    root.deiconify()
+    root.lift()
+    # Override-redirect windows ignore a plain lift under some compositors
+    root.attributes('-topmost', True)
+    root.after(200, lambda: root.attributes('-topmost', False))
+    root.focus_force()
+
+
+def install_signal_handlers(root, on_close):
+    """SIGUSR1 raises the window, SIGTERM runs on_close on the Tk thread"""
+    signal.signal(signal.SIGUSR1, lambda signum, frame: root.after(0, bring_to_front, root))
+    signal.signal(signal.SIGTERM, lambda signum, frame: root.after(0, on_close))
+
+    # Python runs signal handlers only once Tk returns from waiting for
+    # events; a wakeup pipe watched by Tk makes that happen right away
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.set_blocking(write_fd, False)
+    previous = signal.set_wakeup_fd(write_fd)
+    if previous != -1:
+        # Someone else already owns the wakeup fd; leave it in place
+        signal.set_wakeup_fd(previous)
+        os.close(read_fd)
+        os.close(write_fd)
+        return
+
+    def drain(fd, mask):
+        try:
+            while os.read(read_fd, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    root.tk.createfilehandler(read_fd, tk.READABLE, drain)
@@ -0,0 +1,175 @@
+"""
+Metric sources shared by the reTerminal apps and the sensor daemon
+Each source is registered on a MetricScheduler and reports flat
+(name, value) pairs through an emit callback, so the same readings can
+drive labels directly or be published to other processes.
+
+System metrics: cpu, memory, memory_used, disk, disk_used, temperature,
+                uptime, hostname, ip, wifi
+Sensor metrics: lux, accel_x, accel_y, accel_z, accel_rate, accel_error,
+                vibration_rms, vibration_p2p, vibration_hz, pitch, roll
+"""
+
+import os
+import time
+
+from hw_paths import FS_ROOT, hw_path
+from network_status import NetworkStatusCollector, NetworkThroughput, RATE_FIELDS
+from process_table import ProcessTable, format_top
+from sensor_backends import get_backend
+from startup_probe import lazy_import
+
+# Loaded by the first SystemMetrics, so apps fed by the daemon never load it
+psutil = lazy_import('psutil')
+
+# psutil reads /proc itself; follow RETERMINAL_FS_ROOT when it provides one
+if FS_ROOT and os.path.isdir(hw_path('/proc')):
+    psutil.PROCFS_PATH = hw_path('/proc')
+
+
+class SystemMetrics:
+    def __init__(self, network=None, sensors=None, processes=None, top=5):
+        self.network = network or NetworkStatusCollector()
+        self.throughput = NetworkThroughput()
+        # Cached process table; each scan re-reads at most its budget of processes
+        self.processes = processes or ProcessTable()
+        self.top = top
+        # Anything with read(name): a sensor backend or the sysfs registry
+        self.sensors = sensors or get_backend()
+        self.boot_time = psutil.boot_time()
+        # Prime the delta-based CPU sampler so the first real reading
+        # covers the time since now instead of blocking for an interval
+        psutil.cpu_percent(interval=None)
+
+    def ip_text(self):
+        try:
+            addresses = self.network.addresses()
+            if not addresses:
+                return "Not connected"
+            if len(addresses) == 1:
+                return next(iter(addresses.values()))[0]
+            return ", ".join(f"{ips[0]} ({name})" for name, ips in addresses.items())
+        except Exception:
+            return "Unknown"
+
+    def wifi_text(self):
+        try:
+            wifi = self.network.wifi()
+            if wifi is None or not wifi.essid:
+                return "Not connected"
+            return f"Connected to {wifi.essid} (link {wifi.link_quality:.0f}, {wifi.signal_dbm:.0f} dBm)"
+        except Exception:
+            return "Unknown"
+
+    def read_processes(self):
+        self.processes.scan()
+        return (len(self.processes.entries),
+                format_top(self.processes.top(self.top, 'cpu_percent')),
+                format_top(self.processes.top(self.top, 'rss')))
+
+    def add_to(self, scheduler, emit, only=None):
+        """Register the sources (or just those named in only) on scheduler"""
+        def add(name, read, period, on_value, **options):
+            if only is None or name in only:
+                scheduler.add(name, read, period, on_value, **options)
+
+        def memory(m):
+            emit('memory', m.percent)
+            emit('memory_used', m.used)
+
+        def disk(d):
+            emit('disk', d.used / d.total * 100)
+            emit('disk_used', d.used)
+
+        def interfaces(rates):
+            # One reading per interface and rate, e.g. net_rx_bytes:eth0,
+            # then the list of interfaces so consumers can drop stale ones
+            for r in rates:
+                for field in RATE_FIELDS:
+                    emit(f'net_{field}:{r.interface}', getattr(r, field))
+            emit('net_interfaces', ','.join(r.interface for r in rates))
+
+        # Stable readings are sampled less often, down to max_period;
+        # a change beyond tolerance or a threshold crossing resets the rate
+        add('cpu', lambda: psutil.cpu_percent(interval=None), 1.0,
+            lambda v: emit('cpu', v), max_period=5.0, tolerance=5.0, thresholds=(90.0,))
+        add('memory', psutil.virtual_memory, 2.0, memory,
+            max_period=10.0, tolerance=1.0, thresholds=(90.0,), key=lambda m: m.percent)
+        # The SoC starts throttling at 80°C
+        add('temperature', lambda: self.sensors.read('temperature'), 2.0,
+            lambda v: emit('temperature', v), max_period=10.0, tolerance=0.5,
+            thresholds=(70.0, 80.0))
+        add('ip', self.ip_text, 5.0, lambda v: emit('ip', v), only_changes=True,
+            max_period=30.0)
+        add('wifi', self.wifi_text, 5.0, lambda v: emit('wifi', v), only_changes=True,
+            max_period=30.0)
+        def processes(reading):
+            count, by_cpu, by_rss = reading
+            emit('processes', count)
+            emit('top_cpu', by_cpu)
+            emit('top_rss', by_rss)
+
+        # Rates are deltas over the real interval, so a slower tick only
+        # averages over longer; ~16 kB/s of change restores the base rate
+        add('net', self.throughput.sample, 1.0, interfaces, max_period=5.0,
+            tolerance=16384, key=lambda rates: sum(r.rx_bytes + r.tx_bytes for r in rates))
+        # A scan takes milliseconds with hundreds of processes; run it on
+        # the worker pool so it never delays the other readings
+        add('processes', self.read_processes, 3.0, processes, blocking=True)
+        add('hostname', self.network.hostname, 5.0, lambda v: emit('hostname', v),
+            only_changes=True, max_period=60.0)
+        add('uptime', lambda: int(time.time() - self.boot_time) // 60 * 60, 10.0,
+            lambda v: emit('uptime', v), only_changes=True)
+        # statvfs on the SD card can stall, so keep it off the scheduler thread
+        add('disk', lambda: psutil.disk_usage('/'), 30.0, disk, blocking=True,
+            max_period=300.0, tolerance=0.5, thresholds=(90.0,),
+            key=lambda d: d.used / d.total * 100)
+
+
+class SensorMetrics:
+    def __init__(self, accel, vibration=None, sensors=None):
+        self.accel = accel
+        self.vibration = vibration
+        self.sensors = sensors or get_backend()
+
+    def read_accel(self):
+        sample = self.accel.ring.latest()
+        if sample is None:
+            return None
+        return sample, self.accel.ring.rate()
+
+    def add_to(self, scheduler, emit, only=None):
+        def add(name, read, period, on_value, **options):
+            if only is None or name in only:
+                scheduler.add(name, read, period, on_value, **options)
+
+        def accel(reading):
+            if reading is None:
+                if self.accel.error is not None:
+                    emit('accel_error', str(self.accel.error))
+                return
+            (t, x, y, z), rate = reading
+            emit('accel_x', x, t)
+            emit('accel_y', y, t)
+            emit('accel_z', z, t)
+            emit('accel_rate', rate, t)
+
+        def vibration(stats):
+            if stats is None:
+                return
+            emit('vibration_rms', stats.vibration_rms, stats.time)
+            emit('vibration_p2p', max(stats.peak_to_peak), stats.time)
+            emit('vibration_hz', stats.dominant_hz, stats.time)
+            emit('pitch', stats.pitch, stats.time)
+            emit('roll', stats.roll, stats.time)
+
+        add('lux', lambda: self.sensors.read('lux'), 1.0, lambda v: emit('lux', v),
+            max_period=10.0, tolerance=10.0)
+        # ~50 mg of movement on any axis counts as a change
+        add('accel', self.read_accel, 1.0, accel, max_period=5.0, tolerance=50,
+            key=lambda r: tuple(r[0][1:]))
+        if self.vibration is not None:
+            # Catches up on every window completed since the last tick, so
+            # a slower tick loses no windows
+            add('vibration', self.vibration.update, 1.0, vibration, max_period=5.0,
+                tolerance=0.005, key=lambda s: s.vibration_rms)
@@ -0,0 +1,117 @@
+"""
+asyncio event loop driven by the Tk mainloop
+The loop's epoll descriptor is registered with Tk as a file handler, so Tk
+wakes up whenever any socket, pipe or device the loop watches is ready.
+Timers are mirrored as Tk after() callbacks. Each wakeup runs one loop
+iteration on the Tk thread, so coroutines and UI code share one thread and
+nothing polls while the app is idle.
+
+    loop = get_loop(root)    # one loop per Tk root, shared by hosted screens
+    loop.create_task(...)    # tasks run while root.mainloop() runs
+"""
+
+import asyncio
+import heapq
+import math
+import selectors
+import tkinter as tk
+
+from latency_histogram import LatencyHistogram
+
+# Fallback pump interval when the selector has no pollable descriptor
+POLL_INTERVAL_MS = 10
+
+
+class TkEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self, root):
+        selector = selectors.DefaultSelector()
+        super().__init__(selector)
+        self.root = root
+        self.pump_pending = False
+        self.timers = []  # (when, sequence, TimerHandle), mirrors the loop's timers
+        self.timer_seq = 0
+        self.wake_id = None
+        self.wake_at = None
+        # How long each iteration keeps the Tk thread busy
+        self.iteration = LatencyHistogram()
+        fileno = getattr(selector, 'fileno', None)
+        self.selector_fd = fileno() if fileno is not None else None
+        if self.selector_fd is not None:
+            root.tk.createfilehandler(self.selector_fd, tk.READABLE, self.pump)
+        else:
+            self.poll()  # no epoll/kqueue descriptor to watch
+
+    def call_soon(self, callback, *args, context=None):
+        handle = super().call_soon(callback, *args, context=context)
+        self.request_pump()
+        return handle
+
+    def call_at(self, when, callback, *args, context=None):
+        handle = super().call_at(when, callback, *args, context=context)
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (when, self.timer_seq, handle))
+        if self.wake_at is None or when < self.wake_at:
+            self.schedule_wake()
+        return handle
+
+    def request_pump(self):
+        if not self.pump_pending and not self.is_closed():
+            self.pump_pending = True
+            self.root.after(0, self.pump)
+
+    def pump(self, *args):
+        """Run one loop iteration: ready callbacks, I/O and due timers"""
+        self.pump_pending = False
+        if self.is_running() or self.is_closed():
+            return
+        started = self.time()
+        # Queued first, so the iteration never blocks in select()
+        super().call_soon(self.stop)
+        self.run_forever()
+        self.iteration.record(self.time() - started)
+        # Timers due when the iteration started have run
+        while self.timers and (self.timers[0][0] <= started or self.timers[0][2].cancelled()):
+            heapq.heappop(self.timers)
+        self.schedule_wake()
+
+    def schedule_wake(self):
+        while self.timers and self.timers[0][2].cancelled():
+            heapq.heappop(self.timers)
+        when = self.timers[0][0] if self.timers else None
+        if when == self.wake_at:
+            return
+        if self.wake_id is not None:
+            self.root.after_cancel(self.wake_id)
+            self.wake_id = None
+        self.wake_at = when
+        if when is not None and not self.is_closed():
+            delay = max(math.ceil((when - self.time()) * 1000), 0)
+            self.wake_id = self.root.after(delay, self.wake)
+
+    def wake(self):
+        self.wake_id = None
+        self.wake_at = None
+        self.pump()
+
+    def poll(self):
+        if not self.is_closed():
+            self.pump()
+            self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def close(self):
+        if self.is_running() or self.is_closed():
+            return
+        if self.wake_id is not None:
+            self.root.after_cancel(self.wake_id)
+            self.wake_id = None
+        if self.selector_fd is not None:
+            self.root.tk.deletefilehandler(self.selector_fd)
+        super().close()
+
+
+def get_loop(root):
+    """The TkEventLoop of root, created on first use"""
+    loop = getattr(root, 'asyncio_loop', None)
+    if loop is None or loop.is_closed():
+        loop = root.asyncio_loop = TkEventLoop(root)
+    return loop
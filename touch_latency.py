@@ -0,0 +1,211 @@
+"""
+Touch latency measurement for the touchscreen demo
+Reads the seeed-tp touch controller's evdev events with their kernel
+timestamps and pairs each touch-down with the Tk <ButtonPress> callback it
+caused and the moment the resulting redraw has been flushed to the X
+server. The kernel clock is switched to CLOCK_MONOTONIC so all three share
+time.monotonic(). Photons are later still by the compositor and panel
+refresh, which software can't see; the numbers are a lower bound.
+
+Touch device: the /dev/input/event* whose name is "seeed-tp"
+"""
+
+import collections
+import fcntl
+import os
+import struct
+import time
+
+from accel_reader import EVENT_FORMAT, EVENT_SIZE
+from hw_paths import hw_path
+from latency_histogram import LatencyHistogram
+
+TOUCH_NAME = 'seeed-tp'
+INPUT_CLASS = hw_path('/sys/class/input')
+
+EV_KEY = 1
+BTN_TOUCH = 0x14A
+# _IOW('E', 0xa0, int): choose the clock of event timestamps
+EVIOCSCLOCKID = 0x400445A0
+
+# A kernel touch and a Tk press further apart than this are not the same tap
+MAX_PAIR_GAP = 0.5
+STRESS_SECONDS = 10.0
+
+
+def find_touch_device(name=TOUCH_NAME, input_class=INPUT_CLASS):
+    """/dev/input/eventN of the named input device, or None"""
+    try:
+        entries = sorted(os.listdir(input_class))
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.startswith('event'):
+            continue
+        try:
+            with open(os.path.join(input_class, entry, 'device', 'name')) as f:
+                if f.read().strip() == name:
+                    return hw_path(f'/dev/input/{entry}')
+        except OSError:
+            continue
+    return None
+
+
+class TouchEventReader:
+    """Calls on_touch(kernel time) for every touch-down, as a reader on an
+    asyncio loop"""
+
+    def __init__(self, device, on_touch):
+        self.device = device
+        self.on_touch = on_touch
+        self.loop = None
+        self.fd = None
+        self.error = None
+        self.pending = b''
+        # Added to event times when the clock can't be switched to monotonic
+        self.offset = 0.0
+
+    def start(self, loop):
+        if self.fd is not None:
+            return
+        try:
+            self.fd = os.open(self.device, os.O_RDONLY | os.O_NONBLOCK)
+        except OSError as e:
+            self.error = e
+            return
+        try:
+            fcntl.ioctl(self.fd, EVIOCSCLOCKID, struct.pack('i', time.CLOCK_MONOTONIC))
+            self.offset = 0.0
+        except OSError:
+            # Old kernel or not an evdev node: events carry CLOCK_REALTIME
+            self.offset = time.monotonic() - time.time()
+        self.error = None
+        self.loop = loop
+        loop.add_reader(self.fd, self.on_readable)
+
+    def stop(self):
+        if self.fd is None:
+            return
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        self.loop = None
+
+    def on_readable(self):
+        try:
+            data = os.read(self.fd, EVENT_SIZE * 64)
+            if not data:
+                raise OSError(f"{self.device} closed")
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.error = e
+            self.stop()
+            return
+        data = self.pending + data
+        whole = len(data) - len(data) % EVENT_SIZE
+        self.pending = data[whole:]
+        for sec, usec, ev_type, code, value in struct.iter_unpack(EVENT_FORMAT, data[:whole]):
+            if ev_type == EV_KEY and code == BTN_TOUCH and value == 1:
+                self.on_touch(sec + usec * 1e-6 + self.offset)
+
+
+class TouchLatencyLab:
+    """Pairs kernel touches with Tk presses and keeps their latencies
+
+    input:  kernel touch-down -> Tk callback starts
+    redraw: Tk callback starts -> redraw flushed
+    total:  kernel touch-down -> redraw flushed
+    """
+
+    def __init__(self):
+        self.input = LatencyHistogram()
+        self.redraw = LatencyHistogram()
+        self.total = LatencyHistogram()
+        self.touches = collections.deque()  # kernel times not yet paired
+        self.presses = collections.deque()  # (callback, drawn) not yet paired
+        self.recent = collections.deque()  # callback times within the last second
+        self.unpaired = 0
+        self.stress = None  # (ends at, LatencyHistogram, taps, background) while running
+        self.runs = []  # finished stress tests
+
+    def reset(self):
+        for h in (self.input, self.redraw, self.total):
+            h.reset()
+        self.touches.clear()
+        self.presses.clear()
+        self.unpaired = 0
+
+    def on_kernel_touch(self, t):
+        self.touches.append(t)
+        self.pair()
+
+    def on_press(self, callback, drawn):
+        self.redraw.record(drawn - callback)
+        self.presses.append((callback, drawn))
+        self.recent.append(callback)
+        if self.stress is not None:
+            self.stress[2] += 1
+        self.pair()
+
+    def pair(self):
+        # Both queues are in time order; the reader and Tk may deliver the
+        # two halves of a tap in either order
+        while self.touches and self.presses:
+            touch = self.touches[0]
+            callback, drawn = self.presses[0]
+            if touch > callback:
+                self.presses.popleft()  # press without a touch (mouse, lost event)
+                self.unpaired += 1
+            elif callback - touch > MAX_PAIR_GAP:
+                self.touches.popleft()  # touch that never reached Tk
+                self.unpaired += 1
+            else:
+                self.touches.popleft()
+                self.presses.popleft()
+                self.input.record(callback - touch)
+                self.total.record(drawn - touch)
+                if self.stress is not None:
+                    self.stress[1].record(drawn - touch)
+        # Without a touch device presses are never paired; keep them bounded
+        while len(self.presses) > 64:
+            self.presses.popleft()
+            self.unpaired += 1
+
+    def tap_rate(self, now=None):
+        """Taps in the last second"""
+        now = time.monotonic() if now is None else now
+        while self.recent and now - self.recent[0] > 1.0:
+            self.recent.popleft()
+        return len(self.recent)
+
+    def start_stress(self, background, seconds=STRESS_SECONDS):
+        self.stress = [time.monotonic() + seconds, LatencyHistogram(), 0, background]
+
+    def check_stress(self, now=None):
+        """Finish the stress test once its time is up; True when it did"""
+        now = time.monotonic() if now is None else now
+        if self.stress is None or now < self.stress[0]:
+            return False
+        ends, histogram, taps, background = self.stress
+        self.stress = None
+        self.runs.append({'background': background, 'taps': taps,
+                          'taps_per_second': taps / STRESS_SECONDS,
+                          'latency': histogram.summary()})
+        return True
+
+    def report(self):
+        return {
+            'input': self.input.to_dict(),
+            'redraw': self.redraw.to_dict(),
+            'total': self.total.to_dict(),
+            'unpaired': self.unpaired,
+            'stress_runs': self.runs,
+        }
+
+
+def format_run(run):
+    s = run['latency']
+    return (f"{run['taps']} taps ({run['taps_per_second']:.1f}/s), "
+            f"background {'on' if run['background'] else 'off'}: "
+            f"p50 {s['p50_ms']:.1f} ms, p99 {s['p99_ms']:.1f} ms")
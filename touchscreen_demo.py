@@ -2,54 +2,83 @@
 """
 Simple Touchscreen Demo for reTerminal
 This app demonstrates basic touchscreen interaction
+
+Latency Lab mode measures touch latency: kernel touch-down (seeed-tp evdev
+timestamp) -> Tk ButtonPress callback -> redraw flushed, with a live
+histogram and a 10 s tap-rate stress test that can run with or without
+the dashboard collectors working in the background.
 """
 
+# First, so a startup profile sees every import below
+import startup_probe
 import tkinter as tk
-from tkinter import ttk
+import json
+import os
+import random
 import time
-import subprocess
+import supervised_app
+from perf_overlay import latency_path
+from touch_latency import TouchEventReader, TouchLatencyLab, find_touch_device, format_run
+
+# Histogram bins of the lab: 5 ms steps up to 100 ms, then everything above
+LAB_EDGES = [i * 0.005 for i in range(22)]
+LAB_REFRESH_MS = 250
+# Histogram canvas; bars sit on a baseline with the bin labels below it
+CHART_WIDTH, CHART_HEIGHT, CHART_BASELINE = 630, 140, 120
 
 class TouchscreenDemo:
-    def __init__(self, root):
+    def __init__(self, root, container=None, on_back=None):
         self.root = root
-        self.root.title("reTerminal Touchscreen Demo")
-        # Set explicit geometry for fullscreen
-        self.root.geometry("1280x720")  # reTerminal screen size
-        # Temporarily disable fullscreen mode for debugging
-        # self.root.attributes('-fullscreen', True)
-        # self.root.overrideredirect(True)
+        # When hosted inside the launcher's window, widgets live in a frame
+        # and the launcher owns the window itself
+        self.container = container if container is not None else root
+        self.on_back = on_back
         
-        # Bind escape key to exit fullscreen
-        self.root.bind('<Escape>', self.toggle_fullscreen)
+        if container is None:
+            self.root.title("reTerminal Touchscreen Demo")
+            # Set explicit geometry for fullscreen
+            self.root.geometry("1280x720")  # reTerminal screen size
+            # Temporarily disable fullscreen mode for debugging
+            # self.root.attributes('-fullscreen', True)
+            # self.root.overrideredirect(True)
+            
+            # Bind escape key to exit fullscreen
+            self.root.bind('<Escape>', self.toggle_fullscreen)
         
+        self.lab = None
+        self.touch_reader = None
+        self.background = None
+        self.lab_refresh_id = None
         self.setup_ui()
         
     def setup_ui(self):
         # Title
-        title = tk.Label(self.root, text="reTerminal Demo", 
+        title = tk.Label(self.container, text="reTerminal Demo", 
                         font=('Arial', 36, 'bold'), 
                         fg='white', bg='#2c3e50')
         title.pack(pady=40)
         
         # Touch counter
         self.touch_count = 0
-        self.counter_label = tk.Label(self.root, 
+        self.counter_label = tk.Label(self.container, 
                                      text=f"Touch Count: {self.touch_count}",
                                      font=('Arial', 24),
                                      fg='white', bg='#2c3e50')
         self.counter_label.pack(pady=20)
         
         # Large touch button
-        self.touch_button = tk.Button(self.root, 
+        self.touch_button = tk.Button(self.container, 
                                      text="Touch Me!", 
                                      font=('Arial', 28, 'bold'),
                                      bg='#3498db', fg='white',
                                      width=20, height=6,
                                      command=self.on_touch)
         self.touch_button.pack(pady=50)
+        # The press, not the release that fires command, is what the lab times
+        self.touch_button.bind('<ButtonPress-1>', self.on_press, add='+')
         
         # Color change button
-        color_button = tk.Button(self.root, 
+        color_button = tk.Button(self.container, 
                                 text="Change Color", 
                                 font=('Arial', 20, 'bold'),
                                 bg='#e74c3c', fg='white',
@@ -57,15 +86,24 @@ class TouchscreenDemo:
                                 command=self.change_color)
         color_button.pack(pady=30)
         
+        self.lab_button = tk.Button(self.container,
+                                    text="Latency Lab",
+                                    font=('Arial', 20, 'bold'),
+                                    bg='#8e44ad', fg='white',
+                                    width=18, height=2,
+                                    command=self.toggle_lab)
+        self.lab_button.pack(pady=10)
+        self.lab_frame = None
+        
         # Status display
-        self.status_label = tk.Label(self.root, 
+        self.status_label = tk.Label(self.container, 
                                     text="Ready for touch input",
                                     font=('Arial', 18),
                                     fg='#ecf0f1', bg='#2c3e50')
         self.status_label.pack(pady=30)
         
         # Exit button
-        exit_button = tk.Button(self.root, 
+        exit_button = tk.Button(self.container, 
                                text="Exit", 
                                font=('Arial', 18, 'bold'),
                                bg='#95a5a6', fg='white',
@@ -74,7 +112,7 @@ class TouchscreenDemo:
         exit_button.pack(side=tk.BOTTOM, pady=20)
         
         # Add back button
-        back_button = tk.Button(self.root, 
+        back_button = tk.Button(self.container, 
                                text="Back to Launcher", 
                                font=('Arial', 18, 'bold'),
                                bg='#3498db', fg='white',
@@ -91,11 +129,165 @@ class TouchscreenDemo:
         self.touch_button.config(bg='#2ecc71')
         self.root.after(200, lambda: self.touch_button.config(bg='#3498db'))
         
+    def on_press(self, event=None):
+        if self.lab is None:
+            return
+        callback = time.monotonic()
+        self.touch_button.config(bg='#2ecc71')
+        # Flush the redraw to the X server before taking the time
+        self.touch_button.update_idletasks()
+        self.lab.on_press(callback, time.monotonic())
+        
+    def toggle_lab(self):
+        if self.lab is None:
+            self.open_lab()
+        else:
+            self.close_lab()
+            
+    def open_lab(self):
+        # asyncio only once the lab is opened; the demo starts light
+        from tk_asyncio import get_loop
+        self.lab = TouchLatencyLab()
+        self.loop = get_loop(self.root)
+        device = find_touch_device()
+        if device is not None:
+            self.touch_reader = TouchEventReader(device, self.lab.on_kernel_touch)
+            self.touch_reader.start(self.loop)
+            
+        self.lab_frame = tk.Frame(self.container, bg='black')
+        self.lab_frame.pack(after=self.lab_button, pady=10)
+        self.lab_stats = tk.Label(self.lab_frame, font=('Courier', 14),
+                                  fg='#7CFC00', bg='black', justify='left')
+        self.lab_stats.pack(padx=10, pady=5)
+        self.lab_chart = tk.Canvas(self.lab_frame, width=CHART_WIDTH, height=CHART_HEIGHT,
+                                   bg='black', highlightthickness=0)
+        self.lab_chart.pack(padx=10)
+        self.create_histogram()
+        buttons = tk.Frame(self.lab_frame, bg='black')
+        buttons.pack(pady=8)
+        self.stress_button = tk.Button(buttons, text="Stress Test (10 s)",
+                                       font=('Arial', 14), command=self.start_stress)
+        self.stress_button.pack(side=tk.LEFT, padx=5)
+        self.background_button = tk.Button(buttons, text="Background: Off",
+                                           font=('Arial', 14), command=self.toggle_background)
+        self.background_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Reset", font=('Arial', 14),
+                  command=self.lab.reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(buttons, text="Save", font=('Arial', 14),
+                  command=self.save_lab).pack(side=tk.LEFT, padx=5)
+        self.lab_button.config(text="Close Latency Lab")
+        self.refresh_lab()
+        
+    def pause_lab(self):
+        """Stop redrawing, reading touches and loading the system; the
+        lab keeps its numbers"""
+        if self.lab_refresh_id is not None:
+            self.root.after_cancel(self.lab_refresh_id)
+            self.lab_refresh_id = None
+        if self.touch_reader is not None:
+            self.touch_reader.stop()
+        if self.background is not None:
+            self.toggle_background()
+            
+    def resume_lab(self):
+        if self.lab is None or self.lab_refresh_id is not None:
+            return
+        if self.touch_reader is not None:
+            self.touch_reader.start(self.loop)
+        self.refresh_lab()
+        
+    def close_lab(self):
+        if self.lab is None:
+            return
+        self.pause_lab()
+        self.touch_reader = None
+        self.lab_frame.destroy()
+        self.lab_frame = None
+        self.lab = None
+        self.lab_button.config(text="Latency Lab")
+        
+    def toggle_background(self):
+        """Run the IoT dashboard's collectors as load while measuring"""
+        if self.background is None:
+            # psutil and friends only when asked for
+            from metrics_scheduler import AsyncMetricScheduler
+            from system_metrics import SystemMetrics
+            self.background = AsyncMetricScheduler(self.loop)
+            SystemMetrics().add_to(self.background, lambda name, value, t=None: None)
+            self.background.start()
+            self.background_button.config(text="Background: On")
+        else:
+            self.background.stop()
+            self.background = None
+            self.background_button.config(text="Background: Off")
+            
+    def start_stress(self):
+        self.lab.start_stress(self.background is not None)
+        self.stress_button.config(text="Tap as fast as you can!", state=tk.DISABLED)
+        
+    def save_lab(self):
+        path = latency_path('touchscreen_demo')
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(self.lab.report(), f, indent=2)
+        except OSError as e:
+            self.status_label.config(text=f"Save failed: {e}")
+            return
+        self.status_label.config(text=f"Saved to {path}")
+        
+    def refresh_lab(self):
+        lab = self.lab
+        if lab.check_stress():
+            self.stress_button.config(text="Stress Test (10 s)", state=tk.NORMAL)
+        lines = [f"{'ms':<8}{'n':>6}{'p50':>8}{'p99':>8}{'max':>8}"]
+        for name, h in (('input', lab.input), ('redraw', lab.redraw), ('total', lab.total)):
+            lines.append(f"{name:<8}{h.count:>6}{h.percentile(50) * 1000:>8.1f}"
+                         f"{h.percentile(99) * 1000:>8.1f}{h.max * 1000:>8.1f}")
+        if self.touch_reader is None or self.touch_reader.error is not None:
+            error = self.touch_reader.error if self.touch_reader else "no seeed-tp device"
+            lines.append(f"Kernel timestamps unavailable: {error}")
+        lines.append(f"Tap rate: {lab.tap_rate()}/s   unpaired: {lab.unpaired}")
+        if lab.stress is not None:
+            lines.append(f"Stress test: {max(lab.stress[0] - time.monotonic(), 0):.0f} s left, "
+                         f"{lab.stress[2]} taps")
+        for run in lab.runs[-3:]:
+            lines.append(format_run(run))
+        self.lab_stats.config(text="\n".join(lines))
+        self.draw_histogram()
+        self.lab_refresh_id = self.root.after(LAB_REFRESH_MS, self.refresh_lab)
+        
+    def create_histogram(self):
+        """One bar per bin, created once; draw_histogram only moves them"""
+        bins = len(LAB_EDGES) - 1
+        bar = CHART_WIDTH // bins
+        self.lab_bars = [self.lab_chart.create_rectangle(
+            i * bar + 2, CHART_BASELINE, (i + 1) * bar - 2, CHART_BASELINE,
+            fill='#3498db', width=0) for i in range(bins)]
+        self.lab_bar_tops = [CHART_BASELINE] * bins
+        for i in range(0, bins, 4):
+            label = f"{i * 5}+" if i == bins - 1 else f"{i * 5}"
+            self.lab_chart.create_text(i * bar + 2, CHART_BASELINE + 4, text=label,
+                                       fill='white', anchor='nw')
+        
+    def draw_histogram(self):
+        """Bars of kernel-to-redraw latency (callback-to-redraw without a touch device)"""
+        h = self.lab.total if self.lab.total.count else self.lab.redraw
+        counts = h.bins(LAB_EDGES)
+        bar = CHART_WIDTH // len(counts)
+        top = max(counts) or 1
+        for i, n in enumerate(counts):
+            # Empty bins collapse onto the baseline; unchanged bars aren't touched
+            y = round(CHART_BASELINE - n / top * (CHART_BASELINE - 10))
+            if y != self.lab_bar_tops[i]:
+                self.lab_bar_tops[i] = y
+                self.lab_chart.coords(self.lab_bars[i], i * bar + 2, y,
+                                      (i + 1) * bar - 2, CHART_BASELINE)
+            
     def change_color(self):
         colors = ['#2c3e50', '#34495e', '#8e44ad', '#16a085', '#f39c12']
-        import random
         new_color = random.choice(colors)
-        self.root.config(bg=new_color)
+        self.container.config(bg=new_color)
         self.counter_label.config(bg=new_color)
         self.status_label.config(bg=new_color)
         
@@ -107,18 +299,42 @@ class TouchscreenDemo:
         if not current_override:
             self.root.geometry("1280x720")
         
+    def activate(self):
+        """Called by the launcher when this screen is shown"""
+        self.resume_lab()
+        
+    def deactivate(self):
+        """Called by the launcher when this screen is hidden"""
+        self.pause_lab()
+        
+    def shutdown(self):
+        """Stop the latency lab for good"""
+        self.close_lab()
+        
     def exit_app(self):
         """Exit the application"""
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
         self.root.quit()
         self.root.destroy()
         
     def back_to_launcher(self):
-        self.running = False
+        if self.on_back is not None:
+            self.on_back()
+            return
+        self.shutdown()
         self.root.quit()
         self.root.destroy()
-        subprocess.Popen(['python3', 'app_launcher.py'])
+        supervised_app.return_to_launcher()
         
 if __name__ == "__main__":
+    startup_probe.mark('imports')
     root = tk.Tk()
+    startup_probe.mark('window')
     app = TouchscreenDemo(root)
+    startup_probe.mark('app')
+    supervised_app.install_signal_handlers(root, app.exit_app)
+    startup_probe.notify_first_frame(root)
     root.mainloop()
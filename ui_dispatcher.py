@@ -0,0 +1,127 @@
+"""
+Coalescing UI update dispatcher for reTerminal apps
+Worker threads submit widget updates; they are applied together in one
+Tk callback. Only the newest value per widget is kept, so a UI thread that
+falls behind skips stale values instead of replaying them, and widgets
+whose value did not change are not touched at all.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from latency_histogram import LatencyHistogram
+
+
+class UIDispatcher:
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> (value, apply)
+        self.shown = {}  # key -> value last applied
+        self.scheduled = False
+        self.holds = 0
+        self.first_pending = None
+
+        self.submitted = 0
+        self.applied = 0
+        self.skipped = 0  # same value as already shown
+        self.dropped = 0  # replaced by a newer value before being applied
+        self.failed = 0  # apply raised; retried with the next value
+        self.flushes = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        # Submit-to-applied delay, and time spent applying, per flush
+        self.latency = LatencyHistogram()
+        self.apply_time = LatencyHistogram()
+
+    def submit(self, key, value, apply):
+        """Queue apply(value) for key; safe to call from any thread"""
+        with self.lock:
+            self.submitted += 1
+            if key in self.pending:
+                self.dropped += 1
+            elif not self.pending:
+                self.first_pending = time.monotonic()
+            self.pending[key] = (value, apply)
+            schedule = not self.scheduled and not self.holds
+            if schedule:
+                self.scheduled = True
+        if schedule:
+            self.root.after(0, self.flush)
+
+    def forget(self, key):
+        """Drop everything kept for key, e.g. once its widget is gone (Tk thread)"""
+        with self.lock:
+            self.pending.pop(key, None)
+        self.shown.pop(key, None)
+
+    def set_text(self, widget, text):
+        self.submit((widget, 'text'), text, lambda text: widget.config(text=text))
+
+    @contextmanager
+    def batch(self):
+        """Hold back the Tk callback until every update of a tick is queued"""
+        with self.lock:
+            self.holds += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.holds -= 1
+                schedule = not self.holds and self.pending and not self.scheduled
+                if schedule:
+                    self.scheduled = True
+            if schedule:
+                self.root.after(0, self.flush)
+
+    def flush(self):
+        """Apply everything queued (runs on the Tk thread)"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.scheduled = False
+            started = self.first_pending
+        if not pending:
+            return
+        self.flushes += 1
+        applying = time.monotonic()
+        for key, (value, apply) in pending.items():
+            if key in self.shown and self.shown[key] == value:
+                self.skipped += 1
+                continue
+            try:
+                apply(value)
+            except Exception as e:
+                # One broken widget must not cost the rest of the batch
+                print(f"UI update {key!r} failed: {e!r}")
+                self.failed += 1
+                continue
+            self.shown[key] = value
+            self.applied += 1
+        now = time.monotonic()
+        self.apply_time.record(now - applying)
+        self.last_latency = now - started
+        self.latency.record(self.last_latency)
+        if self.last_latency > self.max_latency:
+            self.max_latency = self.last_latency
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'applied': self.applied,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'last_latency_ms': self.last_latency * 1000,
+            'max_latency_ms': self.max_latency * 1000,
+            'latency_p50_ms': self.latency.percentile(50) * 1000,
+            'latency_p99_ms': self.latency.percentile(99) * 1000,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"UI updates: {s['applied']} applied, {s['skipped']} unchanged, "
+                f"{s['dropped']} superseded, {s['failed']} failed, {s['flushes']} flushes, "
+                f"latency last {s['last_latency_ms']:.2f} ms p50 {s['latency_p50_ms']:.2f} ms "
+                f"p99 {s['latency_p99_ms']:.2f} ms max {s['max_latency_ms']:.2f} ms")
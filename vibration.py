@@ -0,0 +1,183 @@
+"""
+Vibration and motion analytics for the reTerminal accelerometer
+Computes RMS, peak-to-peak, tilt and an FFT spectrum (dominant frequency
+and band energies) over sliding windows of the AccelerometerStream ring.
+
+All working arrays are allocated once; each window is copied straight out
+of the ring's array storage through NumPy views. Requires numpy.
+"""
+
+import math
+from collections import namedtuple
+
+from startup_probe import lazy_import
+
+# Loaded when the first full window is analysed, not at app startup
+np = lazy_import('numpy')
+if np is None:
+    raise ImportError("vibration analytics need numpy")
+
+VibrationStats = namedtuple('VibrationStats',
+                            'time sample_rate rms peak_to_peak vibration_rms '
+                            'pitch roll dominant_hz band_energy')
+
+# (low Hz, high Hz) bands; None means up to Nyquist
+DEFAULT_BANDS = ((0.5, 5.0), (5.0, 20.0), (20.0, 50.0), (50.0, None))
+
+
+class VibrationAnalyzer:
+    """Sliding-window analytics over a SampleRing
+
+    counts_per_g converts raw axis values to g; the lis3lv02d input driver
+    reports milli-g, hence 1000.
+    """
+
+    def __init__(self, ring, window=256, hop=64, bands=DEFAULT_BANDS, counts_per_g=1000.0,
+                 on_window=None):
+        if window > ring.capacity:
+            raise ValueError("window larger than the ring buffer")
+        self.ring = ring
+        self.window = window
+        self.hop = hop
+        self.bands = bands
+        self.scale = 1.0 / counts_per_g
+        self.on_window = on_window
+        self.last_seq = 0
+        self.result = None
+        self.t = None  # buffers are allocated by the first update()
+
+        self.sample_rate = None
+        self.freqs = None
+        self.band_edges = None
+
+    def allocate(self):
+        ring, window = self.ring, self.window
+        # Zero-copy views of the ring storage
+        self.ring_t = np.frombuffer(ring.t, dtype=np.float64)
+        self.ring_axes = [np.frombuffer(a, dtype=np.int32) for a in (ring.x, ring.y, ring.z)]
+
+        # Working buffers, reused for every window
+        self.t = np.empty(window)
+        self.frame = np.empty((3, window))
+        self.detrended = np.empty((3, window))
+        self.squared = np.empty((3, window))
+        self.mean = np.empty(3)
+        self.rms = np.empty(3)
+        self.high = np.empty(3)
+        self.low = np.empty(3)
+        self.p2p = np.empty(3)
+        self.taper = np.hanning(window)
+        # Hann window loses energy; scale band energies back up
+        self.taper_gain = 1.0 / np.mean(self.taper ** 2)
+        bins = window // 2 + 1
+        self.spectrum = np.empty((3, bins), dtype=np.complex128)
+        self.magnitude = np.empty((3, bins))
+        self.power = np.empty(bins)
+        self.rfft_out = True  # numpy >= 2.0 lets rfft write into a buffer
+
+    def update(self):
+        """Analyse every hop-spaced window that completed since the last call
+
+        Returns the latest VibrationStats (or None before the first full
+        window). Windows already overwritten in the ring are skipped.
+        """
+        seq = self.ring.seq
+        if seq < self.window:
+            return self.result
+        if self.t is None:
+            self.allocate()
+        # Oldest window end still fully inside the ring
+        end = max(self.last_seq + self.hop, self.window,
+                  seq - self.ring.capacity + self.window)
+        while end <= seq:
+            self.copy_window(end)
+            self.last_seq = end
+            stats = self.analyze()
+            if stats is not None:
+                self.result = stats
+                if self.on_window is not None:
+                    self.on_window(stats)
+            end += self.hop
+        return self.result
+
+    def copy_window(self, seq):
+        capacity = self.ring.capacity
+        start = (seq - self.window) % capacity
+        first = min(self.window, capacity - start)
+        with self.ring.lock:
+            self.t[:first] = self.ring_t[start:start + first]
+            self.t[first:] = self.ring_t[:self.window - first]
+            for axis, view in enumerate(self.ring_axes):
+                self.frame[axis, :first] = view[start:start + first]
+                self.frame[axis, first:] = view[:self.window - first]
+        self.frame *= self.scale
+
+    def set_sample_rate(self, rate):
+        """Recompute frequency bins only when the sensor rate really changes"""
+        if self.sample_rate and abs(rate - self.sample_rate) < 0.01 * self.sample_rate:
+            return
+        self.sample_rate = rate
+        self.freqs = np.fft.rfftfreq(self.window, 1.0 / rate)
+        edges = []
+        for low, high in self.bands:
+            high = rate / 2 if high is None else high
+            edges.append((int(np.searchsorted(self.freqs, low)),
+                          int(np.searchsorted(self.freqs, high, side='right'))))
+        self.band_edges = edges
+
+    def analyze(self):
+        span = self.t[-1] - self.t[0]
+        if span <= 0:
+            return None
+        self.set_sample_rate(float((self.window - 1) / span))
+
+        frame, detrended, squared = self.frame, self.detrended, self.squared
+        np.mean(frame, axis=1, out=self.mean)
+        np.subtract(frame, self.mean[:, None], out=detrended)
+
+        # RMS of the dynamic (gravity-removed) signal per axis
+        np.multiply(detrended, detrended, out=squared)
+        np.mean(squared, axis=1, out=self.rms)
+        np.sqrt(self.rms, out=self.rms)
+        vibration_rms = math.sqrt(float(self.rms @ self.rms))
+
+        np.max(frame, axis=1, out=self.high)
+        np.min(frame, axis=1, out=self.low)
+        np.subtract(self.high, self.low, out=self.p2p)
+
+        # Tilt from the mean (gravity) vector
+        gx, gy, gz = self.mean
+        pitch = math.degrees(math.atan2(-gx, math.hypot(gy, gz)))
+        roll = math.degrees(math.atan2(gy, gz))
+
+        # Spectrum of the tapered, detrended signal summed over the axes
+        np.multiply(detrended, self.taper, out=detrended)
+        if self.rfft_out:
+            try:
+                np.fft.rfft(detrended, axis=1, out=self.spectrum)
+            except TypeError:
+                self.rfft_out = False
+        if not self.rfft_out:
+            self.spectrum[...] = np.fft.rfft(detrended, axis=1)
+        np.abs(self.spectrum, out=self.magnitude)
+        np.multiply(self.magnitude, self.magnitude, out=self.magnitude)
+        np.sum(self.magnitude, axis=0, out=self.power)
+        # One-sided spectrum: double every bin except DC and Nyquist so band
+        # energies add up to the mean-square (g^2) of the window
+        self.power *= 2.0 * self.taper_gain / (self.window * self.window)
+        self.power[0] *= 0.5
+        if self.window % 2 == 0:
+            self.power[-1] *= 0.5
+
+        peak = int(np.argmax(self.power[1:])) + 1  # skip DC
+        band_energy = tuple(float(self.power[a:b].sum()) for a, b in self.band_edges)
+
+        return VibrationStats(time=float(self.t[-1]),
+                              sample_rate=self.sample_rate,
+                              rms=tuple(self.rms.tolist()),
+                              peak_to_peak=tuple(self.p2p.tolist()),
+                              vibration_rms=vibration_rms,
+                              pitch=pitch,
+                              roll=roll,
+                              dominant_hz=float(self.freqs[peak]),
+                              band_energy=band_energy)